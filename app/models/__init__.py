@@ -4,5 +4,8 @@ from .crawl_results import CrawlResult
 from .users_model import User
 from .crawl_pool import CrawlPool
 from .heartbeat_model import Heartbeat
+from .crawl_yield import CrawlYield
+from .crawl_run import CrawlRun, CrawlTaskRun
 
-__all__ = ['BaseCrawler', 'CrawlerConfig', 'CrawlResult', 'User', 'CrawlPool', 'Heartbeat']
+__all__ = ['BaseCrawler', 'CrawlerConfig', 'CrawlResult', 'User', 'CrawlPool', 'Heartbeat', 'CrawlYield',
+           'CrawlRun', 'CrawlTaskRun']
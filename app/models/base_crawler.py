@@ -12,6 +12,10 @@ class BaseCrawler(db.Model):
     crawler_status = Column(Integer, nullable=False, default=0)
     last_run_time = Column(DateTime)
     next_run_time = Column(DateTime)
+    # 当前轮次编号，每开启一轮加 1
+    generation = Column(Integer, nullable=False, default=0)
+    # 最近一个全部任务都已完成的轮次，小于 generation 时说明当前一轮被中断，需要继续执行
+    finished_generation = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -23,6 +27,8 @@ class BaseCrawler(db.Model):
             'crawler_status': self.crawler_status,
             'last_run_time': self.last_run_time.isoformat() if self.last_run_time else None,
             'next_run_time': self.next_run_time.isoformat() if self.next_run_time else None,
+            'generation': self.generation,
+            'finished_generation': self.finished_generation,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
         }
@@ -4,6 +4,10 @@ from datetime import datetime
 
 class CrawlPool(db.Model):
     __tablename__ = 'crawl_pool'
+    __table_args__ = (
+        db.Index('crawl_pool_done_generation_idx', 'done_generation'),
+        db.Index('crawl_pool_next_run_at_idx', 'next_run_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(100),nullable=False)
@@ -13,6 +17,16 @@ class CrawlPool(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     website_names = db.Column(db.String(255), nullable=True)
+    # 分布式执行：领取任务的 worker、租约到期时间（UTC），以及最近完成的轮次
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    done_generation = db.Column(db.Integer, nullable=False, default=0)
+    # 调度：下一次到期时间与最近一次执行时间（UTC），next_run_at 为空表示立即到期
+    next_run_at = db.Column(db.DateTime, nullable=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    # 自适应抓取间隔（分钟）与连续没有新结果的次数
+    adaptive_minutes = db.Column(db.Float, nullable=True)
+    empty_streak = db.Column(db.Integer, nullable=False, default=0)
 
     def to_dict(self):
         return {
@@ -23,5 +37,12 @@ class CrawlPool(db.Model):
             'config_names': self.config_names,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'website_names': self.website_names
+            'website_names': self.website_names,
+            'lease_owner': self.lease_owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'done_generation': self.done_generation,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'adaptive_minutes': self.adaptive_minutes,
+            'empty_streak': self.empty_streak,
         }
@@ -4,6 +4,11 @@ from datetime import datetime
 
 class CrawlResult(db.Model):
     __tablename__ = 'crawl_results'
+    __table_args__ = (
+        db.Index('crawl_results_site_keyword_idx', 'website_name', 'keyword'),
+        db.Index('crawl_results_simhash_idx', 'simhash'),
+        db.Index('crawl_results_canonical_id_idx', 'canonical_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(50), nullable=False)
@@ -13,10 +18,16 @@ class CrawlResult(db.Model):
     source_url = db.Column(db.String(500), nullable=False)
     title = db.Column(db.String(500), nullable=False)
     detail_url = db.Column(db.String(500), nullable=False, unique=True)
+    # 规范化前的原始链接（与 detail_url 相同时为空），邮件中链接此地址
+    original_url = db.Column(db.String(500), nullable=True)
     publish_time = db.Column(db.DateTime, nullable=True)
     publisher = db.Column(db.String(200), nullable=True)
     is_pushed = db.Column(db.Integer, nullable=False, default=0)
     crawled_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # 标题 + 发布单位的 64 位 SimHash（有符号保存），文本过短时为空
+    simhash = db.Column(db.BigInteger, nullable=True)
+    # 其它网站转载的同一公告：指向最早保存的那条结果，本身为原始结果时为空
+    canonical_id = db.Column(db.Integer, nullable=True)
 
     def to_dict(self):
         return {
@@ -28,8 +39,10 @@ class CrawlResult(db.Model):
             'source_url': self.source_url,
             'title': self.title,
             'detail_url': self.detail_url,
+            'original_url': self.original_url,
             'publish_time': self.publish_time.isoformat() if self.publish_time else None,
             'publisher': self.publisher,
             'is_pushed': self.is_pushed,
-            'crawled_at': self.crawled_at.isoformat() if self.crawled_at else None
+            'crawled_at': self.crawled_at.isoformat() if self.crawled_at else None,
+            'canonical_id': self.canonical_id
         }
@@ -0,0 +1,108 @@
+from config.db import db
+from datetime import datetime
+
+
+class CrawlRun(db.Model):
+    """一轮（或调度模式下一批）采集的执行记录"""
+    __tablename__ = 'crawl_runs'
+    __table_args__ = (
+        db.Index('crawl_runs_started_at_idx', 'started_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # sweep：整池一轮；scheduled：调度模式的一批到期任务；distributed：分布式模式下本 worker 执行的部分
+    mode = db.Column(db.String(20), nullable=False)
+    generation = db.Column(db.Integer, nullable=True)
+    worker = db.Column(db.String(100), nullable=False)
+    # running / finished / failed；aborted 为进程在本轮结束前退出，下一轮开始时标记
+    status = db.Column(db.String(20), nullable=False, default='running')
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    tasks_total = db.Column(db.Integer, nullable=False, default=0)
+    tasks_success = db.Column(db.Integer, nullable=False, default=0)
+    tasks_failed = db.Column(db.Integer, nullable=False, default=0)
+    tasks_timeout = db.Column(db.Integer, nullable=False, default=0)
+    tasks_skipped = db.Column(db.Integer, nullable=False, default=0)
+    pages = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    items_found = db.Column(db.Integer, nullable=False, default=0)
+    items_inserted = db.Column(db.Integer, nullable=False, default=0)
+    items_duplicate = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'generation': self.generation,
+            'worker': self.worker,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': (self.finished_at - self.started_at).total_seconds()
+            if self.finished_at and self.started_at else None,
+            'tasks_total': self.tasks_total,
+            'tasks_success': self.tasks_success,
+            'tasks_failed': self.tasks_failed,
+            'tasks_timeout': self.tasks_timeout,
+            'tasks_skipped': self.tasks_skipped,
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'items_found': self.items_found,
+            'items_inserted': self.items_inserted,
+            'items_duplicate': self.items_duplicate,
+            'error': self.error,
+        }
+
+
+class CrawlTaskRun(db.Model):
+    """
+    单个 crawl_pool 任务在一次执行中的耗时与抓取量。
+    按网站汇总抓取的任务共用一次列表抓取：pages/bytes/fetch/parse 记在该网站第一个任务上，其余为 0，合计不重复。
+    """
+    __tablename__ = 'crawl_task_runs'
+    __table_args__ = (
+        db.Index('crawl_task_runs_run_id_idx', 'run_id'),
+        db.Index('crawl_task_runs_site_started_idx', 'website_name', 'started_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)
+    website_name = db.Column(db.String(255), nullable=False)
+    keyword = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_seconds = db.Column(db.Float, nullable=True)
+    pages = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    fetch_seconds = db.Column(db.Float, nullable=False, default=0)
+    parse_seconds = db.Column(db.Float, nullable=False, default=0)
+    items_found = db.Column(db.Integer, nullable=False, default=0)
+    items_inserted = db.Column(db.Integer, nullable=False, default=0)
+    items_duplicate = db.Column(db.Integer, nullable=False, default=0)
+    error_class = db.Column(db.String(100), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'run_id': self.run_id,
+            'task_id': self.task_id,
+            'website_name': self.website_name,
+            'keyword': self.keyword,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': self.duration_seconds,
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'fetch_seconds': self.fetch_seconds,
+            'parse_seconds': self.parse_seconds,
+            'items_found': self.items_found,
+            'items_inserted': self.items_inserted,
+            'items_duplicate': self.items_duplicate,
+            'error_class': self.error_class,
+            'error': self.error,
+        }
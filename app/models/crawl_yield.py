@@ -0,0 +1,33 @@
+from config.db import db
+from datetime import datetime
+
+
+class CrawlYield(db.Model):
+    """每个 crawl_pool 任务每次执行的新增结果数，用于计算自适应抓取间隔"""
+    __tablename__ = 'crawl_yield_history'
+    __table_args__ = (
+        db.Index('crawl_yield_site_keyword_idx', 'website_name', 'keyword', 'ran_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    website_name = db.Column(db.String(255), nullable=False)
+    keyword = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    fetched_items = db.Column(db.Integer, nullable=False, default=0)
+    new_items = db.Column(db.Integer, nullable=False, default=0)
+    interval_minutes = db.Column(db.Float, nullable=True)
+    ran_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'website_name': self.website_name,
+            'keyword': self.keyword,
+            'status': self.status,
+            'fetched_items': self.fetched_items,
+            'new_items': self.new_items,
+            'interval_minutes': self.interval_minutes,
+            'ran_at': self.ran_at.isoformat() if self.ran_at else None,
+        }
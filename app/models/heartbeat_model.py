@@ -8,6 +8,9 @@ class Heartbeat(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     caiji_heartbeat = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     caiji_status = db.Column(db.SmallInteger, nullable=False, default=0)
+    # 采集进程中执行时间最长的任务及其开始时间，空闲时为空；开始时间长期不变说明任务卡住
+    caiji_task = db.Column(db.String(255))
+    caiji_task_started_at = db.Column(db.DateTime)
     email_heartbeat = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     email_status = db.Column(db.SmallInteger, nullable=False, default=0)
 
@@ -16,6 +19,8 @@ class Heartbeat(db.Model):
             'id': self.id,
             'caiji_heartbeat': self.caiji_heartbeat.isoformat() if self.caiji_heartbeat else None,
             'caiji_status': self.caiji_status,
+            'caiji_task': self.caiji_task,
+            'caiji_task_started_at': self.caiji_task_started_at.isoformat() if self.caiji_task_started_at else None,
             'email_heartbeat': self.email_heartbeat.isoformat() if self.email_heartbeat else None,
             'email_status': self.email_status,
         }
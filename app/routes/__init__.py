@@ -4,6 +4,8 @@ from .result_api import bp_result
 from .users_api import bp_users
 from .heartbeat_api import bp_heartbeat
 from .auth import bp_login
+from .schedule_api import bp_schedule
+from .crawl_run_api import bp_crawl_runs
 
 
 def register_routes(app):
@@ -16,3 +18,5 @@ def register_routes(app):
     app.register_blueprint(bp_users)
     app.register_blueprint(bp_heartbeat)
     app.register_blueprint(bp_login)
+    app.register_blueprint(bp_schedule)
+    app.register_blueprint(bp_crawl_runs)
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, case
+
+from app.models.crawl_run import CrawlRun, CrawlTaskRun
+from config.db import db
+
+bp_crawl_runs = Blueprint('crawl_run_api', __name__, url_prefix='/api/crawl-runs')
+
+
+def _page_args():
+    page = max(int(request.args.get('page', 1)), 1)
+    page_size = max(int(request.args.get('page_size', 15)), 1)
+    return page, page_size
+
+
+@bp_crawl_runs.route('/', methods=['GET'])
+def get_runs():
+    """
+    查询最近的采集运行记录（按开始时间倒序）。
+    支持参数：
+      - page: 页码（默认 1）
+      - page_size: 每页数量（默认 15）
+      - mode: 按运行方式过滤（sweep / scheduled / distributed，可选）
+      - status: 按状态过滤（running / finished / failed，可选）
+    """
+    try:
+        page, page_size = _page_args()
+    except ValueError:
+        return jsonify({"error": "分页参数必须为整数"}), 400
+
+    query = db.session.query(CrawlRun)
+    if request.args.get('mode'):
+        query = query.filter(CrawlRun.mode == request.args['mode'])
+    if request.args.get('status'):
+        query = query.filter(CrawlRun.status == request.args['status'])
+
+    total = query.count()
+    runs = (
+        query.order_by(CrawlRun.started_at.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return jsonify({
+        "data": [run.to_dict() for run in runs],
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total
+        }
+    })
+
+
+@bp_crawl_runs.route('/<int:run_id>/tasks', methods=['GET'])
+def get_run_tasks(run_id):
+    """
+    查询一次运行中各任务的耗时、抓取量与错误，默认按耗时倒序。
+    支持参数：
+      - page / page_size: 分页（默认 1 / 50）
+      - website_name: 按网站名称过滤（可选）
+      - status: 按任务状态过滤（success / failed / timeout / skipped，可选）
+    """
+    run = db.session.get(CrawlRun, run_id)
+    if run is None:
+        return jsonify({"error": "运行记录不存在"}), 404
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        page_size = max(int(request.args.get('page_size', 50)), 1)
+    except ValueError:
+        return jsonify({"error": "分页参数必须为整数"}), 400
+
+    query = db.session.query(CrawlTaskRun).filter(CrawlTaskRun.run_id == run_id)
+    if request.args.get('website_name'):
+        query = query.filter(CrawlTaskRun.website_name == request.args['website_name'])
+    if request.args.get('status'):
+        query = query.filter(CrawlTaskRun.status == request.args['status'])
+
+    total = query.count()
+    tasks = (
+        query.order_by(CrawlTaskRun.duration_seconds.desc().nullslast(), CrawlTaskRun.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return jsonify({
+        "run": run.to_dict(),
+        "data": [task.to_dict() for task in tasks],
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total
+        }
+    })
+
+
+@bp_crawl_runs.route('/sites', methods=['GET'])
+def get_site_stats():
+    """
+    按网站汇总近期任务执行情况，默认按 p95 耗时倒序，用于找出最慢的网站。
+    按网站汇总的一组任务只有第一个任务行记录耗时，runs 与耗时分位数按执行单元统计。
+    支持参数：
+      - days: 统计近多少天的记录（默认 7）
+      - website_name: 只看某个网站（可选）
+      - limit: 返回的网站数（默认 50）
+
+    返回示例：
+    {
+      "data": [{"website_name": "...", "runs": 42, "p50_seconds": 3.2, "p95_seconds": 18.5,
+                "max_seconds": 40.1, "pages": 120, "bytes": 2048000, "fetch_seconds": 80.2,
+                "parse_seconds": 5.1, "items_found": 300, "items_inserted": 12,
+                "failed": 1, "timeout": 0, "last_error_class": "FetchError"}]
+    }
+    """
+    try:
+        days = max(int(request.args.get('days', 7)), 1)
+        limit = max(int(request.args.get('limit', 50)), 1)
+    except ValueError:
+        return jsonify({"error": "days 和 limit 必须为整数"}), 400
+
+    duration = CrawlTaskRun.duration_seconds
+    p50 = func.percentile_cont(0.5).within_group(duration.asc())
+    p95 = func.percentile_cont(0.95).within_group(duration.asc())
+    since = datetime.utcnow() - timedelta(days=days)
+    query = db.session.query(
+        CrawlTaskRun.website_name,
+        func.count(duration),
+        p50,
+        p95,
+        func.max(duration),
+        func.sum(CrawlTaskRun.pages),
+        func.sum(CrawlTaskRun.bytes),
+        func.sum(CrawlTaskRun.fetch_seconds),
+        func.sum(CrawlTaskRun.parse_seconds),
+        func.sum(CrawlTaskRun.items_found),
+        func.sum(CrawlTaskRun.items_inserted),
+        func.sum(case((CrawlTaskRun.status == 'failed', 1), else_=0)),
+        func.sum(case((CrawlTaskRun.status == 'timeout', 1), else_=0)),
+    ).filter(CrawlTaskRun.started_at >= since)
+    if request.args.get('website_name'):
+        query = query.filter(CrawlTaskRun.website_name == request.args['website_name'])
+    rows = (
+        query.group_by(CrawlTaskRun.website_name)
+        .order_by(p95.desc().nullslast())
+        .limit(limit)
+        .all()
+    )
+
+    # 各网站最近一次出错的错误类型
+    sites = [row[0] for row in rows]
+    last_errors = {}
+    if sites:
+        latest = (
+            db.session.query(CrawlTaskRun.website_name, CrawlTaskRun.error_class)
+            .filter(CrawlTaskRun.website_name.in_(sites), CrawlTaskRun.error_class.isnot(None),
+                    CrawlTaskRun.started_at >= since)
+            .distinct(CrawlTaskRun.website_name)
+            .order_by(CrawlTaskRun.website_name, CrawlTaskRun.started_at.desc())
+        )
+        last_errors = dict(latest.all())
+
+    data = []
+    for (site, runs, p50_value, p95_value, max_value, pages, size, fetch_seconds, parse_seconds,
+         items_found, items_inserted, failed, timeout) in rows:
+        data.append({
+            "website_name": site,
+            "runs": runs,
+            "p50_seconds": round(p50_value, 3) if p50_value is not None else None,
+            "p95_seconds": round(p95_value, 3) if p95_value is not None else None,
+            "max_seconds": round(max_value, 3) if max_value is not None else None,
+            "pages": int(pages or 0),
+            "bytes": int(size or 0),
+            "fetch_seconds": round(fetch_seconds or 0, 3),
+            "parse_seconds": round(parse_seconds or 0, 3),
+            "items_found": int(items_found or 0),
+            "items_inserted": int(items_inserted or 0),
+            "failed": int(failed or 0),
+            "timeout": int(timeout or 0),
+            "last_error_class": last_errors.get(site),
+        })
+
+    return jsonify({"data": data, "days": days})
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, case
+
+from app.models.crawl_pool import CrawlPool
+from app.models.crawl_yield import CrawlYield
+from config.db import db
+
+bp_schedule = Blueprint('schedule_api', __name__, url_prefix='/api/schedule')
+
+
+@bp_schedule.route('/intervals', methods=['GET'])
+def get_intervals():
+    """
+    查看各任务（网站 + 关键词）学习到的抓取间隔及近期产出。
+    支持参数：
+      - website_name: 按网站名称过滤（可选）
+      - keyword: 按关键词过滤（可选）
+      - days: 统计近多少天的执行记录（默认 30）
+
+    返回示例：
+    {
+      "data": [{"task_id": 1, "website_name": "...", "keyword": "...", "adaptive_minutes": 90.0,
+                "empty_streak": 0, "next_run_at": "...", "last_run_at": "...",
+                "runs": 12, "productive_runs": 5, "new_items": 37, "last_new_at": "..."}]
+    }
+    """
+    try:
+        days = max(int(request.args.get('days', 30)), 1)
+    except ValueError:
+        return jsonify({"error": "days 必须为整数"}), 400
+
+    website_name = request.args.get('website_name')
+    keyword = request.args.get('keyword')
+
+    query = db.session.query(CrawlPool)
+    if website_name:
+        query = query.filter(CrawlPool.website_names == website_name)
+    if keyword:
+        query = query.filter(CrawlPool.keyword == keyword)
+    tasks = query.order_by(CrawlPool.website_names, CrawlPool.keyword).all()
+
+    # 按 (网站, 关键词) 汇总近期执行记录
+    since = datetime.utcnow() - timedelta(days=days)
+    stats_query = db.session.query(
+        CrawlYield.website_name,
+        CrawlYield.keyword,
+        func.count(CrawlYield.id),
+        func.sum(case((CrawlYield.new_items > 0, 1), else_=0)),
+        func.coalesce(func.sum(CrawlYield.new_items), 0),
+        func.max(case((CrawlYield.new_items > 0, CrawlYield.ran_at), else_=None)),
+    ).filter(CrawlYield.ran_at >= since)
+    if website_name:
+        stats_query = stats_query.filter(CrawlYield.website_name == website_name)
+    if keyword:
+        stats_query = stats_query.filter(CrawlYield.keyword == keyword)
+    stats = {
+        (site, kw): (runs, productive, new_items, last_new_at)
+        for site, kw, runs, productive, new_items, last_new_at
+        in stats_query.group_by(CrawlYield.website_name, CrawlYield.keyword).all()
+    }
+
+    data = []
+    for task in tasks:
+        runs, productive, new_items, last_new_at = stats.get(
+            (task.website_names or '', task.keyword), (0, 0, 0, None))
+        data.append({
+            "task_id": task.id,
+            "website_name": task.website_names,
+            "keyword": task.keyword,
+            "adaptive_minutes": task.adaptive_minutes,
+            "empty_streak": task.empty_streak,
+            "next_run_at": task.next_run_at.isoformat() if task.next_run_at else None,
+            "last_run_at": task.last_run_at.isoformat() if task.last_run_at else None,
+            "runs": runs,
+            "productive_runs": int(productive or 0),
+            "new_items": int(new_items or 0),
+            "last_new_at": last_new_at.isoformat() if last_new_at else None,
+        })
+
+    return jsonify({"data": data, "days": days})
+
+
+@bp_schedule.route('/history', methods=['GET'])
+def get_history():
+    """
+    查询任务执行历史（每次执行的抓取数、新增数与执行后的间隔），按执行时间倒序。
+    支持参数：
+      - page: 页码（默认 1）
+      - page_size: 每页数量（默认 15）
+      - website_name: 按网站名称过滤（可选）
+      - keyword: 按关键词过滤（可选）
+    """
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        page_size = max(int(request.args.get('page_size', 15)), 1)
+    except ValueError:
+        return jsonify({"error": "分页参数必须为整数"}), 400
+
+    website_name = request.args.get('website_name')
+    keyword = request.args.get('keyword')
+
+    query = db.session.query(CrawlYield)
+    if website_name:
+        query = query.filter(CrawlYield.website_name == website_name)
+    if keyword:
+        query = query.filter(CrawlYield.keyword == keyword)
+
+    total = query.count()
+    records = (
+        query.order_by(CrawlYield.ran_at.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+
+    return jsonify({
+        "data": [r.to_dict() for r in records],
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total
+        }
+    })
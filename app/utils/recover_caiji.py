@@ -31,6 +31,10 @@ def start_heartbeat_monitor_caiji(app):
                         else:
                             print(f"[{datetime.now(timezone.utc).isoformat()}][HEARTBEAT] BASE正常，间隔 {diff:.1f} 秒")
                             print(f"数据库心跳时间: {heartbeat.caiji_heartbeat}")
+                            if heartbeat.caiji_task and heartbeat.caiji_task_started_at:
+                                started_at = heartbeat.caiji_task_started_at.replace(tzinfo=timezone.utc)
+                                running = (now - started_at).total_seconds()
+                                print(f"当前任务: {heartbeat.caiji_task}，已运行 {running:.0f} 秒")
                     else:
                         print("[HEARTBEAT] BASE无心跳记录")
 
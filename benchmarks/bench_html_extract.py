@@ -0,0 +1,108 @@
+"""
+列表页提取基准测试：整页 BeautifulSoup(html.parser) + select vs caiji.utils.html_extract。
+
+使用 benchmarks/fixtures 下保存的列表页：
+  - listing_school.html：ul.news-list > li（学校通知公告）
+  - listing_procurement.html：table#notice-table 的行（采购公告）
+运行（项目根目录）：
+    python benchmarks/bench_html_extract.py
+    python benchmarks/bench_html_extract.py --repeat 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from caiji.utils import html_extract  # noqa: E402
+from caiji.utils.html_extract import ListingSpec  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+CASES = [
+    {
+        "file": "listing_school.html",
+        "source_url": "https://www.example.edu.cn/tzgg/list.htm",
+        "spec": ListingSpec('ul.news-list', 'li', title='a@title', date='span.time'),
+        "soup_item": 'ul.news-list li',
+        "soup_fields": {'title': ('a', 'title'), 'url': ('a', 'href'), 'date': ('span.time', None)},
+    },
+    {
+        "file": "listing_procurement.html",
+        "source_url": "https://cg.example.edu.cn/cggg/list.htm",
+        "spec": ListingSpec('#notice-table', 'tbody tr', title='td.title a', date='td.date',
+                            publisher='td.org'),
+        "soup_item": '#notice-table tbody tr',
+        "soup_fields": {'title': ('td.title a', None), 'url': ('td.title a', 'href'),
+                        'date': ('td.date', None), 'publisher': ('td.org', None)},
+    },
+]
+
+
+def naive_extract(html, case):
+    """爬虫常见写法：整页 html.parser 解析后 select"""
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for li in soup.select(case["soup_item"]):
+        row = {}
+        for name, (css, attr) in case["soup_fields"].items():
+            el = li.select_one(css)
+            row[name] = (el.get(attr) if attr else el.get_text(strip=True)) if el else None
+        row['url'] = urljoin(case["source_url"], row['url'])
+        rows.append(row)
+    return rows
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表页提取基准测试")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    report = {"lxml_available": html_extract.HAS_LXML, "cases": []}
+    for case in CASES:
+        with open(os.path.join(FIXTURES, case["file"]), encoding='utf-8') as f:
+            html = f.read()
+        spec = case["spec"]
+
+        naive_time, naive = timed(lambda: naive_extract(html, case), args.repeat)
+        helper_time, items = timed(lambda: spec.extract(html, case["source_url"], parse_dates=False),
+                                   args.repeat)
+        # 强制使用 BeautifulSoup 后端（SoupStrainer 只构建容器子树）
+        has_lxml = html_extract.HAS_LXML
+        html_extract.HAS_LXML = False
+        try:
+            strainer_time, strained = timed(lambda: spec.extract(html, case["source_url"], parse_dates=False),
+                                            args.repeat)
+        finally:
+            html_extract.HAS_LXML = has_lxml
+
+        if [i.detail_url for i in items] != [r['url'] for r in naive] or items != strained:
+            raise SystemExit(f"{case['file']}：提取结果不一致")
+
+        report["cases"].append({
+            "file": case["file"],
+            "bytes": len(html.encode('utf-8')),
+            "items": len(items),
+            "naive_ms": round(naive_time * 1000, 3),
+            "helper_ms": round(helper_time * 1000, 3),
+            "bs4_strainer_ms": round(strainer_time * 1000, 3),
+            "speedup": round(naive_time / helper_time, 2),
+            "bs4_strainer_speedup": round(naive_time / strainer_time, 2),
+        })
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+关键词匹配基准测试：Aho-Corasick 自动机 vs 逐个关键词 `in` 判断。
+
+运行（项目根目录）：
+    python benchmarks/bench_keyword_matcher.py
+    python benchmarks/bench_keyword_matcher.py --keywords 5000 --titles 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from caiji.utils.keyword_matcher import KeywordMatcher  # noqa: E402
+
+# 常用于学校公告标题的汉字，用来生成贴近实际的关键词与标题
+CHARS = ("关于学校学院招标采购项目公告公示通知结果中标成交单位设备服务工程建设维修改造"
+         "信息系统平台实验室图书馆后勤教学科研评审专家会议报名竞争性磋商询价谈判单一来源"
+         "年度第一二三批次预算资金合同变更终止延期澄清答疑开标时间地点")
+
+
+def random_text(rng, low, high):
+    return ''.join(rng.choice(CHARS) for _ in range(rng.randint(low, high)))
+
+
+def build_corpus(n_keywords, n_titles, seed=42):
+    rng = random.Random(seed)
+    keywords = sorted({random_text(rng, 2, 6) for _ in range(n_keywords)})
+    titles = []
+    for _ in range(n_titles):
+        title = random_text(rng, 15, 40)
+        # 约三成标题插入一个真实关键词，保证有足够的命中
+        if rng.random() < 0.3:
+            pos = rng.randint(0, len(title))
+            title = title[:pos] + rng.choice(keywords) + title[pos:]
+        titles.append(title)
+    return keywords, titles
+
+
+def naive_match(titles, keywords):
+    return [{kw for kw in keywords if kw in title} for title in titles]
+
+
+def automaton_match(titles, matcher):
+    return [matcher.match_keywords(title) for title in titles]
+
+
+def timed(fn, *args, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词匹配基准测试")
+    parser.add_argument('--keywords', type=int, default=2000)
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    keywords, titles = build_corpus(args.keywords, args.titles)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher({kw: {'bench'} for kw in keywords})
+    build_time = time.perf_counter() - start
+
+    naive_time, naive_result = timed(naive_match, titles, keywords, repeat=args.repeat)
+    ac_time, ac_result = timed(automaton_match, titles, matcher, repeat=args.repeat)
+
+    if naive_result != ac_result:
+        raise SystemExit("两种匹配方式结果不一致")
+
+    report = {
+        "keywords": len(keywords),
+        "titles": len(titles),
+        "matches": sum(len(r) for r in ac_result),
+        "build_seconds": round(build_time, 4),
+        "naive_seconds": round(naive_time, 4),
+        "automaton_seconds": round(ac_time, 4),
+        "speedup": round(naive_time / ac_time, 2) if ac_time else None,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+时间字符串解析基准测试：正则分派 + 按网站记忆格式的 to_timestamp vs 原先逐个 strptime 的实现。
+
+语料为 benchmarks/fixtures/date_strings.tsv（网站名<TAB>时间字符串），按 --repeat 倍放大。
+运行（项目根目录）：
+    python benchmarks/bench_to_timestamp.py
+    python benchmarks/bench_to_timestamp.py --repeat 2000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from caiji.utils.common import to_timestamp  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'date_strings.tsv')
+
+LEGACY_FORMATS = [
+    "%Y.%m.%d %H:%M:%S",
+    "%Y年%m月%d日%H点%M分",
+    "%Y年%m月%d日%H:%M",
+    "%Y年%m月%d日%H时",
+    "%Y-%m-%d",
+]
+
+
+def legacy_to_timestamp(org):
+    """原实现：依次尝试 strptime，失败时记录 ERROR"""
+    if not org:
+        logging.error("to_timestamp: 输入时间字符串为空")
+        return None
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(org, fmt)
+        except ValueError:
+            continue
+    logging.error(f"to_timestamp: 无法识别的时间格式: {org}")
+    return None
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            site, text = line.split('\t', 1)
+            corpus.append((site, text))
+    return corpus
+
+
+def timed(fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="时间字符串解析基准测试")
+    parser.add_argument('--repeat', type=int, default=500, help="语料放大倍数")
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    # 日志照常生成记录，但不输出，保留原实现记录 ERROR 的开销
+    logging.basicConfig(level=logging.WARNING, handlers=[logging.NullHandler()])
+
+    base = load_corpus(FIXTURE)
+    corpus = base * args.repeat
+    now = datetime(2025, 5, 21, 12, 0, 0)
+
+    legacy_time, legacy = timed(lambda: [legacy_to_timestamp(text) for _, text in corpus], args.rounds)
+    new_time, parsed = timed(lambda: [to_timestamp(text, site, now=now) for site, text in corpus], args.rounds)
+
+    report = {
+        "strings": len(corpus),
+        "distinct": len(base),
+        "legacy_parsed": sum(1 for r in legacy if r is not None),
+        "parsed": sum(1 for r in parsed if r is not None),
+        "legacy_seconds": round(legacy_time, 4),
+        "seconds": round(new_time, 4),
+        "legacy_us_per_string": round(legacy_time / len(corpus) * 1e6, 2),
+        "us_per_string": round(new_time / len(corpus) * 1e6, 2),
+        "speedup": round(legacy_time / new_time, 2) if new_time else None,
+        "unparsed": sorted({text for (_, text), r in zip(corpus, parsed) if r is None}),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
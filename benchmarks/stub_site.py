@@ -0,0 +1,208 @@
+"""
+基准测试用的本地模拟网站：按 benchmarks/fixtures/stub_site 下的模板生成分页列表页与详情页。
+
+每个网站可以单独设置页数、每页条目数、响应延迟与错误率，页面内容由网站名与页码确定，
+多次运行生成的页面完全相同。错误按 (网站, 路径, 第几次请求) 确定，同一页面重试后可以成功。
+
+  GET /<网站>/list_<页码>.htm      列表页（ul.news-list > li，最后一页没有“下一页”）
+  GET /<网站>/info/<页码>_<序号>.htm 详情页
+  GET /_stats                       各网站的请求数、错误数与发送字节数（JSON）
+
+单独运行（项目根目录）：
+    python benchmarks/stub_site.py --port 8800 --pages 20 --latency-ms 50 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import quote, unquote
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'stub_site')
+
+WORDS = ['学校', '学院', '实验室', '图书馆', '后勤', '科研', '教学', '设备', '工程', '建设', '维修', '改造',
+         '服务', '平台', '系统', '项目', '会议', '信息', '专家', '评审']
+KINDS = ['招标公告', '采购公告', '中标公示', '成交结果', '询价公告', '竞争性磋商公告', '通知', '公示']
+
+
+class SiteProfile:
+    """一个模拟网站：pages 个列表页，每页 items_per_page 条；latency_ms 为每个请求的延迟，error_rate 为返回 503 的概率"""
+
+    def __init__(self, name: str, pages: int = 10, items_per_page: int = 20,
+                 latency_ms: float = 0, error_rate: float = 0.0):
+        self.name = name
+        self.pages = pages
+        self.items_per_page = items_per_page
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "pages": self.pages, "items_per_page": self.items_per_page,
+                "latency_ms": self.latency_ms, "error_rate": self.error_rate}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SiteProfile":
+        return cls(**data)
+
+    def item(self, page: int, index: int) -> dict:
+        """第 page 页第 index 条（页码越大发布时间越早）"""
+        rng = random.Random(f"{self.name}/{page}/{index}")
+        title = ''.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))) + rng.choice(KINDS)
+        published = date(2025, 9, 1) - timedelta(days=((page - 1) * self.items_per_page + index) // 3)
+        return {"title": title, "date": published.isoformat(), "publisher": rng.choice(WORDS) + '处',
+                "path": f"info/{page}_{index}.htm"}
+
+
+class StubSite:
+    """在后台线程中运行的模拟网站服务器"""
+
+    def __init__(self, profiles: list, host: str = '127.0.0.1', port: int = 0):
+        self.profiles = {profile.name: profile for profile in profiles}
+        with open(os.path.join(FIXTURES, 'listing.html'), encoding='utf-8') as f:
+            self.listing_template = Template(f.read())
+        with open(os.path.join(FIXTURES, 'detail.html'), encoding='utf-8') as f:
+            self.detail_template = Template(f.read())
+        self.stats = defaultdict(lambda: {"requests": 0, "errors": 0, "bytes": 0})
+        self._attempts = defaultdict(int)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def listing_url(self, site: str, page: int = 1) -> str:
+        return f"{self.base_url}/{quote(site)}/list_{page}.htm"
+
+    def start(self) -> "StubSite":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub_site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {site: dict(counts) for site, counts in self.stats.items()}
+
+    def render_listing(self, profile: SiteProfile, page: int) -> str:
+        rows = []
+        for index in range(profile.items_per_page):
+            item = profile.item(page, index)
+            rows.append(f'<li><a href="{item["path"]}" title="{item["title"]}">{item["title"]}</a>'
+                        f'<span class="time">{item["date"]}</span></li>')
+        pager = [f'<span class="current">{page}/{profile.pages}</span>']
+        if page > 1:
+            pager.insert(0, f'<a class="prev" href="list_{page - 1}.htm">上一页</a>')
+        if page < profile.pages:
+            pager.append(f'<a class="next" href="list_{page + 1}.htm">下一页</a>')
+        return self.listing_template.substitute(site=profile.name, page=page, items='\n'.join(rows),
+                                                pager=''.join(pager))
+
+    def render_detail(self, profile: SiteProfile, page: int, index: int) -> str:
+        item = profile.item(page, index)
+        rng = random.Random(item["path"])
+        body = '\n'.join('<p>' + ''.join(rng.choice(WORDS) for _ in range(40)) + '。</p>' for _ in range(8))
+        return self.detail_template.substitute(site=profile.name, title=item["title"], date=item["date"],
+                                               publisher=item["publisher"], body=body)
+
+    def route(self, path: str):
+        """返回 (网站, 状态码, 页面)"""
+        parts = unquote(path.split('?', 1)[0]).strip('/').split('/')
+        profile = self.profiles.get(parts[0])
+        if profile is None or len(parts) < 2:
+            return None, 404, ''
+        try:
+            if len(parts) == 2 and parts[1].startswith('list_'):
+                page = int(parts[1][5:-4])
+                if 1 <= page <= profile.pages:
+                    return profile, 200, self.render_listing(profile, page)
+            elif len(parts) == 3 and parts[1] == 'info':
+                page, index = (int(n) for n in parts[2][:-4].split('_'))
+                if 1 <= page <= profile.pages and 0 <= index < profile.items_per_page:
+                    return profile, 200, self.render_detail(profile, page, index)
+        except ValueError:
+            pass
+        return profile, 404, ''
+
+    def _should_fail(self, profile: SiteProfile, path: str) -> bool:
+        if profile.error_rate <= 0:
+            return False
+        with self._lock:
+            self._attempts[path] += 1
+            attempt = self._attempts[path]
+        return random.Random(f"{path}#{attempt}").random() < profile.error_rate
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头与响应体分两次写出，不关闭 Nagle 时 keep-alive 连接上每个请求会多等一个延迟确认（约 40ms）
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/_stats':
+                    return self._send(200, json.dumps(stub.snapshot(), ensure_ascii=False),
+                                      'application/json')
+                profile, status, html = stub.route(self.path)
+                if profile is not None and profile.latency_ms:
+                    time.sleep(profile.latency_ms / 1000)
+                if profile is not None and status == 200 and stub._should_fail(profile, self.path):
+                    status, html = 503, ''
+                size = self._send(status, html)
+                if profile is not None:
+                    with stub._lock:
+                        counts = stub.stats[profile.name]
+                        counts["requests"] += 1
+                        counts["errors"] += status != 200
+                        counts["bytes"] += size
+
+            def _send(self, status, text, content_type='text/html; charset=utf-8'):
+                body = text.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return len(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基准测试用的本地模拟网站")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--sites', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--items-per-page', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    profiles = [SiteProfile(f"site{i}", args.pages, args.items_per_page, args.latency_ms, args.error_rate)
+                for i in range(args.sites)]
+    stub = StubSite(profiles, port=args.port)
+    for profile in profiles:
+        print(stub.listing_url(profile.name))
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,18 @@
 import logging
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import threading
 from logs.logger_config import LoggerConfig
 from caiji.utils.read_base import read_base
-from caiji.utils.operate_base import mark_running, mark_idle
+from caiji.utils.operate_base import mark_running, mark_idle, begin_sweep, finish_sweep
 from caiji.utils.send_heartbeat import send_caiji_heartbeat
 from caiji.utils.pool_synchronization import sync_crawler_config_to_pool
-from caiji.main.keyword_transmit import run_spiders_from_pool
+from caiji.main.keyword_transmit import run_spiders_from_pool, run_distributed_sweep
+from caiji.utils.config_loader import load_config
+from caiji.utils.task_lease import TaskLease, count_unfinished
+from caiji.utils.task_scheduler import SchedulePolicy, TaskScheduler
+from caiji.utils.adaptive_interval import record_yields
+from caiji.utils.task_watchdog import get_watchdog
 from app import create_app
 
 app = create_app()
@@ -15,12 +20,17 @@ BASE_ID = 1
 
 
 def heartbeat_loop(logger):
-    """每30秒发送一次爬虫心跳"""
+    """每30秒发送一次爬虫心跳，附带执行时间最长的任务及其开始时间"""
+    watchdog = get_watchdog(logger)
     with app.app_context():
         while True:
             try:
-                send_caiji_heartbeat()
-                logger.info(f"发送心跳")
+                task = watchdog.oldest()
+                send_caiji_heartbeat(task)
+                if task is not None:
+                    logger.info(f"发送心跳，当前任务：{task.label}，已运行 {task.elapsed():.0f} 秒")
+                else:
+                    logger.info(f"发送心跳")
             except Exception as e:
                 logger.info(f"发送心跳异常: {e}")
             time.sleep(30)
@@ -43,6 +53,14 @@ def main():
     # 启动心跳线程
     threading.Thread(target=heartbeat_loop, args=(logger,), daemon=True).start()
 
+    config = load_config()
+    if config.getboolean('CRAWLER', 'distributed', fallback=False):
+        distributed_loop(logger, config)
+        return
+    if config.getboolean('SCHEDULE', 'enabled', fallback=False):
+        scheduled_loop(logger, config)
+        return
+
     while True:
         try:
             base, switch_status, frequency = read_base(BASE_ID)
@@ -53,40 +71,177 @@ def main():
                 time.sleep(60)
                 continue
 
-            next_run_time = base.next_run_time
-            if not next_run_time or now >= next_run_time.replace(tzinfo=None):
-                # 标记运行中并设置下次运行时间
+            # 开启新一轮（标记运行中并设置下次运行时间），或继续上次中断的一轮
+            try:
+                generation, is_new = begin_sweep(base.id)
+            except Exception:
+                logger.exception("标记运行状态失败")
+                time.sleep(60)
+                continue
+
+            if generation is not None:
                 try:
-                    mark_running(base.id, frequency)
-                    logger.info(f"开始爬取，设置下次运行时间为当前时间 + {frequency} 小时")
+                    if is_new:
+                        logger.info(f"开始第 {generation} 轮爬取，设置下次运行时间为当前时间 + {frequency} 小时")
+                        # 调用pool_synchronization.py
+                        result = sync_crawler_config_to_pool(logger)
+                        logger.info(f"Pool同步完成: {result}")
+                    else:
+                        # 上次运行中断（进程退出、部署重启等），只执行本轮尚未完成的任务
+                        logger.info(f"继续第 {generation} 轮爬取，未完成任务：{count_unfinished(generation)['pending']} 个")
+                    # 调用拆分出来的爬虫函数
+                    summary = run_spiders_from_pool(logger, generation=generation)
+                    record_run_yields(logger, summary, frequency)
                 except Exception:
-                    logger.exception("标记运行状态失败")
+                    # 本轮保持未完成，下次循环从断点继续
+                    logger.exception("爬虫运行中发生异常")
                     time.sleep(60)
                     continue
 
                 try:
-                    # 调用pool_synchronization.py
-                    result = sync_crawler_config_to_pool(logger)
-                    logger.info(f"Pool同步完成: {result}")
-                    # 调用拆分出来的爬虫函数
-                    run_spiders_from_pool(logger)
+                    if finish_sweep(base.id, generation):
+                        logger.info(f"第 {generation} 轮完成，爬虫状态已重置为空闲")
+                    else:
+                        logger.warning(f"第 {generation} 轮仍有未完成的任务，稍后继续")
+                        time.sleep(60)
                 except Exception:
-                    logger.exception("爬虫运行中发生异常")
-                finally:
-                    try:
-                        mark_idle(base.id)
-                        logger.info("爬虫状态已重置为空闲")
-                    except Exception:
-                        logger.exception("重置爬虫状态失败")
+                    logger.exception("重置爬虫状态失败")
 
             else:
                 # 还未到运行时间
-                wait_minutes = int((next_run_time - now).total_seconds() // 60)
+                next_run_time = base.next_run_time
+                wait_minutes = int((next_run_time.replace(tzinfo=None) - now).total_seconds() // 60)
                 logger.info(f"未到下次运行时间（{next_run_time}），剩余约 {wait_minutes} 分钟")
                 mark_idle(base.id)
                 logger.info("爬虫状态已重置为空闲")
-                time.sleep(min(60, wait_minutes * 60))
+                time.sleep(min(60, max(wait_minutes, 1) * 60))
+
+        except Exception as e:
+            logger.exception(f"循环中出现异常：{e}")
+            time.sleep(60)
+
+
+def record_run_yields(logger, summary, frequency) -> dict:
+    """记录本批任务的新增结果数并更新自适应间隔，返回 {task_id: 新间隔（分钟）}；失败时只记录日志"""
+    if not summary or not summary["results"]:
+        return {}
+    try:
+        return record_yields(summary["results"], SchedulePolicy.from_config(frequency), logger=logger)
+    except Exception:
+        logger.exception("记录任务产出失败")
+        return {}
+
+
+def distributed_loop(logger, config):
+    """
+    分布式模式：任意台机器上的任意个 runcaiji.py 进程共同执行同一轮任务。
+
+    - 到运行时间后由第一个 worker 开启新一轮（generation + 1）并同步 crawl_pool，其它 worker 直接加入
+    - 各 worker 通过租约领取任务，执行完标记为本轮已完成；异常退出的 worker 租约过期后任务被重新领取
+    - 本轮全部任务完成后 crawler_status 才置为空闲
+    """
+    lease = TaskLease(
+        lease_seconds=config.getint('CRAWLER', 'lease_seconds', fallback=300),
+        logger=logger,
+    )
+    poll_interval = config.getint('CRAWLER', 'poll_interval', fallback=30)
+    logger.info(f"分布式模式启动，worker：{lease.worker_id}")
+
+    while True:
+        try:
+            base, switch_status, frequency = read_base(BASE_ID)
+
+            if switch_status != 1:
+                logger.info("爬虫开关关闭，等待中...")
+                time.sleep(60)
+                continue
+
+            generation, is_new = begin_sweep(BASE_ID)
+            if generation is None:
+                logger.info(f"未到下次运行时间（{base.next_run_time}），等待中...")
+                time.sleep(poll_interval)
+                continue
+
+            if is_new:
+                logger.info(f"开启第 {generation} 轮，设置下次运行时间为当前时间 + {frequency} 小时")
+                result = sync_crawler_config_to_pool(logger)
+                logger.info(f"Pool同步完成: {result}")
+            else:
+                logger.info(f"加入第 {generation} 轮")
+
+            try:
+                summary = run_distributed_sweep(logger, lease, generation)
+            finally:
+                lease.release()
+            record_run_yields(logger, summary, frequency)
+
+            if finish_sweep(BASE_ID, generation):
+                logger.info(f"第 {generation} 轮全部任务完成，爬虫状态已重置为空闲")
+            else:
+                # 其它 worker 仍在执行；等待一段时间后重新领取（包括租约过期的任务）
+                logger.info(f"第 {generation} 轮尚未结束：{count_unfinished(generation)}")
+                time.sleep(poll_interval)
+
+        except Exception as e:
+            logger.exception(f"循环中出现异常：{e}")
+            time.sleep(60)
+
+
+def scheduled_loop(logger, config):
+    """
+    调度模式：每个 crawl_pool 任务按自己的间隔到期执行，不再整池一轮一轮地跑。
+
+    - 每隔 sync_minutes 同步一次 crawl_pool，并按最新配置重新加载调度队列
+    - 主循环取出已到期的任务（每批最多 max_batch 个，批次短则新到期的任务等待时间短）执行，
+      执行后（无论成功与否）按各自的间隔重新排期
+    - base_crawlers.next_run_time 记录调度队列中最早的到期时间
+    """
+    sync_interval = timedelta(minutes=config.getfloat('SCHEDULE', 'sync_minutes', fallback=10))
+    max_batch = config.getint('SCHEDULE', 'max_batch', fallback=50)
+    tick = config.getint('SCHEDULE', 'tick_seconds', fallback=30)
+    scheduler = None
+    last_sync = None
+    logger.info("调度模式启动")
+
+    while True:
+        try:
+            base, switch_status, frequency = read_base(BASE_ID)
+
+            if switch_status != 1:
+                logger.info("爬虫开关关闭，等待中...")
+                time.sleep(60)
+                continue
+
+            now = datetime.utcnow()
+            if scheduler is None or now - last_sync >= sync_interval:
+                result = sync_crawler_config_to_pool(logger)
+                logger.info(f"Pool同步完成: {result}")
+                scheduler = TaskScheduler(SchedulePolicy.from_config(frequency), logger=logger)
+                scheduler.reload()
+                last_sync = now
+
+            due = scheduler.pop_due(now, limit=max_batch)
+            if not due:
+                next_due = scheduler.next_due_at()
+                wait = tick if next_due is None else min(tick, max((next_due - now).total_seconds(), 1))
+                time.sleep(wait)
+                continue
+
+            mark_running(base.id, frequency, next_run_time=scheduler.next_due_at())
+            logger.info(f"执行 {len(due)} 个到期任务，队列中剩余 {len(scheduler) - len(due)} 个")
+            summary = None
+            try:
+                summary = run_spiders_from_pool(logger, tasks=due)
+            except Exception:
+                logger.exception("爬虫运行中发生异常")
+            finally:
+                intervals = record_run_yields(logger, summary, frequency)
+                scheduler.reschedule([task["id"] for task in due], intervals=intervals)
+                try:
+                    mark_idle(base.id)
+                except Exception:
+                    logger.exception("重置爬虫状态失败")
 
         except Exception as e:
             logger.exception(f"循环中出现异常：{e}")
-            time.sleep(60)
\ No newline at end of file
+            time.sleep(60)
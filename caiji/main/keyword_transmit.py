@@ -1,44 +1,754 @@
 import json
+import inspect
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import partial
+from flask import current_app
 from app.models.crawl_pool import CrawlPool
 from caiji.main.modules_logs import get_module_logger
-导入类
+from caiji.utils.config_loader import load_config
+from caiji.utils.fetcher import get_fetcher
+from caiji.utils.browser_pool import get_browser_pool
+from caiji.utils.fetch_mode import get_fetch_mode_selector
+from caiji.utils.rate_limiter import get_rate_limiter
+from caiji.utils.incremental import IncrementalTracker
+from caiji.utils.seen_index import get_seen_index
+from caiji.utils.url_canonical import get_legacy_url_index, get_url_canonicalizer
+from caiji.utils.near_duplicate import get_near_duplicate_index
+from caiji.utils.common import get_item_field
+from caiji.utils.result_writer import ResultWriter, build_result_rows
+from caiji.utils.keyword_matcher import get_matcher
+from caiji.utils.spider_registry import get_spider_registry
+from caiji.utils.sweep_checkpoint import SweepCheckpoint, unfinished_tasks
+from caiji.utils.task_watchdog import TaskCancelled, get_watchdog
+from caiji.utils.crawl_telemetry import TelemetryRecorder
+from caiji.utils.fetch_stats import attach_stats, collect_stats
 
 
-def run_spiders_from_pool(logger):
-    """按 crawl_pool 配置顺序执行爬虫任务"""
-    # 从 crawl_pool 表里获取所有任务，按 id 顺序读取
-    tasks = CrawlPool.query.order_by(CrawlPool.id).all()
+def load_crawler_settings() -> dict:
+    """
+    读取 config.ini 中 [CRAWLER] 段的配置：
+      - max_workers: 同时运行的任务总数上限，<=1 时按顺序执行
+      - per_site_limit: 同一个 website_names 同时在跑的任务上限
+      - incremental: 是否开启增量抓取
+      - incremental_stop_after: 连续遇到多少条已保存条目后停止翻页
+      - incremental_known_limit: 每个任务读取最近多少条已保存记录用于增量判定（<=0 为全部）
+      - fan_in: 支持按网站汇总抓取的爬虫是否每个网站只抓一次列表、在本地匹配全部关键词
+      - url_canonical: 去重与保存前是否按网站规则规范化 detail_url（[URL_CANONICAL] enabled）
+      - seen_index: 是否使用进程内 URL 索引（[SEEN_INDEX] enabled）在保存前去重
+      - near_duplicate: 是否计算标题指纹并关联其它网站转载的同一公告（[NEAR_DUPLICATE] enabled）
+      - bulk_write / write_batch_size / write_flush_interval: 批量写入配置（[WRITER] 段）
+      - checkpoint_interval: 每隔多少秒保存一次本轮已完成的任务（中断后据此续跑）
+      - checkpoint_max_attempts: 失败、超时的任务在同一进程的一轮中最多执行几次，之后记为完成
+      - telemetry: 是否把每轮及每个任务的执行情况写入 crawl_runs / crawl_task_runs（[TELEMETRY] 段）
+    """
+    config = load_config()
+    return {
+        "max_workers": max(config.getint('CRAWLER', 'max_workers', fallback=1), 1),
+        "per_site_limit": max(config.getint('CRAWLER', 'per_site_limit', fallback=1), 1),
+        "incremental": config.getboolean('CRAWLER', 'incremental', fallback=True),
+        "incremental_stop_after": config.getint('CRAWLER', 'incremental_stop_after', fallback=10),
+        "incremental_known_limit": config.getint('CRAWLER', 'incremental_known_limit', fallback=2000),
+        "fan_in": config.getboolean('CRAWLER', 'fan_in', fallback=True),
+        "url_canonical": config.getboolean('URL_CANONICAL', 'enabled', fallback=True),
+        "seen_index": config.getboolean('SEEN_INDEX', 'enabled', fallback=True),
+        "near_duplicate": config.getboolean('NEAR_DUPLICATE', 'enabled', fallback=True),
+        "bulk_write": config.getboolean('WRITER', 'enabled', fallback=True),
+        "write_batch_size": config.getint('WRITER', 'batch_size', fallback=500),
+        "write_flush_interval": config.getfloat('WRITER', 'flush_interval', fallback=2.0),
+        "checkpoint_interval": max(config.getfloat('CRAWLER', 'checkpoint_interval', fallback=30), 0),
+        "checkpoint_max_attempts": config.getint('CRAWLER', 'checkpoint_max_attempts', fallback=3),
+        "telemetry": config.getboolean('TELEMETRY', 'enabled', fallback=True),
+        "telemetry_batch_size": config.getint('TELEMETRY', 'batch_size', fallback=500),
+    }
+
+
+def build_spider(spider_class, task: dict, logger, **services):
+    """
+    初始化爬虫。services 为框架提供的共享服务（如 fetcher），
+    只传入爬虫构造函数声明了的参数，未升级的旧爬虫不受影响。
+    """
+    kwargs = dict(
+        category=task["category"],
+        keyword=task["keyword"],
+        config_name=task["config_names"],
+        website_name=task["website_names"],
+        source_url=task["source_url"],
+        logger=logger,
+    )
+    params = inspect.signature(spider_class.__init__).parameters
+    accepts_any = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values())
+    for name, service in services.items():
+        if accepts_any or name in params:
+            kwargs[name] = service
+    return spider_class(**kwargs)
 
-    SPIDER_MAP = {
-        "网站名": 类名,
+
+def site_services(website_name: str, logger) -> dict:
+    """
+    网站级共享服务：fetcher（按 host 复用连接并限速）、browser_pool（浏览器池，未启用时不提供）、
+    page_loader（按网站自动选择 HTTP 或浏览器抓取列表页）。
+    """
+    fetcher = get_fetcher(logger)
+    browser_pool = get_browser_pool(logger)
+    services = {
+        "fetcher": fetcher.bind(website_name),
+        "page_loader": get_fetch_mode_selector(fetcher, browser_pool, logger).bind(website_name),
     }
+    if browser_pool is not None:
+        services["browser_pool"] = browser_pool
+    return services
 
-    for task in tasks:
-        try:
-            spider_class = SPIDER_MAP.get(task.website_names)
-            if not spider_class:
-                logger.warning(f"未匹配到爬虫类，跳过：{task.website_names}")
-                continue
 
-            logger.info(f"启动爬虫：{task.website_names}，关键词：{task.keyword}")
+def supports_fan_in(spider_class) -> bool:
+    """
+    爬虫类声明 supports_fan_in = True 并实现 crawl_listing()（返回网站最新列表条目，不按关键词过滤）时，
+    可以按网站汇总抓取；只支持服务端搜索的爬虫保持按关键词逐个抓取。
+    """
+    return bool(getattr(spider_class, 'supports_fan_in', False)) and callable(
+        getattr(spider_class, 'crawl_listing', None))
+
+
+def _new_result(task: dict, status: str = "skipped", error: str = None) -> dict:
+    return {
+        "task_id": task["id"],
+        "website_name": task["website_names"],
+        "keyword": task["keyword"],
+        "status": status,
+        "fetched": 0,
+        "items": 0,
+        "error": error,
+    }
+
+
+def _site_canonicalize(website_name: str, logger, settings: dict):
+    """该网站的 URL 规范化函数，未开启规范化时为 None"""
+    if not settings["url_canonical"]:
+        return None
+    return partial(get_url_canonicalizer(logger).canonicalize, website_name=website_name)
+
+
+def _legacy_urls(website_name: str, keyword, logger, settings: dict):
+    """该网站规范化之前保存的旧记录规范化后的 URL，未开启规范化时为 None"""
+    if not settings["url_canonical"]:
+        return None
+    return get_legacy_url_index(logger).known(website_name, keyword)
+
+
+def _canonicalize_items(items: list, website_name: str, tracker, logger, settings: dict) -> list:
+    """
+    去重前按网站规则规范化 detail_url（原链接保存在 original_url），并合并规范化后重复的条目。
+    开启增量抓取时用已保存的 URL 统计规范化识别出的重复。
+    规范化后与旧记录相同的条目直接去掉：旧记录保存的是原写法，URL 索引与唯一约束都识别不出，
+    不开启增量抓取时也不会重复保存。
+    """
+    if not settings["url_canonical"] or not items:
+        return items
+    known_urls = tracker.known_urls if tracker is not None else None
+    items = get_url_canonicalizer(logger).apply(items, website_name, known_urls)
+    legacy = _legacy_urls(website_name, None, logger, settings)
+    if legacy:
+        fresh = [item for item in items if get_item_field(item, 'detail_url') not in legacy]
+        if len(fresh) < len(items):
+            logger.info(f"{website_name} 跳过 {len(items) - len(fresh)} 条规范化之前已保存的记录")
+        items = fresh
+    return items
+
+
+def _store_items(task: dict, items: list, spider, logger, settings: dict, writer: ResultWriter = None) -> int:
+    """
+    去重并保存一个任务的条目，返回交给保存的条目数。
+    传入 writer 时结果交给批量写入线程，否则由爬虫自己的 save() 保存。
+    """
+    # URL 索引去重：Bloom 判定为新的条目直接保存，可能重复的条目才查库确认
+    seen_index = get_seen_index(logger) if settings["seen_index"] else None
+    if seen_index is not None and items:
+        items, existing = seen_index.partition(items)
+        if existing:
+            logger.info(f"{task['website_names']}（{task['keyword']}）URL 索引去重："
+                        f"跳过 {len(existing)} 条已存在记录")
+
+    if writer is not None:
+        rows = build_result_rows(items, task)
+        writer.submit(rows, task_id=task["id"])
+        logger.info(f"{task['website_names']}（{task['keyword']}）已提交 {len(rows)} 条记录到批量写入队列")
+    else:
+        spider.save(items)
+        logger.info(f"{task['website_names']}（{task['keyword']}）数据已保存至数据库")
+        if settings["near_duplicate"]:
+            links = get_near_duplicate_index(logger).link_saved(
+                [get_item_field(item, 'detail_url') for item in items])
+            if links:
+                logger.info(f"{task['website_names']}（{task['keyword']}）{len(links)} 条为其它网站已发布公告的近重复")
+
+    if seen_index is not None:
+        seen_index.add_many(get_item_field(item, 'detail_url') for item in items)
+    return len(items)
+
+
+def run_single_task(task: dict, logger, settings: dict = None, writer: ResultWriter = None) -> dict:
+    """
+    执行单个 crawl_pool 任务（爬取 + 保存）。
+    task 为 CrawlPool.to_dict() 的快照，避免跨线程共享 ORM 对象；
+    settings 为 load_crawler_settings() 的结果，批量执行时只读取一次。
+    返回该任务的执行结果：{"task_id", "website_name", "keyword", "status", "fetched", "items", "error"}
+    """
+    result = _new_result(task)
+
+    settings = settings or load_crawler_settings()
+    spider_class = get_spider_registry(logger).get(task["website_names"])
+    if not spider_class:
+        logger.warning(f"未匹配到爬虫类，跳过：{task['website_names']}")
+        return result
+
+    try:
+        logger.info(f"启动爬虫：{task['website_names']}，关键词：{task['keyword']}")
 
-            # 初始化爬虫
-            spider = spider_class(
-                category=task.category,
-                keyword=task.keyword,
-                config_name=task.config_names,
-                website_name=task.website_names,
-                source_url=task.source_url,
-                logger=logger
+        services = site_services(task["website_names"], logger)
+
+        # 增量模式：爬虫翻页时对照已保存的 detail_url，连续命中一定数量后停止
+        tracker = None
+        if settings["incremental"]:
+            tracker = IncrementalTracker.for_task(
+                task["website_names"], task["keyword"],
+                stop_after=settings["incremental_stop_after"],
+                known_limit=settings["incremental_known_limit"], logger=logger,
+                canonicalize=_site_canonicalize(task["website_names"], logger, settings),
+                legacy_urls=_legacy_urls(task["website_names"], task["keyword"], logger, settings)
+            )
+            services["incremental"] = tracker
+
+        # 初始化爬虫，网络请求统一走共享的 fetcher（按 host 复用 keep-alive 连接）
+        spider = build_spider(spider_class, task, logger, **services)
+
+        # 执行爬虫
+        crawl_start = time.monotonic()
+        items = spider.crawl()
+        result["crawl_seconds"] = time.monotonic() - crawl_start
+        result["fetched"] = len(items)
+        logger.info(f"{task['website_names']} 爬取完成，共获取 {len(items)} 条记录")
+
+        items = _canonicalize_items(items, task["website_names"], tracker, logger, settings)
+        if tracker is not None:
+            fetched = len(items)
+            items = tracker.filter_new(items)
+            logger.info(f"{task['website_names']} 增量过滤：新条目 {len(items)} 条，"
+                        f"已存在 {fetched - len(items)} 条")
+
+        # 保存结果
+        result["items"] = _store_items(task, items, spider, logger, settings, writer)
+        result["status"] = "success"
+
+    except TaskCancelled as e:
+        logger.warning(f"任务超时（{task['website_names']}）：{e}")
+        result["status"] = "timeout"
+        result["error"] = str(e)
+    except Exception as e:
+        logger.error(f"任务执行失败（{task['website_names']}）：{e}", exc_info=True)
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    return result
+
+
+def run_fan_in_site(tasks: list, logger, settings: dict = None, writer: ResultWriter = None) -> list:
+    """
+    按网站汇总抓取：同一网站的全部任务只抓一次最新列表，
+    再用每条标题匹配该网站订阅的所有关键词，命中的条目归入对应任务保存
+    （keyword/config_name/category 取自该任务）。
+    返回每个任务各自的执行结果。
+    """
+    settings = settings or load_crawler_settings()
+    website_name = tasks[0]["website_names"]
+    spider_class = get_spider_registry(logger).get(website_name)
+    results = {task["id"]: _new_result(task) for task in tasks}
+    if not spider_class:
+        logger.warning(f"未匹配到爬虫类，跳过：{website_name}")
+        return list(results.values())
+
+    # 以网站为单位构造爬虫：keyword 为空，config_name 为所有任务配置名的并集
+    config_names = sorted({name for task in tasks for name in (task["config_names"] or [])})
+    site_task = dict(tasks[0], keyword=None, config_names=config_names)
+
+    try:
+        logger.info(f"启动爬虫（按网站汇总）：{website_name}，共 {len(tasks)} 个关键词")
+
+        services = site_services(website_name, logger)
+        tracker = None
+        if settings["incremental"]:
+            tracker = IncrementalTracker.for_task(
+                website_name, None, stop_after=settings["incremental_stop_after"],
+                known_limit=settings["incremental_known_limit"], logger=logger,
+                canonicalize=_site_canonicalize(website_name, logger, settings),
+                legacy_urls=_legacy_urls(website_name, None, logger, settings)
             )
+            services["incremental"] = tracker
+
+        spider = build_spider(spider_class, site_task, logger, **services)
+        crawl_start = time.monotonic()
+        items = spider.crawl_listing()
+        # 列表只抓取一次，爬取耗时只记在第一个任务上，按任务合计时不重复
+        next(iter(results.values()))["crawl_seconds"] = time.monotonic() - crawl_start
+        logger.info(f"{website_name} 列表抓取完成，共获取 {len(items)} 条记录")
 
-            # 执行爬虫
-            items = spider.crawl()
-            logger.info(f"{task.website_names} 爬取完成，共获取 {len(items)} 条记录")
+        items = _canonicalize_items(items, website_name, tracker, logger, settings)
+        if tracker is not None:
+            fetched = len(items)
+            items = tracker.filter_new(items)
+            logger.info(f"{website_name} 增量过滤：新条目 {len(items)} 条，已存在 {fetched - len(items)} 条")
 
-            # 保存结果
-            spider.save(items)
-            logger.info(f"{task.website_names} 数据已保存至数据库")
+        # 本地匹配：该网站全部关键词编译为一个自动机，每条标题只扫描一遍，命中哪个关键词就归入哪个任务
+        task_by_keyword = {task["keyword"]: task for task in tasks}
+        matcher = get_matcher({task["keyword"]: set(task["config_names"] or []) for task in tasks})
+        matched = defaultdict(list)
+        for item in items:
+            for keyword in matcher.match_keywords(get_item_field(item, 'title')):
+                matched[keyword].append(item)
+        logger.info(f"{website_name} 关键词匹配完成，命中 {sum(len(v) for v in matched.values())} 条")
+    except TaskCancelled as e:
+        logger.warning(f"任务超时（{website_name}）：{e}")
+        for result in results.values():
+            result.update(status="timeout", error=str(e))
+        return list(results.values())
+    except Exception as e:
+        logger.error(f"任务执行失败（{website_name}）：{e}", exc_info=True)
+        error = f"{type(e).__name__}: {e}"
+        for result in results.values():
+            result.update(status="failed", error=error)
+        return list(results.values())
 
+    for keyword, task in task_by_keyword.items():
+        result = results[task["id"]]
+        try:
+            task_items = [_with_keyword(item, keyword) for item in matched.get(keyword, [])]
+            result["fetched"] = len(task_items)
+            result["items"] = _store_items(task, task_items, spider, logger, settings, writer)
+            result["status"] = "success"
         except Exception as e:
-            logger.error(f"任务执行失败（{task.website_names}）：{e}", exc_info=True)
+            logger.error(f"任务保存失败（{website_name}，{keyword}）：{e}", exc_info=True)
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return list(results.values())
+
+
+def _with_keyword(item, keyword: str) -> dict:
+    """复制条目并写入命中的关键词，同一条目可能被多个关键词命中"""
+    if isinstance(item, dict):
+        data = dict(item)
+    else:
+        data = {field: get_item_field(item, field)
+                for field in ('title', 'detail_url', 'original_url', 'publish_time', 'publisher')}
+    data['keyword'] = keyword
+    return data
+
+
+def plan_jobs(tasks: list, settings: dict) -> list:
+    """
+    把任务组织为执行单元：支持汇总抓取的网站合并为一个单元，其余每个任务一个单元。
+    单元格式：{"website_names", "tasks", "fan_in"}
+    """
+    jobs = []
+    fan_in_sites = {}
+    registry = get_spider_registry()
+    for task in tasks:
+        site = task["website_names"]
+        spider_class = registry.get(site) if settings["fan_in"] else None
+        if spider_class and supports_fan_in(spider_class):
+            if site not in fan_in_sites:
+                fan_in_sites[site] = {"website_names": site, "tasks": [], "fan_in": True}
+                jobs.append(fan_in_sites[site])
+            fan_in_sites[site]["tasks"].append(task)
+        else:
+            jobs.append({"website_names": site, "tasks": [task], "fan_in": False})
+    return jobs
+
+
+def job_label(job: dict) -> str:
+    if job["fan_in"]:
+        return f"{job['website_names']}（按网站汇总 {len(job['tasks'])} 个关键词）"
+    return f"{job['website_names']}（{job['tasks'][0]['keyword']}）"
+
+
+def run_job(job: dict, logger, settings: dict, writer: ResultWriter = None) -> list:
+    """
+    执行一个单元，返回其中每个任务的结果（附带耗时与抓取量）；
+    执行期间由看门狗记录当前任务并限制执行时间
+    """
+    started_at, started = datetime.utcnow(), time.monotonic()
+    with get_watchdog(logger).track(id(job), job_label(job), job["website_names"]), collect_stats() as stats:
+        if job["fan_in"]:
+            results = run_fan_in_site(job["tasks"], logger, settings, writer)
+        else:
+            results = [run_single_task(job["tasks"][0], logger, settings, writer)]
+    crawl_seconds = sum(r.get("crawl_seconds", 0.0) for r in results)
+    attach_stats(results, stats, started_at, started, crawl_seconds)
+    return results
+
+
+def run_spiders_from_pool(logger, max_workers=None, per_site_limit=None, tasks=None, generation=None):
+    """
+    执行 crawl_pool 中的全部爬虫任务（传入 tasks 时只执行这些任务，如调度器取出的到期任务）。
+    传入 generation 时只执行第 generation 轮尚未完成的任务，执行过程中把完成的任务记入
+    crawl_pool.done_generation，进程中断后以同一 generation 再次调用即从断点继续。
+
+    - max_workers <= 1 时按 id 顺序逐个执行（与原行为一致）；启用看门狗时放在单个工作线程中
+      （按网站轮流），卡死的任务超时后可以跳过
+    - 否则使用多个工作线程并发执行，同一个 website_names 同时在跑的任务不超过 per_site_limit
+    - 支持汇总抓取的网站每轮只抓一次列表，在本地匹配全部关键词
+    - 函数在整批任务全部结束后才返回，调用方据此再重置 mark_idle
+
+    Returns:
+        dict: 本批任务的执行统计，results 中包含每个任务的结果与错误信息
+    """
+    settings = load_crawler_settings()
+    if max_workers is None:
+        max_workers = settings["max_workers"]
+    if per_site_limit is None:
+        per_site_limit = settings["per_site_limit"]
+
+    # 调度模式传入到期的任务；整池一轮（或不带 generation 的手动执行）从 crawl_pool 读取
+    mode = "scheduled" if tasks is not None else "sweep"
+    if tasks is None and generation is not None:
+        tasks = unfinished_tasks(generation)
+    elif tasks is None:
+        # 从 crawl_pool 表里获取所有任务，按 id 顺序读取
+        tasks = [t.to_dict() for t in CrawlPool.query.order_by(CrawlPool.id).all()]
+    # 重新扫描爬虫目录（只解析有改动的文件），新增的爬虫与修改过的爬虫模块（用到时重新导入）不需要重启即可生效
+    get_spider_registry(logger).discover()
+    jobs = plan_jobs(tasks, settings)
+    fan_in_jobs = [job for job in jobs if job["fan_in"]]
+    if fan_in_jobs:
+        logger.info(f"{len(fan_in_jobs)} 个网站按网站汇总抓取，合并了 "
+                    f"{sum(len(job['tasks']) for job in fan_in_jobs)} 个关键词任务")
+
+    sweep = _open_sweep(logger, settings, mode, generation)
+    checkpoint = None
+    if generation is not None:
+        checkpoint = SweepCheckpoint(generation, sweep["writer"], settings["checkpoint_interval"], logger,
+                                     max_attempts=settings["checkpoint_max_attempts"])
+    try:
+        if max_workers <= 1 and not get_watchdog(logger).enabled:
+            results = []
+            for job in jobs:
+                job_results = run_job(job, logger, settings, sweep["writer"])
+                results.extend(job_results)
+                if sweep["telemetry"] is not None:
+                    sweep["telemetry"].record(job_results)
+                if checkpoint is not None:
+                    checkpoint.record(job_results)
+        else:
+            results = _run_jobs_concurrently(jobs, logger, settings, sweep["writer"],
+                                             max(max_workers, 1), per_site_limit, checkpoint,
+                                             sweep["abandoned"], sweep["telemetry"])
+        if checkpoint is not None:
+            checkpoint.commit()
+    except Exception as e:
+        _fail_sweep(sweep, e)
+        raise
+    finally:
+        _close_sweep(logger, sweep)
+    return _summarize_sweep(logger, sweep, results)
+
+
+def run_distributed_sweep(logger, lease, generation: int, max_workers=None) -> dict:
+    """
+    分布式模式下执行第 generation 轮中本 worker 能领到的任务。
+
+    max_workers 个线程各自循环：通过 lease 领取一个网站全部待执行的任务（租约），
+    执行后先等批量写入落库再标记完成；领不到任务时线程结束。
+    同一网站的任务总是被同一个线程整体领取，因此跨 worker 时单站并发为 1。
+    返回本 worker 在这一轮执行部分的统计（格式同 run_spiders_from_pool）。
+    """
+    settings = load_crawler_settings()
+    if max_workers is None:
+        max_workers = settings["max_workers"]
+    app = current_app._get_current_object()
+    results = []
+    results_lock = threading.Lock()
+
+    get_spider_registry(logger).discover()
+    sweep = _open_sweep(logger, settings, "distributed", generation)
+    writer = sweep["writer"]
+
+    def work():
+        with app.app_context():
+            while True:
+                tasks = lease.claim_site(generation)
+                if not tasks:
+                    return
+                task_ids = [task["id"] for task in tasks]
+                try:
+                    site_results = [r for job in plan_jobs(tasks, settings)
+                                    for r in run_job(job, logger, settings, writer)]
+                    if writer is not None and not writer.flush():
+                        raise RuntimeError("批量写入未完成，任务交还给其它 worker 重新执行")
+                except Exception as e:
+                    logger.error(f"任务执行失败（{tasks[0]['website_names']}）：{e}", exc_info=True)
+                    lease.release(task_ids)
+                    continue
+                lease.complete(task_ids, generation)
+                with results_lock:
+                    results.extend(site_results)
+                if sweep["telemetry"] is not None:
+                    sweep["telemetry"].record(site_results)
+
+    lease.start_heartbeat(app)
+    try:
+        threads = [threading.Thread(target=work, name=f"caiji-{i}", daemon=True)
+                   for i in range(max(max_workers, 1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    except Exception as e:
+        _fail_sweep(sweep, e)
+        raise
+    finally:
+        lease.stop_heartbeat()
+        _close_sweep(logger, sweep)
+
+    results.sort(key=lambda r: r["task_id"])
+    return _summarize_sweep(logger, sweep, results)
+
+
+def _open_sweep(logger, settings: dict, mode: str, generation: int = None) -> dict:
+    """准备一轮任务共用的 URL 规范化计数与旧记录索引、URL 索引、近重复索引、响应缓存计数、批量写入线程与运行记录"""
+    seen_index = None
+    if settings["seen_index"]:
+        seen_index = get_seen_index(logger)
+        seen_index.refresh()
+        seen_index.reset_counters()
+
+    if settings["url_canonical"]:
+        get_url_canonicalizer(logger).reset_counters()
+        # 首次调用时读取（或建立）旧记录索引，不放到工作线程中的第一个任务里
+        get_legacy_url_index(logger)
+
+    near_duplicates = None
+    if settings["near_duplicate"]:
+        near_duplicates = get_near_duplicate_index(logger)
+        near_duplicates.refresh()
+
+    response_cache = get_fetcher(logger).response_cache
+    if response_cache is not None:
+        response_cache.reset_counters()
+
+    writer = None
+    if settings["bulk_write"]:
+        writer = ResultWriter(
+            current_app._get_current_object(),
+            batch_size=settings["write_batch_size"],
+            flush_interval=settings["write_flush_interval"],
+            near_duplicates=near_duplicates,
+            logger=logger,
+        ).start()
+
+    telemetry = None
+    if settings["telemetry"]:
+        telemetry = TelemetryRecorder(mode, generation, settings["telemetry_batch_size"], logger, writer).start()
+    # abandoned：放弃等待、线程仍未退出的单元 [(future, job)]；abandoned_alive：关闭时仍未退出的数量
+    return {"seen_index": seen_index, "response_cache": response_cache, "writer": writer,
+            "telemetry": telemetry, "url_canonical": settings["url_canonical"],
+            "abandoned": [], "abandoned_alive": 0}
+
+
+def _fail_sweep(sweep: dict, error: Exception):
+    if sweep["telemetry"] is not None:
+        sweep["telemetry"].fail(error)
+
+
+def _close_sweep(logger, sweep: dict):
+    abandoned = [(future, job) for future, job in sweep["abandoned"] if not future.done()]
+    if abandoned:
+        # 放弃等待的线程仍持有批量写入线程，停止写入前再给它们一次宽限时间
+        wait([future for future, _ in abandoned], timeout=get_watchdog(logger).grace_seconds)
+        alive = [job for future, job in abandoned if not future.done()]
+        sweep["abandoned_alive"] = len(alive)
+        if alive:
+            logger.error(f"{len(alive)} 个放弃等待的单元线程仍未退出（{'、'.join(job_label(job) for job in alive)}），"
+                         f"批量写入线程停止后它们提交的结果将被拒绝")
+    if sweep["writer"] is not None:
+        sweep["writer"].stop()
+    # 两轮之间间隔较长，本轮结束即关闭浏览器，不在空闲期间占用内存
+    browser_pool = get_browser_pool()
+    if browser_pool is not None and browser_pool.active:
+        logger.info(f"浏览器池：{browser_pool.stats()}")
+        browser_pool.close()
+
+
+def _summarize_sweep(logger, sweep: dict, results: list) -> dict:
+    writer = sweep["writer"]
+    if writer is not None:
+        for result in results:
+            result.update(writer.get_task_stats(result["task_id"]))
+        logger.info(f"批量写入完成：新增 {writer.inserted} 条（其中近重复 {writer.linked} 条），"
+                    f"重复 {writer.duplicates} 条，失败 {writer.failed} 条")
+
+    summary = {
+        "total": len(results),
+        "success": sum(1 for r in results if r["status"] == "success"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "timeout": sum(1 for r in results if r["status"] == "timeout"),
+        "items": sum(r["items"] for r in results),
+        "abandoned": sweep["abandoned_alive"],
+        "results": results,
+    }
+    logger.info(
+        f"本轮任务结束：共 {summary['total']} 个，成功 {summary['success']}，失败 {summary['failed']}，"
+        f"超时 {summary['timeout']}，跳过 {summary['skipped']}，共获取 {summary['items']} 条记录"
+    )
+    if summary["abandoned"]:
+        logger.warning(f"本轮仍有 {summary['abandoned']} 个放弃等待的单元线程未退出，其资源要到线程退出后才释放")
+    if sweep["telemetry"] is not None:
+        sweep["telemetry"].finish(summary)
+    logger.info(f"各网站当前限速（次/秒）：{get_rate_limiter().snapshot()}")
+    response_cache = sweep["response_cache"]
+    if response_cache is not None:
+        stats = response_cache.stats()
+        logger.info(f"响应缓存：命中 {stats['hits']} 次（其中 304 {stats['not_modified']} 次），"
+                    f"未命中 {stats['misses']} 次，命中率 {stats['hit_rate']:.1%}，淘汰 {stats['evicted']} 条")
+    cassette = get_fetcher(logger).cassette
+    if cassette is not None:
+        logger.info(f"HTTP 录像：{cassette.stats()}")
+    if sweep["url_canonical"]:
+        stats = get_url_canonicalizer(logger).stats()
+        logger.info(f"URL 规范化：改写 {stats['rewritten']} 条，识别出重复 {stats['collisions']} 条")
+
+    seen_index = sweep["seen_index"]
+    if seen_index is not None:
+        try:
+            seen_index.save()
+            stats = seen_index.stats()
+            logger.info(f"URL 索引已保存：{seen_index.bloom.count} 条，本轮精确校验 "
+                        f"{stats['exact_checks']} 次，其中误判 {stats['false_positives']} 次")
+        except OSError as e:
+            logger.error(f"URL 索引保存失败: {e}")
+    return summary
+
+
+def _run_jobs_concurrently(jobs, logger, settings, writer, max_workers, per_site_limit, checkpoint=None,
+                           abandoned=None, telemetry=None):
+    """
+    按网站分组调度：只有当某网站在跑的单元数低于 per_site_limit 时才提交它的下一个单元，
+    这样慢网站只会占住自己的名额，不会让其它网站的任务在线程池里排队等待。
+
+    每个单元在独立的线程中执行，同时在跑的单元不超过 max_workers。看门狗取消后仍未退出的单元
+    记为超时并不再等待，它的线程不再占用 max_workers，但在线程真正退出前继续占用所在网站的名额，
+    同一网站不会同时有两个线程在抓；其它单元都结束后该网站剩余的单元再等待一次宽限时间，
+    线程仍未退出则记为跳过。仍未退出的单元以 (future, job) 追加到 abandoned，由调用方在关闭前等待。
+    传入 telemetry 时每个单元结束即交给它记录。
+    """
+    app = current_app._get_current_object()
+    watchdog = get_watchdog(logger)
+    counter = itertools.count(1)
+
+    def start(job):
+        future = Future()
+
+        def run_in_context():
+            # 每个工作线程使用独立的应用上下文（独立的数据库 session）
+            try:
+                with app.app_context():
+                    future.set_result(run_job(job, logger, settings, writer))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run_in_context, name=f"caiji-{next(counter)}", daemon=True).start()
+        return future
+
+    def finish(job, job_results, release=True, attempted=True):
+        # 放弃等待的单元记为超时、未执行的单元记为跳过，都不会被 checkpoint 记为完成，恢复时重新执行；
+        # 未执行的单元也不计入重试次数
+        if release:
+            in_flight[job["website_names"]] -= 1
+        results.extend(job_results)
+        if telemetry is not None:
+            telemetry.record(job_results)
+        if checkpoint is not None and attempted:
+            checkpoint.record(job_results)
+
+    # 每个网站一个待执行队列，保持网站内部的 id 顺序
+    pending = defaultdict(deque)
+    for job in jobs:
+        pending[job["website_names"]].append(job)
+    site_order = list(pending.keys())
+
+    in_flight = defaultdict(int)
+    futures = {}
+    # 已放弃等待但线程还没退出的单元，退出后才释放网站名额
+    stuck = {}
+    results = []
+
+    logger.info(f"并发执行 {len(jobs)} 个单元，线程数 {max_workers}，单站并发上限 {per_site_limit}")
+
+    def submit_ready():
+        # 轮询各网站，尽量让不同网站的任务交替进入执行
+        submitted = True
+        while submitted and len(futures) < max_workers:
+            submitted = False
+            for site in site_order:
+                if len(futures) >= max_workers:
+                    break
+                if pending[site] and in_flight[site] < per_site_limit:
+                    job = pending[site].popleft()
+                    in_flight[site] += 1
+                    futures[start(job)] = job
+                    submitted = True
+
+    submit_ready()
+    while futures or any(pending.values()):
+        if futures:
+            timeout = watchdog.interval if watchdog.enabled else None
+            done, _ = wait(list(futures) + list(stuck), timeout=timeout, return_when=FIRST_COMPLETED)
+        elif stuck:
+            # 剩下的单元所在网站都被未退出的线程占着名额
+            done, _ = wait(list(stuck), timeout=watchdog.grace_seconds, return_when=FIRST_COMPLETED)
+            if not done:
+                for site in site_order:
+                    while pending[site]:
+                        job = pending[site].popleft()
+                        error = f"{site} 仍有放弃等待的单元线程未退出，本轮跳过"
+                        logger.error(f"{job_label(job)}：{error}")
+                        finish(job, [_new_result(task, "skipped", error) for task in job["tasks"]],
+                               release=False, attempted=False)
+                break
+        else:
+            break
+
+        for future in done:
+            if future in stuck:
+                job = stuck.pop(future)
+                in_flight[job["website_names"]] -= 1
+                logger.info(f"已放弃等待的单元 {job_label(job)} 的线程已退出，释放网站名额")
+                continue
+            job = futures.pop(future)
+            try:
+                finish(job, future.result())
+            except Exception as e:
+                # run_job 内部已捕获异常，这里兜底应用上下文等意外错误
+                logger.error(f"任务执行失败（{job['website_names']}）：{e}", exc_info=True)
+                error = f"{type(e).__name__}: {e}"
+                finish(job, [_new_result(task, "failed", error) for task in job["tasks"]])
+
+        abandoned_keys = watchdog.abandoned()
+        for future, job in list(futures.items()):
+            if id(job) not in abandoned_keys:
+                continue
+            futures.pop(future)
+            watchdog.forget(id(job))
+            error = f"{job_label(job)} 取消后 {watchdog.grace_seconds:.0f} 秒仍未退出，已放弃"
+            logger.error(f"任务卡死：{error}")
+            finish(job, [_new_result(task, "timeout", error) for task in job["tasks"]], release=False)
+            stuck[future] = job
+        submit_ready()
+
+    if abandoned is not None:
+        abandoned.extend(stuck.items())
+
+    # 按任务 id 排序，便于与 crawl_pool 对照
+    results.sort(key=lambda r: r["task_id"])
+    return results
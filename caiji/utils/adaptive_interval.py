@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+
+from config.db import db
+from app.models.crawl_pool import CrawlPool
+from app.models.crawl_yield import CrawlYield
+from caiji.utils.config_loader import load_config
+
+
+class AdaptiveInterval:
+    """
+    根据每次执行的新增结果数调整抓取间隔：
+    - 没有新结果：间隔乘以 backoff（指数退避）
+    - 有新结果：间隔乘以 speedup（加快抓取）
+    结果限制在 [min_minutes, max_minutes] 之间。
+    """
+
+    def __init__(self, min_minutes: float = 15, max_minutes: float = 4320,
+                 backoff: float = 1.5, speedup: float = 0.5, enabled: bool = True):
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.backoff = backoff
+        self.speedup = speedup
+        self.enabled = enabled
+
+    @classmethod
+    def from_config(cls, config=None) -> "AdaptiveInterval":
+        config = config or load_config()
+        return cls(
+            min_minutes=config.getfloat('ADAPTIVE', 'min_minutes', fallback=15),
+            max_minutes=config.getfloat('ADAPTIVE', 'max_minutes', fallback=4320),
+            backoff=config.getfloat('ADAPTIVE', 'backoff', fallback=1.5),
+            speedup=config.getfloat('ADAPTIVE', 'speedup', fallback=0.5),
+            enabled=config.getboolean('ADAPTIVE', 'enabled', fallback=True),
+        )
+
+    def next_interval(self, current: float, new_items: int) -> float:
+        factor = self.speedup if new_items > 0 else self.backoff
+        return min(max(current * factor, self.min_minutes), self.max_minutes)
+
+
+def new_item_count(result: dict) -> int:
+    """任务实际新增的结果数：批量写入时为真正插入的行数，否则为交给保存的条目数"""
+    return result.get("inserted", result.get("items", 0))
+
+
+def record_yields(results: list, policy, adaptive: AdaptiveInterval = None,
+                  ran_at: datetime = None, logger=None) -> dict:
+    """
+    记录一批任务的执行结果（crawl_yield_history），并更新成功任务的自适应间隔。
+    失败或跳过的任务只记录历史，不调整间隔。
+    policy 为 SchedulePolicy，任务还没有自适应间隔时以其配置间隔为起点。
+    返回 {task_id: 新的间隔（分钟）}。
+    """
+    adaptive = adaptive or AdaptiveInterval.from_config()
+    ran_at = ran_at or datetime.utcnow()
+    rows = {row.id: row for row in CrawlPool.query.filter(
+        CrawlPool.id.in_([r["task_id"] for r in results])).all()}
+
+    intervals = {}
+    pool_updates = []
+    history = []
+    for result in results:
+        row = rows.get(result["task_id"])
+        new_items = new_item_count(result)
+        interval = None
+        if row is not None and adaptive.enabled and result["status"] == "success":
+            current = row.adaptive_minutes or policy.base_minutes(row.to_dict())
+            interval = adaptive.next_interval(current, new_items)
+            intervals[row.id] = interval
+            pool_updates.append({
+                "task_id": row.id,
+                "adaptive_minutes": interval,
+                "empty_streak": 0 if new_items else (row.empty_streak or 0) + 1,
+            })
+        history.append({
+            "task_id": result["task_id"],
+            "website_name": result["website_name"] or '',
+            "keyword": result["keyword"] or '',
+            "status": result["status"],
+            "fetched_items": result.get("fetched", 0),
+            "new_items": new_items,
+            "interval_minutes": interval,
+            "ran_at": ran_at,
+        })
+
+    try:
+        if history:
+            db.session.execute(CrawlYield.__table__.insert(), history)
+        if pool_updates:
+            table = CrawlPool.__table__
+            # 自适应间隔不属于任务配置，保留 updated_at 不变
+            stmt = update(table).where(table.c.id == bindparam('task_id')).values(
+                adaptive_minutes=bindparam('adaptive_minutes'),
+                empty_streak=bindparam('empty_streak'),
+                updated_at=table.c.updated_at,
+            )
+            db.session.execute(stmt, pool_updates)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if logger and intervals:
+        productive = sum(1 for r in results if r["task_id"] in intervals and new_item_count(r))
+        logger.info(f"自适应间隔已更新 {len(intervals)} 个任务，其中 {productive} 个有新结果")
+    return intervals
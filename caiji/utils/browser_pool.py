@@ -0,0 +1,379 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from caiji.utils.config_loader import load_config
+from caiji.utils.task_watchdog import check_cancelled, current_task
+
+
+class BrowserPoolTimeout(Exception):
+    """在等待时间内没有可用的浏览器标签页"""
+
+
+def process_tree(pid: int) -> list:
+    """进程及其全部子进程（Chromium 的渲染、GPU 等进程）的 pid，父进程在前；依赖 /proc，非 Linux 环境返回空列表"""
+    if not pid or not os.path.isdir('/proc'):
+        return []
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能包含空格，从最后一个 ')' 之后开始解析：state ppid ...
+        fields = stat[stat.rfind(b')') + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    pids = []
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, ()))
+    return pids
+
+
+def process_tree_rss(pid: int) -> int:
+    """统计进程树的常驻内存，单位字节"""
+    total = 0
+    for current in process_tree(pid):
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            pass
+    return total
+
+
+def kill_process_tree(pid: int) -> int:
+    """强制结束进程树（先子进程后父进程），返回发出信号的进程数"""
+    killed = 0
+    for current in reversed(process_tree(pid) or [pid]):
+        try:
+            os.kill(current, signal.SIGKILL)
+            killed += 1
+        except (OSError, AttributeError):
+            pass
+    return killed
+
+
+class PooledBrowser:
+    """池中的一个 Chromium 实例及其空闲标签页"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pid = browser.process_id
+        self.idle_tabs = []
+        self.active = 0
+        self.uses = 0
+        self.retired = False
+        self.last_used = time.monotonic()
+
+
+class BrowserPool:
+    """
+    进程内共享的 Chromium 浏览器池。
+
+    - 最多 size 个浏览器，每个最多同时出借 tabs_per_browser 个标签页，浏览器在首次需要时才启动；
+      正在启动的、以及已回收但仍有标签页未归还的浏览器都计入 size，达到上限时等待标签页归还或启动完成
+    - 每个标签页使用独立的浏览器上下文，归还时清空 cookies 与 local/session storage 并回到空白页
+    - 浏览器累计出借 max_uses 次或进程树内存超过 max_rss_mb 后，等出借的标签页全部归还再退出重建
+    - 爬虫通过 with pool.lease() as tab: 使用，异常退出时该标签页所在的浏览器直接回收
+    - 在看门狗跟踪的任务中借出时，任务超时会强制结束该标签页所在的浏览器进程，
+      卡在页面加载上的调用随之报错返回（同一浏览器中其它任务的标签页也会失效并在归还时回收）
+    """
+
+    def __init__(self,
+                 chrome_path: str = None,
+                 size: int = 2,
+                 tabs_per_browser: int = 2,
+                 max_uses: int = 50,
+                 max_rss_mb: int = 1024,
+                 headless: bool = True,
+                 lease_timeout: float = 300,
+                 logger=None):
+        self.chrome_path = chrome_path
+        self.size = size
+        self.tabs_per_browser = tabs_per_browser
+        self.max_uses = max_uses
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.headless = headless
+        self.lease_timeout = lease_timeout
+        self.logger = logger
+        # 累计启动与回收的浏览器数（统计用）
+        self.started = 0
+        self.recycled = 0
+        self._browsers = []
+        self._starting = 0
+        # 已回收、仍有标签页出借的浏览器，进程还在，计入 size
+        self._draining = []
+        self._tab_owner = {}
+        self._tab_task = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._slots = threading.BoundedSemaphore(size * tabs_per_browser)
+
+    def _launch(self):
+        # 延迟导入：只在确实需要浏览器时才加载 DrissionPage
+        from DrissionPage import Chromium, ChromiumOptions
+
+        options = ChromiumOptions(read_file=False)
+        if self.chrome_path:
+            options.set_browser_path(self.chrome_path)
+        options.headless(self.headless)
+        # 每个实例使用独立的调试端口与临时用户目录，互不干扰
+        options.auto_port()
+        options.set_argument('--no-sandbox')
+        options.set_argument('--disable-dev-shm-usage')
+        start = time.monotonic()
+        browser = Chromium(options)
+        self._log_info(f"启动浏览器（pid {browser.process_id}），耗时 {time.monotonic() - start:.1f} 秒")
+        return PooledBrowser(browser)
+
+    def _pick(self):
+        """选出仍有空余标签页名额的浏览器，优先复用已有空闲标签页的"""
+        candidates = [b for b in self._browsers if not b.retired and b.active < self.tabs_per_browser]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda b: (len(b.idle_tabs), -b.active))
+
+    def _running(self) -> int:
+        """已启动、正在启动以及回收后尚未退出的浏览器数"""
+        return len(self._browsers) + self._starting + len(self._draining)
+
+    def acquire(self, timeout: float = None):
+        """借出一个标签页，用完后必须调用 release()"""
+        check_cancelled()
+        timeout = self.lease_timeout if timeout is None else timeout
+        task = current_task()
+        if task is not None and task.remaining() is not None:
+            timeout = min(timeout, max(task.remaining(), 0))
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise BrowserPoolTimeout(f"等待浏览器标签页超过 {timeout} 秒")
+        try:
+            return self._acquire_tab(deadline, timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _acquire_tab(self, deadline: float, timeout: float):
+        launch = False
+        with self._cond:
+            while True:
+                pooled = self._pick()
+                if pooled is not None:
+                    pooled.active += 1
+                    break
+                if self._running() < self.size:
+                    # 先占住名额再在锁外启动，其它线程据此不会同时多启动
+                    self._starting += 1
+                    launch = True
+                    break
+                # 浏览器数已达上限（回收的浏览器还有标签页未归还，或其它线程正在启动），
+                # 等标签页归还或启动完成后重新选择
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BrowserPoolTimeout(f"等待浏览器标签页超过 {timeout} 秒")
+                self._cond.wait(min(remaining, 1.0))
+                check_cancelled()
+
+        if launch:
+            try:
+                pooled = self._launch()
+            except BaseException:
+                with self._cond:
+                    self._starting -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._starting -= 1
+                pooled.active += 1
+                self._browsers.append(pooled)
+                self.started += 1
+                self._cond.notify_all()
+
+        tab = None
+        with self._lock:
+            if pooled.idle_tabs:
+                tab = pooled.idle_tabs.pop()
+        try:
+            if tab is None:
+                tab = pooled.browser.new_tab(new_context=True)
+        except Exception:
+            self._retire(pooled, reason="新建标签页失败")
+            with self._cond:
+                pooled.active -= 1
+                self._cond.notify_all()
+            self._maybe_quit(pooled)
+            raise
+
+        with self._lock:
+            pooled.uses += 1
+            pooled.last_used = time.monotonic()
+            self._tab_owner[id(tab)] = pooled
+        task = current_task()
+        if task is not None:
+            task.add_cancel_callback(('browser', id(tab)), lambda: self._kill(pooled, task.label))
+            with self._lock:
+                self._tab_task[id(tab)] = task
+        return tab
+
+    def release(self, tab, broken: bool = False):
+        """归还标签页；broken=True 时回收其所在的浏览器"""
+        with self._lock:
+            pooled = self._tab_owner.pop(id(tab), None)
+            task = self._tab_task.pop(id(tab), None)
+        if task is not None:
+            task.remove_cancel_callback(('browser', id(tab)))
+        if pooled is None:
+            return
+        try:
+            if broken:
+                self._retire(pooled, reason="任务异常")
+            elif not pooled.retired:
+                try:
+                    self._reset_tab(tab)
+                except Exception as e:
+                    self._retire(pooled, reason=f"清理标签页失败: {e}")
+                else:
+                    self._check_recycle(pooled)
+
+            with self._cond:
+                pooled.active -= 1
+                pooled.last_used = time.monotonic()
+                if not pooled.retired:
+                    pooled.idle_tabs.append(tab)
+                self._cond.notify_all()
+            self._maybe_quit(pooled)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        tab = self.acquire(timeout)
+        broken = False
+        try:
+            yield tab
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.release(tab, broken=broken)
+
+    @staticmethod
+    def _reset_tab(tab):
+        tab.clear_cache(session_storage=True, local_storage=True, cache=False, cookies=True)
+        tab.get('about:blank')
+
+    def _check_recycle(self, pooled):
+        if pooled.uses >= self.max_uses:
+            self._retire(pooled, reason=f"已出借 {pooled.uses} 次")
+            return
+        rss = process_tree_rss(pooled.pid)
+        if self.max_rss and rss > self.max_rss:
+            self._retire(pooled, reason=f"内存 {rss // (1024 * 1024)} MB 超过上限")
+
+    def _retire(self, pooled, reason: str):
+        with self._cond:
+            if pooled.retired:
+                return
+            pooled.retired = True
+            # 移出池，不再出借；仍有标签页出借时在全部归还、进程退出前继续占用名额
+            if pooled in self._browsers:
+                self._browsers.remove(pooled)
+            if pooled.active > 0:
+                self._draining.append(pooled)
+            self.recycled += 1
+            self._cond.notify_all()
+        self._log_info(f"回收浏览器（pid {pooled.pid}）：{reason}")
+
+    def _kill(self, pooled, label: str):
+        """任务超时：回收浏览器并强制结束其进程树"""
+        self._retire(pooled, reason=f"任务超时（{label}）")
+        killed = kill_process_tree(pooled.pid)
+        self._log_info(f"已结束浏览器进程（pid {pooled.pid}，共 {killed} 个进程）")
+
+    def _maybe_quit(self, pooled):
+        with self._lock:
+            if not pooled.retired or pooled.active > 0:
+                return
+            pooled.idle_tabs.clear()
+            draining = pooled in self._draining
+        self._quit(pooled)
+        if draining:
+            # 进程退出后才释放名额
+            with self._cond:
+                if pooled in self._draining:
+                    self._draining.remove(pooled)
+                self._cond.notify_all()
+
+    def _quit(self, pooled):
+        try:
+            pooled.browser.quit(force=True, del_data=True)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"关闭浏览器（pid {pooled.pid}）失败: {e}")
+
+    def close(self):
+        """关闭所有空闲的浏览器；仍有标签页出借的浏览器在归还后关闭"""
+        with self._lock:
+            browsers = list(self._browsers)
+        for pooled in browsers:
+            self._retire(pooled, reason="浏览器池关闭")
+            self._maybe_quit(pooled)
+
+    @property
+    def active(self) -> bool:
+        """当前是否有浏览器进程（运行中、正在启动或回收后等待标签页归还），没有时不必关闭"""
+        with self._lock:
+            return self._running() > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "browsers": len(self._browsers),
+                "draining": len(self._draining),
+                "leased": sum(b.active for b in self._browsers + self._draining),
+                "started": self.started,
+                "recycled": self.recycled,
+            }
+
+    def _log_info(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool(logger=None):
+    """
+    获取进程内共享的浏览器池（首次调用时按 config.ini 的 [BROWSER_POOL] 段创建）。
+    未启用时返回 None。
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = load_config()
+            if not config.getboolean('BROWSER_POOL', 'enabled', fallback=True):
+                return None
+            _pool = BrowserPool(
+                chrome_path=config.get('DrissionPage', 'chrome_path', fallback='') or None,
+                size=config.getint('BROWSER_POOL', 'size', fallback=2),
+                tabs_per_browser=config.getint('BROWSER_POOL', 'tabs_per_browser', fallback=2),
+                max_uses=config.getint('BROWSER_POOL', 'max_uses', fallback=50),
+                max_rss_mb=config.getint('BROWSER_POOL', 'max_rss_mb', fallback=1024),
+                headless=config.getboolean('BROWSER_POOL', 'headless', fallback=True),
+                lease_timeout=config.getfloat('BROWSER_POOL', 'lease_timeout', fallback=300),
+                logger=logger,
+            )
+        elif logger is not None and _pool.logger is None:
+            _pool.logger = logger
+        return _pool
@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+
+import requests
+
+RECORD = 'record'
+REPLAY = 'replay'
+# 浏览器渲染的页面（page_loader 走浏览器池时）使用的“请求方法”
+BROWSER = 'BROWSER'
+
+
+class CassetteMiss(KeyError):
+    """回放时录像中没有对应的请求"""
+
+
+class Recording:
+    """录像中的一条响应；error 不为空时表示该请求在重试后仍然失败"""
+
+    def __init__(self, key, method, url, final_url, status_code, headers, encoding, elapsed, body, error=None):
+        self.key = key
+        self.method = method
+        self.url = url
+        self.final_url = final_url
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = encoding
+        self.elapsed = elapsed
+        self.body = body
+        self.error = error
+
+
+def request_key(method: str, url: str, params=None, data=None, json_body=None) -> str:
+    """请求的匹配键：方法 + 带查询参数的完整 URL，有请求体时附加请求体的哈希"""
+    prepared = requests.Request(method.upper(), url, params=params, data=data, json=json_body).prepare()
+    key = f"{prepared.method} {prepared.url}"
+    body = prepared.body
+    if body:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key += ' ' + hashlib.sha1(body).hexdigest()
+    return key
+
+
+class Cassette:
+    """
+    HTTP 录像：record 模式下把 fetcher 返回给爬虫的每个响应（URL、状态码、响应头、响应体）追加写入
+    gzip 压缩文件；replay 模式下启动时读入整个文件，按请求返回录制的响应，不访问网络。
+
+    文件为若干 gzip 成员依次拼接，每条记录是一行 JSON 头加 size 字节的响应体，每写一条刷新一次，
+    进程中断时已写入的记录仍可读取；多次录制追加到同一文件。
+    同一请求录制了多次时按录制顺序依次返回，用完后重复返回最后一次。
+    """
+
+    def __init__(self, path: str, mode: str, logger=None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"未知的录像模式：{mode}")
+        self.path = path
+        self.mode = mode
+        self.logger = logger
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self._recordings = defaultdict(list)
+        self._cursors = defaultdict(int)
+        self._file = None
+        self._lock = threading.Lock()
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, 'ab')
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def __len__(self):
+        return sum(len(recordings) for recordings in self._recordings.values())
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    header = json.loads(line)
+                    body = f.read(header.pop("size"))
+                    self._recordings[header["key"]].append(Recording(body=body, **header))
+        except FileNotFoundError:
+            self._warn(f"录像文件不存在：{self.path}")
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            # 录制进程被中断时最后一条记录可能不完整，之前的记录照常使用
+            self._warn(f"录像文件 {self.path} 末尾不完整（{e}），已读取 {len(self)} 条")
+
+    def has(self, method: str, url: str, **kwargs) -> bool:
+        return request_key(method, url, **kwargs) in self._recordings
+
+    def record(self, method: str, url: str, final_url: str = None, status_code: int = None, headers=None,
+               encoding: str = None, elapsed: float = 0.0, body: bytes = b'', error: str = None, **kwargs):
+        """追加一条记录，kwargs 为 params / data / json_body（参与匹配键）"""
+        header = {
+            "key": request_key(method, url, **kwargs),
+            "method": method.upper(),
+            "url": url,
+            "final_url": final_url or url,
+            "status_code": status_code,
+            "headers": dict(headers or {}),
+            "encoding": encoding,
+            "elapsed": round(elapsed, 4),
+            "error": error,
+            "size": len(body),
+        }
+        line = json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + body)
+            self._file.flush()
+            self.recorded += 1
+
+    def replay(self, method: str, url: str, **kwargs) -> Recording:
+        """返回录制的响应，没有录制过该请求时抛出 CassetteMiss"""
+        key = request_key(method, url, **kwargs)
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                self.missed += 1
+                raise CassetteMiss(key)
+            index = min(self._cursors[key], len(recordings) - 1)
+            self._cursors[key] += 1
+            self.replayed += 1
+        return recordings[index]
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self.mode == RECORD:
+                return {"mode": self.mode, "recorded": self.recorded}
+            return {"mode": self.mode, "recordings": len(self), "replayed": self.replayed, "missed": self.missed}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _warn(self, msg):
+        if self.logger:
+            self.logger.warning(msg)
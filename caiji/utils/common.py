@@ -1,40 +1,153 @@
-from datetime import datetime
+import re
 import logging
+from datetime import datetime, timedelta
 
 
-def to_timestamp(org: str) -> datetime | None:
+# 全角字符（数字、冒号、横线等）与全角空格转为半角
+_HALF_WIDTH = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_HALF_WIDTH[0x3000] = 0x20
+
+# 日期之后可选的时间部分：14:30、14:30:05、14点30分、09时
+_TIME = (r'(?:\s*T?\s*(?P<H>\d{1,2})(?!\d)\s*'
+         r'(?:[:时点]\s*(?P<M>\d{1,2})(?!\d)\s*(?:[:分]\s*(?P<S>\d{1,2})(?!\d))?)?)?')
+
+_RELATIVE_UNITS = {
+    '秒': timedelta(seconds=1),
+    '分': timedelta(minutes=1),
+    '分钟': timedelta(minutes=1),
+    '小时': timedelta(hours=1),
+    '个小时': timedelta(hours=1),
+    '钟头': timedelta(hours=1),
+    '天': timedelta(days=1),
+    '日': timedelta(days=1),
+    '周': timedelta(weeks=1),
+    '星期': timedelta(weeks=1),
+    '月': timedelta(days=30),
+    '个月': timedelta(days=30),
+    '年': timedelta(days=365),
+}
+_RELATIVE_NUMBERS = {'半': 0.5, '一': 1, '两': 2}
+_DAY_OFFSETS = {'今天': 0, '昨天': -1, '前天': -2, '明天': 1}
+
+
+def _with_time(day: datetime, match) -> datetime:
+    return day.replace(hour=int(match['H'] or 0), minute=int(match['M'] or 0),
+                       second=int(match['S'] or 0), microsecond=0)
+
+
+def _parse_relative(match, now):
+    if match['just']:
+        return now
+    amount = match['n']
+    amount = _RELATIVE_NUMBERS[amount] if amount in _RELATIVE_NUMBERS else int(amount)
+    return now - _RELATIVE_UNITS[match['u']] * amount
+
+
+def _parse_day_word(match, now):
+    day = now + timedelta(days=_DAY_OFFSETS[match['w']])
+    if match['H'] is None:
+        return day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return _with_time(day, match)
+
+
+def _parse_full(match, now):
+    return _with_time(datetime(int(match['y']), int(match['m']), int(match['d'])), match)
+
+
+def _parse_partial(match, now):
+    # 只有月日：取当前年份，得到的日期明显晚于 now 时视为去年
+    dt = _with_time(datetime(now.year, int(match['m']), int(match['d'])), match)
+    if dt > now + timedelta(days=1):
+        dt = dt.replace(year=now.year - 1)
+    return dt
+
+
+def _parse_epoch(match, now):
+    value = int(match['ts'])
+    return datetime.utcfromtimestamp(value / 1000 if len(match['ts']) == 13 else value)
+
+
+# 按顺序尝试；完整日期必须排在只有月日的格式之前
+_DATE_PATTERNS = [
+    ('relative', re.compile(
+        r'(?P<just>刚刚|刚才)|(?P<n>\d+|半|一|两)\s*(?P<u>秒|分钟|分|个小时|小时|钟头|天|日|周|星期|个月|月|年)\s*前'),
+     _parse_relative),
+    ('day_word', re.compile(r'(?P<w>今天|昨天|前天|明天)' + _TIME), _parse_day_word),
+    ('full', re.compile(
+        r'(?P<y>\d{4})\s*[-/.年]\s*(?P<m>\d{1,2})\s*[-/.月]\s*(?P<d>\d{1,2})\s*日?' + _TIME), _parse_full),
+    ('epoch', re.compile(r'^(?P<ts>\d{10}|\d{13})$'), _parse_epoch),
+    ('compact', re.compile(r'(?<!\d)(?P<y>(?:19|20)\d{2})(?P<m>[01]\d)(?P<d>[0-3]\d)(?!\d)' + _TIME), _parse_full),
+    # 只有月日：带“月”时可以出现在任意位置；05-20、5/20 这类写法必须单独成行（或只带“发布时间：”、括号），
+    # 避免把正文中的“第1-2页”“3.5 万元”误认为日期
+    ('partial_cn', re.compile(
+        r'(?<![\d\-/.年])(?P<m>\d{1,2})\s*月\s*(?P<d>\d{1,2})(?!\d)\s*日?' + _TIME), _parse_partial),
+    ('partial', re.compile(
+        r'(?:^|(?<=[:：\[(（【]))\s*(?P<m>\d{1,2})\s*[-/.]\s*(?P<d>\d{1,2})(?!\d)' + _TIME
+        + r'(?=\s*(?:$|[\])）】]))'), _parse_partial),
+]
+
+# 各网站上一次解析成功的格式序号，下次字符串整体符合该格式时直接使用
+_site_formats = {}
+
+
+def to_timestamp(org: str, website_name: str = None, now: datetime = None) -> datetime | None:
     """
     将页面上的时间字符串解析为 datetime 对象。
-    支持以下格式：
-      - "2025.04.27 15:08:45"
-      - "2025年05月20日14点30分"
-      - "2025年05月15日14:30"
-      - "2025年05月15日09时"
-      - "2025-04-28"
+    支持以下格式（全角数字与符号会先转为半角，字符串中可以带有“发布时间：”等前后缀）：
+      - "2025.04.27 15:08:45"、"2025-04-28"、"2025/4/28 9:05"
+      - "2025年05月20日14点30分"、"2025年05月15日14:30"、"2025年05月15日09时"
+      - "20250428"、10 位或 13 位时间戳
+      - "05-20"、"5月20日 14:20"（只有月日时取 now 所在年份，晚于 now 则取上一年；
+        不带“月”的写法只在单独出现或位于括号、“：”之后时识别）
+      - "今天 09:30"、"昨天 14:20"、"前天"
+      - "刚刚"、"3小时前"、"半小时前"、"2天前"
+    website_name: 传入时记住该网站上一次成功的格式，字符串整体符合该格式时直接使用，
+                  否则按固定顺序尝试；结果与不传时相同，不受此前解析过的字符串影响
+    now: 相对时间的参照时间，默认为当前 UTC 时间（与 crawled_at 等时间字段一致，时间戳同样按 UTC 转换）
     返回：
       - 匹配成功时的 datetime 对象
       - 解析失败或空字符串时返回 None
     """
     if not org:
-        logging.error("to_timestamp: 输入时间字符串为空")
+        logging.debug("to_timestamp: 输入时间字符串为空")
         return None
 
-    logging.debug(f"to_timestamp, 原始字符串: {org}")
-    formats = [
-        "%Y.%m.%d %H:%M:%S",   # 2025.04.27 15:08:45
-        "%Y年%m月%d日%H点%M分",  # 2025年05月20日14点30分
-        "%Y年%m月%d日%H:%M",    # 2025年05月15日14:30
-        "%Y年%m月%d日%H时",     # 2025年05月15日09时
-        "%Y-%m-%d",            # 2025-04-28
-    ]
+    text = org.translate(_HALF_WIDTH).strip()
+    now = now or datetime.utcnow()
 
-    for fmt in formats:
+    preferred = _site_formats.get(website_name) if website_name else None
+    if preferred is not None:
+        # 只有整个字符串都是该格式的日期时才走捷径，字符串中还夹带其它数字（如附件名）时
+        # 按固定顺序解析，避免同一字符串因网站此前的格式得到不同的结果
+        _, pattern, build = _DATE_PATTERNS[preferred]
+        match = pattern.fullmatch(text)
+        if match is not None:
+            try:
+                return build(match, now)
+            except (ValueError, OverflowError, OSError):
+                pass
+
+    for index, (_, pattern, build) in enumerate(_DATE_PATTERNS):
+        match = pattern.search(text)
+        if match is None:
+            continue
         try:
-            dt = datetime.strptime(org, fmt)
-            logging.debug(f"to_timestamp, 解析格式 {fmt}, 结果: {dt}")
-            return dt
-        except ValueError:
+            dt = build(match, now)
+        except (ValueError, OverflowError, OSError):
+            # 数字越界（如 13 月、25 点），继续尝试其它格式
             continue
+        if website_name and preferred != index:
+            _site_formats[website_name] = index
+        return dt
 
-    logging.error(f"to_timestamp: 无法识别的时间格式: {org}")
+    logging.warning(f"to_timestamp: 无法识别的时间格式: {org}")
     return None
+
+
+def get_item_field(item, name: str, default=None):
+    """
+    读取爬虫返回条目的字段，条目可以是 dict，也可以是带属性的对象（如 CrawlResult）。
+    """
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
@@ -4,6 +4,9 @@ import os
 
 def load_config(path=None):
     config = configparser.ConfigParser()
+    if path is None:
+        # 环境变量 CAIJI_CONFIG 可以指定其它配置文件（如基准测试使用的临时配置）
+        path = os.environ.get('CAIJI_CONFIG')
     if path is None:
         # 自动找 config.ini，基于当前文件的位置
         root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,230 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+from sqlalchemy import bindparam
+
+from config.db import db
+from app.models.crawl_run import CrawlRun, CrawlTaskRun
+from caiji.utils.task_lease import default_worker_id
+
+
+_ERROR_CLASS = re.compile(r'^([A-Za-z_][\w.]*): ')
+
+
+def _process_alive(pid: str) -> bool:
+    """本机上 pid 对应的进程是否仍在运行；pid 无法解析时按仍在运行处理"""
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, PermissionError, OSError):
+        return True
+    return True
+
+
+def error_class(result: dict):
+    """结果中的错误类型：失败任务的 error 为 “异常类名: 信息” 格式，超时任务为 TaskCancelled"""
+    if result["status"] == "timeout":
+        return "TaskCancelled"
+    match = _ERROR_CLASS.match(result.get("error") or '')
+    return match.group(1) if match else None
+
+
+class TelemetryRecorder:
+    """
+    把一轮采集及其中每个任务的执行情况写入 crawl_runs / crawl_task_runs。
+
+    start() 在开始时插入一条 running 状态的 crawl_runs 记录，并把已经不可能再结束的 running 记录
+    （进程中途退出留下的）标记为 aborted；record() 在任务结束时累积结果，凑满 batch_size 个任务写入一批，
+    进程中途退出时已写入的任务记录仍然保留；finish() 写入剩余的任务并更新本轮汇总。写入失败只记录日志，不影响采集。
+
+    record() 在调度线程中调用，不等待批量写入落库：任务行先按当时的新增/重复数写入，
+    finish() / fail() 等批量写入结束后再把有变化的任务行改为最终结果。
+    """
+
+    def __init__(self, mode: str, generation: int = None, batch_size: int = 500, logger=None, writer=None):
+        self.mode = mode
+        self.generation = generation
+        self.batch_size = max(batch_size, 1)
+        self.logger = logger
+        self.writer = writer
+        self.run_id = None
+        self.totals = {"pages": 0, "bytes": 0, "items_found": 0, "items_inserted": 0, "items_duplicate": 0}
+        self._pending = []
+        # 已写入的任务行当时记录的 (新增, 重复) 数，本轮结束时据此更正
+        self._written = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        worker = default_worker_id()
+        try:
+            aborted = self._abort_stale_runs(worker)
+            run = CrawlRun(mode=self.mode, generation=self.generation, worker=worker,
+                           status='running', started_at=datetime.utcnow())
+            db.session.add(run)
+            db.session.commit()
+            self.run_id = run.id
+        except Exception as e:
+            db.session.rollback()
+            self._error(f"记录采集运行失败: {e}")
+            return self
+        if aborted and self.logger:
+            self.logger.warning(f"{aborted} 条未正常结束的采集运行记录已标记为 aborted")
+        return self
+
+    def _abort_stale_runs(self, worker: str) -> int:
+        """
+        标记不可能再结束的 running 记录：非分布式模式同时只有一个采集进程，它之前的 sweep / scheduled 记录
+        都已中断；分布式模式只能判断本机上的 worker，进程已不存在的记录视为中断。
+        """
+        host = worker.rsplit(':', 1)[0]
+        stale = []
+        for run in CrawlRun.query.filter(CrawlRun.status == 'running').all():
+            run_host, _, pid = run.worker.rpartition(':')
+            if run.mode != 'distributed' or (run_host == host and not _process_alive(pid)):
+                stale.append(run)
+        now = datetime.utcnow()
+        for run in stale:
+            run.status = 'aborted'
+            run.finished_at = now
+            run.error = run.error or "进程在本轮结束前退出"
+        return len(stale)
+
+    def record(self, results):
+        """任务结束时调用，累积到 batch_size 个任务时写入一批"""
+        if self.run_id is None:
+            return
+        with self._lock:
+            self._pending.extend(results)
+            if len(self._pending) < self.batch_size:
+                return
+            results, self._pending = self._pending, []
+        self._write(results)
+
+    def _write(self, results: list):
+        """写入一批任务行，不持有 self._lock，也不等待批量写入"""
+        if not results:
+            return
+        if self.writer is not None:
+            results = [dict(result, **self.writer.get_task_stats(result["task_id"])) for result in results]
+        rows = [self._task_row(result) for result in results]
+        try:
+            for i in range(0, len(rows), self.batch_size):
+                db.session.execute(CrawlTaskRun.__table__.insert(), rows[i:i + self.batch_size])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._error(f"记录任务运行数据失败: {e}")
+            return
+        with self._lock:
+            for row in rows:
+                for key in self.totals:
+                    self.totals[key] += row[key]
+                if self.writer is not None:
+                    self._written[row["task_id"]] = (row["items_inserted"], row["items_duplicate"])
+
+    def _settle(self):
+        """写入剩余的任务行，并在批量写入全部落库后更正各任务行的新增/重复数"""
+        with self._lock:
+            results, self._pending = self._pending, []
+        self._write(results)
+        if self.writer is None:
+            return
+        if self.writer.alive:
+            self.writer.flush()
+        changes = []
+        with self._lock:
+            for task_id, (inserted, duplicates) in self._written.items():
+                stats = self.writer.get_task_stats(task_id)
+                if (stats["inserted"], stats["duplicates"]) != (inserted, duplicates):
+                    changes.append({"b_task_id": task_id, "b_inserted": stats["inserted"],
+                                    "b_duplicate": stats["duplicates"],
+                                    "delta": (stats["inserted"] - inserted, stats["duplicates"] - duplicates)})
+        if not changes:
+            return
+        table = CrawlTaskRun.__table__
+        statement = (table.update()
+                     .where(table.c.run_id == self.run_id, table.c.task_id == bindparam('b_task_id'))
+                     .values(items_inserted=bindparam('b_inserted'), items_duplicate=bindparam('b_duplicate')))
+        try:
+            for i in range(0, len(changes), self.batch_size):
+                db.session.execute(statement, [{key: change[key] for key in ("b_task_id", "b_inserted", "b_duplicate")}
+                                               for change in changes[i:i + self.batch_size]])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._error(f"更正任务运行数据失败: {e}")
+            return
+        with self._lock:
+            for change in changes:
+                self.totals["items_inserted"] += change["delta"][0]
+                self.totals["items_duplicate"] += change["delta"][1]
+                self._written[change["b_task_id"]] = (change["b_inserted"], change["b_duplicate"])
+
+    def finish(self, summary: dict):
+        if self.run_id is None:
+            return
+        self._settle()
+        try:
+            run = db.session.get(CrawlRun, self.run_id)
+            run.status = 'finished'
+            run.finished_at = datetime.utcnow()
+            run.tasks_total = summary["total"]
+            run.tasks_success = summary["success"]
+            run.tasks_failed = summary["failed"]
+            run.tasks_timeout = summary["timeout"]
+            run.tasks_skipped = summary["skipped"]
+            for key, value in self.totals.items():
+                setattr(run, key, value)
+            if summary.get("abandoned"):
+                run.error = f"{summary['abandoned']} 个放弃等待的单元线程在本轮结束时仍未退出"
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._error(f"记录采集运行失败: {e}")
+
+    def fail(self, error: Exception):
+        """本轮因异常中止：写入已结束的任务并标记失败"""
+        if self.run_id is None:
+            return
+        self._settle()
+        try:
+            run = db.session.get(CrawlRun, self.run_id)
+            run.status = 'failed'
+            run.finished_at = datetime.utcnow()
+            run.error = f"{type(error).__name__}: {error}"
+            for key, value in self.totals.items():
+                setattr(run, key, value)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._error(f"记录采集运行失败: {e}")
+
+    def _task_row(self, result: dict) -> dict:
+        # 使用批量写入时 inserted / duplicates 为实际入库结果，否则交给爬虫 save() 的条目都计为新增
+        inserted = result.get("inserted", result.get("items", 0))
+        return {
+            "run_id": self.run_id,
+            "task_id": result["task_id"],
+            "website_name": result["website_name"] or '',
+            "keyword": result["keyword"],
+            "status": result["status"],
+            "started_at": result.get("started_at"),
+            "finished_at": result.get("finished_at"),
+            "duration_seconds": result.get("duration_seconds"),
+            "pages": result.get("pages", 0),
+            "bytes": result.get("bytes", 0),
+            "fetch_seconds": result.get("fetch_seconds", 0.0),
+            "parse_seconds": result.get("parse_seconds", 0.0),
+            "items_found": result.get("fetched", 0),
+            "items_inserted": inserted,
+            "items_duplicate": result.get("duplicates", 0),
+            "error_class": error_class(result),
+            "error": result.get("error"),
+        }
+
+    def _error(self, message: str):
+        if self.logger:
+            self.logger.error(message, exc_info=True)
@@ -0,0 +1,221 @@
+import json
+import os
+import random
+import threading
+import time
+
+from bs4 import BeautifulSoup
+
+from caiji.utils.cassette import BROWSER as CASSETTE_BROWSER
+from caiji.utils.config_loader import load_config
+from caiji.utils.fetch_stats import record_page
+
+
+STATIC = 'static'
+BROWSER = 'browser'
+
+
+class Page:
+    """按选定方式取得的页面"""
+
+    def __init__(self, url, html, mode, unchanged=False, ok=True):
+        self.url = url
+        self.html = html
+        self.mode = mode
+        # static 方式下响应是否为 2xx 且有内容；否则无法据此判断网站是否需要浏览器
+        self.ok = ok
+        # 仅 static 方式下有效：响应缓存判定页面与上次相同
+        self.unchanged = unchanged
+
+    def __repr__(self):
+        return f"<Page [{self.mode}] {self.url}>"
+
+
+def count_listing_items(html: str, selector: str) -> int:
+    """用 CSS 选择器统计页面中的列表条目数"""
+    if not html:
+        return 0
+    return len(BeautifulSoup(html, 'html.parser').select(selector))
+
+
+class FetchModeSelector:
+    """
+    按网站选择最省资源的抓取方式。
+
+    首次抓取（或决定过期、随机复查）时先用普通 HTTP 请求页面，
+    页面里能用 selector 找到至少 min_items 个列表条目就记为 static，否则记为 browser。
+    决定按 website_name 保存在本地 JSON 文件中，ttl 秒后过期重新探测；
+    static 网站某次取到正常页面（2xx）但条目不足时改用浏览器并改记为 browser；
+    响应非 2xx 或为空时只是本次改用浏览器，不改变记录，避免网站短暂出错就长期使用浏览器。
+    cache_listing 为 True 时列表页的 HTTP 请求走响应缓存（条件请求），页面未变化时 Page.unchanged 为 True，
+    爬虫可以跳过解析。
+    """
+
+    def __init__(self, fetcher, browser_pool=None, path: str = 'config/fetch_modes.json',
+                 ttl: float = 7 * 24 * 3600, reprobe_rate: float = 0.05,
+                 browser_wait: float = 10, cache_listing: bool = True, logger=None):
+        self.fetcher = fetcher
+        self.browser_pool = browser_pool
+        self.path = path
+        self.ttl = ttl
+        self.reprobe_rate = reprobe_rate
+        self.browser_wait = browser_wait
+        self.cache_listing = cache_listing
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._decisions = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self._log_warning(f"抓取方式记录读取失败，将重新探测: {e}")
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._decisions, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def mode_for(self, website_name: str):
+        """返回网站当前记录的抓取方式，没有记录时返回 None"""
+        with self._lock:
+            decision = self._decisions.get(website_name)
+        return decision["mode"] if decision else None
+
+    def _record(self, website_name: str, mode: str, items: int):
+        with self._lock:
+            previous = self._decisions.get(website_name, {}).get("mode")
+            self._decisions[website_name] = {"mode": mode, "probed_at": time.time(), "static_items": items}
+            try:
+                self._save()
+            except OSError as e:
+                self._log_warning(f"抓取方式记录保存失败: {e}")
+        if previous != mode:
+            self._log_info(f"{website_name} 抓取方式：{previous or '未探测'} -> {mode}（静态页面条目数 {items}）")
+
+    def _needs_probe(self, website_name: str) -> bool:
+        with self._lock:
+            decision = self._decisions.get(website_name)
+        if decision is None or time.time() - decision["probed_at"] > self.ttl:
+            return True
+        # browser 网站偶尔复查一次，网站改为服务端渲染后可以及时切回 static
+        return decision["mode"] == BROWSER and random.random() < self.reprobe_rate
+
+    def get_page(self, website_name: str, url: str, selector: str, min_items: int = 1, **kwargs) -> Page:
+        """
+        取得包含列表的页面：能用 static 的网站只发 HTTP 请求，否则使用浏览器池。
+        kwargs 透传给 fetcher.get（如 headers；cache 不传时按 cache_listing）。
+        """
+        cassette = self.fetcher.cassette
+        if cassette is not None and cassette.replaying and cassette.has(CASSETTE_BROWSER, url):
+            # 回放录制时由浏览器渲染的页面，不启动浏览器
+            return self._browser(url, selector)
+        if self.browser_pool is None:
+            return self._static(website_name, url, **kwargs)
+
+        probing = self._needs_probe(website_name)
+        if probing or self.mode_for(website_name) == STATIC:
+            page = self._static(website_name, url, **kwargs)
+            # 响应缓存判定未变化的页面沿用已有决定，不再重复解析
+            if page.unchanged and not probing:
+                return page
+            if not page.ok:
+                # 错误页、空响应说明不了页面是否需要渲染，本次用浏览器，下次仍按原记录（或重新探测）
+                self._log_info(f"{website_name} 静态请求未取得页面，本次改用浏览器：{url}")
+                return self._browser(url, selector)
+            items = count_listing_items(page.html, selector)
+            if items >= min_items:
+                if probing:
+                    self._record(website_name, STATIC, items)
+                return page
+            self._record(website_name, BROWSER, items)
+
+        return self._browser(url, selector)
+
+    def _static(self, website_name: str, url: str, **kwargs) -> Page:
+        kwargs.setdefault('cache', self.cache_listing)
+        response = self.fetcher.get(url, website_name=website_name, **kwargs)
+        html = response.text if response.ok else ''
+        return Page(response.url, html, STATIC, unchanged=getattr(response, 'unchanged', False),
+                    ok=bool(response.ok and html.strip()))
+
+    def _browser(self, url: str, selector: str) -> Page:
+        cassette = self.fetcher.cassette
+        if cassette is not None and cassette.replaying:
+            recording = cassette.replay(CASSETTE_BROWSER, url)
+            record_page(len(recording.body), 0.0)
+            return Page(recording.final_url, recording.body.decode('utf-8'), BROWSER)
+
+        start = time.monotonic()
+        with self.browser_pool.lease() as tab:
+            tab.get(url)
+            tab.wait.eles_loaded(f'css:{selector}', timeout=self.browser_wait)
+            page = Page(tab.url, tab.html, BROWSER)
+        elapsed = time.monotonic() - start
+        body = page.html.encode('utf-8')
+        record_page(len(body), elapsed)
+        if cassette is not None:
+            cassette.record(CASSETTE_BROWSER, url, final_url=page.url, status_code=200,
+                            encoding='utf-8', elapsed=elapsed, body=body)
+        return page
+
+    def bind(self, website_name: str) -> "SitePageLoader":
+        return SitePageLoader(self, website_name)
+
+    def _log_info(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+    def _log_warning(self, msg):
+        if self.logger:
+            self.logger.warning(msg)
+
+
+class SitePageLoader:
+    """绑定了 website_name 的视图，交给单个爬虫使用：loader.get(url, selector)"""
+
+    def __init__(self, selector: FetchModeSelector, website_name: str):
+        self.selector = selector
+        self.website_name = website_name
+
+    @property
+    def mode(self):
+        return self.selector.mode_for(self.website_name)
+
+    def get(self, url: str, selector: str, min_items: int = 1, **kwargs) -> Page:
+        return self.selector.get_page(self.website_name, url, selector, min_items=min_items, **kwargs)
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_fetch_mode_selector(fetcher, browser_pool=None, logger=None) -> FetchModeSelector:
+    """
+    获取进程内共享的抓取方式选择器（首次调用时按 config.ini 的 [FETCH_MODE] 段创建）。
+    """
+    global _selector
+    with _selector_lock:
+        if _selector is None:
+            config = load_config()
+            _selector = FetchModeSelector(
+                fetcher,
+                browser_pool=browser_pool,
+                path=config.get('FETCH_MODE', 'path', fallback='config/fetch_modes.json'),
+                ttl=config.getfloat('FETCH_MODE', 'ttl_hours', fallback=168) * 3600,
+                reprobe_rate=config.getfloat('FETCH_MODE', 'reprobe_rate', fallback=0.05),
+                browser_wait=config.getfloat('FETCH_MODE', 'browser_wait', fallback=10),
+                cache_listing=config.getboolean('RESPONSE_CACHE', 'listing_pages', fallback=True),
+                logger=logger,
+            )
+        elif logger is not None and _selector.logger is None:
+            _selector.logger = logger
+        return _selector
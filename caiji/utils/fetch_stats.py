@@ -0,0 +1,57 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class UnitStats:
+    """一个执行单元（单个任务或按网站汇总的一组任务）的网络抓取量"""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.fetch_seconds = 0.0
+
+
+_local = threading.local()
+
+
+@contextmanager
+def collect_stats():
+    """在当前线程中统计抓取量，期间 fetcher / 浏览器抓取的页面都记入返回的 UnitStats"""
+    stats = UnitStats()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = None
+
+
+def record_page(size: int, seconds: float):
+    """记录一次页面抓取（响应体字节数与耗时），不在 collect_stats() 中时忽略"""
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        stats.pages += 1
+        stats.bytes += size
+        stats.fetch_seconds += seconds
+
+
+def attach_stats(results: list, stats: UnitStats, started_at: datetime, started: float, crawl_seconds: float):
+    """
+    把单元的耗时与抓取量写入其中每个任务的结果。
+    单元耗时、抓取量与解析耗时（爬取耗时减去网络耗时）只记在第一个任务上，同一单元的其余任务
+    耗时为 None、抓取量与解析耗时为 0，按任务行统计耗时分位数时每个单元只计一次。
+    """
+    finished_at = datetime.utcnow()
+    duration = time.monotonic() - started
+    for index, result in enumerate(results):
+        first = index == 0
+        result.update(
+            started_at=started_at,
+            finished_at=finished_at,
+            duration_seconds=duration if first else None,
+            pages=stats.pages if first else 0,
+            bytes=stats.bytes if first else 0,
+            fetch_seconds=stats.fetch_seconds if first else 0.0,
+            parse_seconds=max(crawl_seconds - stats.fetch_seconds, 0.0) if first else 0.0,
+        )
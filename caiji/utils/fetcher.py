@@ -0,0 +1,507 @@
+import hashlib
+import random
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from charset_normalizer import from_bytes
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from caiji.utils.cassette import Cassette, CassetteMiss, RECORD, REPLAY, request_key
+from caiji.utils.config_loader import load_config
+from caiji.utils.rate_limiter import get_rate_limiter
+from caiji.utils.response_cache import ResponseCache
+from caiji.utils.task_watchdog import cancellable_sleep, cap_timeout, check_cancelled
+from caiji.utils.fetch_stats import record_page
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class FetchError(Exception):
+    """请求在重试后仍然失败"""
+
+
+class ResponseTooLarge(FetchError):
+    """响应体超过大小上限"""
+
+
+class FetchResponse:
+    """
+    抓取结果。响应体已经完整读取（并按 gzip/deflate 解压），
+    连接随即归还给会话的连接池，可以被后续请求复用。
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding, elapsed,
+                 not_modified=False, unchanged=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.elapsed = elapsed
+        # 服务端返回 304，content 取自响应缓存
+        self.not_modified = not_modified
+        # 内容与上次缓存的一致（304 或响应体哈希相同），爬虫可以跳过解析
+        self.unchanged = unchanged
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def __repr__(self):
+        return f"<FetchResponse [{self.status_code}] {self.url}>"
+
+
+class DnsCache:
+    """
+    进程级 DNS 缓存：包装 socket.getaddrinfo，成功的解析结果在 ttl 秒内直接复用。
+    进程内经过 socket.getaddrinfo 的解析（requests/urllib3 等）都会命中它。
+    """
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self):
+        if self._original is not None:
+            return
+        self._original = socket.getaddrinfo
+        socket.getaddrinfo = self._getaddrinfo
+
+    def uninstall(self):
+        if self._original is not None:
+            socket.getaddrinfo = self._original
+            self._original = None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _getaddrinfo(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+        result = self._original(*args, **kwargs)
+        with self._lock:
+            self._cache[key] = (now + self.ttl, result)
+        return result
+
+
+class Fetcher:
+    """
+    爬虫共享的 HTTP 抓取服务。
+
+    - 每个 host 一个 keep-alive 的 requests.Session，连接在所有任务之间复用
+    - 重试、退避、超时、响应体大小上限统一在这里处理
+    - 配置了 rate_limiter 时，每次请求（含重试）都先按网站取令牌，并把状态码与延迟反馈给限速器
+    - 配置了 response_cache 时，GET 请求传 cache=True 即走条件请求，未变化的页面 unchanged 为 True；
+      cache_sites 中的网站（'*' 为全部）通过 bind() 得到的视图默认带 cache=True
+    - 在看门狗跟踪的任务中执行时，请求超时不超过任务剩余时间，任务被取消后抛出 TaskCancelled
+    - 配置了 cassette 时，record 模式录制返回给爬虫的每个响应，replay 模式只从录像返回响应，不访问网络
+    - 线程安全，可以被并发执行的多个爬虫同时使用
+    """
+
+    def __init__(self,
+                 timeout: float = 15,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 backoff_max: float = 30,
+                 retry_statuses=(429, 500, 502, 503, 504),
+                 max_bytes: int = 10 * 1024 * 1024,
+                 pool_maxsize: int = 10,
+                 user_agent: str = DEFAULT_USER_AGENT,
+                 rate_limiter=None,
+                 response_cache=None,
+                 cassette: Cassette = None,
+                 cache_sites=(),
+                 logger=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+        self.max_bytes = max_bytes
+        self.pool_maxsize = pool_maxsize
+        self.user_agent = user_agent
+        self.rate_limiter = rate_limiter
+        self.response_cache = response_cache
+        self.cassette = cassette
+        self.cache_sites = {name.lower() for name in cache_sites}
+        self.logger = logger
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host_key = (parts.scheme, parts.netloc)
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(f"{parts.scheme}://", adapter)
+                session.headers.update({
+                    'User-Agent': self.user_agent,
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive',
+                })
+                self._sessions[host_key] = session
+            return session
+
+    def _backoff(self, attempt: int, retry_after=None) -> float:
+        retry_after = _parse_retry_after(retry_after)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        delay = self.backoff_factor * (2 ** attempt)
+        return min(delay + random.uniform(0, self.backoff_factor), self.backoff_max)
+
+    def _read_body(self, resp: requests.Response, url: str, max_bytes: int) -> bytes:
+        length = resp.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(f"响应体过大（{length} 字节 > {max_bytes}）：{url}")
+        chunks = []
+        size = 0
+        # 自动解压 gzip/deflate，上限按解压后的大小计算
+        for chunk in self._iter_body(resp):
+            # 服务器缓慢地逐段返回时单次读取超时拦不住总耗时，每段之间检查任务是否已超时
+            check_cancelled()
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f"响应体超过 {max_bytes} 字节上限：{url}")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _iter_body(resp: requests.Response, chunk_size: int = 64 * 1024):
+        """
+        逐段读取响应体。iter_content 要凑满 chunk_size 才返回，服务器缓慢返回时会长时间阻塞；
+        这里用 read1 收到多少返回多少，取消检查才能及时生效。
+        """
+        raw = resp.raw
+        if not hasattr(raw, 'read1'):
+            yield from resp.iter_content(chunk_size=chunk_size)
+            return
+        try:
+            while True:
+                chunk = raw.read1(chunk_size, decode_content=True)
+                if not chunk:
+                    return
+                yield chunk
+        except Urllib3Error as e:
+            # 与 iter_content 一致，转换为 requests 的异常，由重试逻辑处理
+            raise requests.exceptions.ConnectionError(e) from e
+
+    @staticmethod
+    def _detect_encoding(resp: requests.Response, content: bytes) -> str:
+        """
+        响应头声明了 charset 时直接使用；否则依次尝试页面 <meta charset> 与内容探测，
+        避免 requests 对未声明编码的 text/html 默认使用 ISO-8859-1 导致中文乱码。
+        """
+        if 'charset' in resp.headers.get('Content-Type', '').lower() and resp.encoding:
+            return resp.encoding
+        match = _META_CHARSET.search(content[:4096])
+        if match:
+            return match.group(1).decode('ascii', errors='ignore')
+        best = from_bytes(content[:64 * 1024]).best() if content else None
+        return best.encoding if best else 'utf-8'
+
+    def request(self, method: str, url: str, website_name: str = None,
+                max_bytes: int = None, retries: int = None, cache: bool = False,
+                **kwargs) -> FetchResponse:
+        """
+        发送请求并完整读取响应体。
+        连接错误、超时以及 retry_statuses 中的状态码会按指数退避重试，
+        重试用尽后：网络错误抛出 FetchError，状态码错误返回最后一次的响应。
+        cache=True 时（仅 GET，且配置了响应缓存）带上 If-None-Match / If-Modified-Since，
+        并在返回结果上标记 not_modified / unchanged。
+        """
+        cassette = self.cassette
+        if cassette is not None and cassette.replaying:
+            return self._replay(method, url, **kwargs)
+
+        try:
+            if cache and method.upper() == 'GET' and self.response_cache is not None:
+                response = self._cached_get(url, website_name=website_name, max_bytes=max_bytes,
+                                            retries=retries, **kwargs)
+            else:
+                response = self._send(method, url, website_name, max_bytes, retries, **kwargs)
+        except FetchError as e:
+            if cassette is not None:
+                cassette.record(method, url, error=str(e), **_request_body(kwargs))
+            raise
+        if cassette is not None:
+            cassette.record(method, url, final_url=response.url, status_code=response.status_code,
+                            headers=response.headers, encoding=response.encoding, elapsed=response.elapsed,
+                            body=response.content, **_request_body(kwargs))
+        return response
+
+    def _send(self, method: str, url: str, website_name: str = None, max_bytes: int = None,
+              retries: int = None, **kwargs) -> FetchResponse:
+        max_bytes = max_bytes or self.max_bytes
+        retries = self.max_retries if retries is None else retries
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._session_for(url)
+        label = website_name or urlsplit(url).netloc
+
+        attempt = 0
+        while True:
+            check_cancelled()
+            if self.rate_limiter:
+                self.rate_limiter.acquire(label)
+            start = time.monotonic()
+            try:
+                timeout = cap_timeout(kwargs['timeout'])
+                with session.request(method, url, stream=True, **dict(kwargs, timeout=timeout)) as resp:
+                    content = self._read_body(resp, url, max_bytes)
+                    response = FetchResponse(
+                        url=resp.url,
+                        status_code=resp.status_code,
+                        headers=resp.headers,
+                        content=content,
+                        encoding=self._detect_encoding(resp, content),
+                        elapsed=time.monotonic() - start,
+                    )
+                record_page(len(content), response.elapsed)
+            except ResponseTooLarge:
+                raise
+            except requests.RequestException as e:
+                if self.rate_limiter:
+                    self.rate_limiter.record(label, None, time.monotonic() - start)
+                # 超时由任务截止时间导致时直接结束，不再重试
+                check_cancelled()
+                if attempt >= retries:
+                    raise FetchError(f"请求失败（{label}）：{url}，原因: {e}") from e
+                delay = self._backoff(attempt)
+                self._log(f"请求异常（{label}）：{e}，{delay:.1f} 秒后第 {attempt + 1} 次重试")
+                cancellable_sleep(delay)
+                attempt += 1
+                continue
+
+            if self.rate_limiter:
+                retry_after = None
+                if response.status_code in (429, 503):
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.record(label, response.status_code, response.elapsed, retry_after)
+
+            if response.status_code in self.retry_statuses and attempt < retries:
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                self._log(f"状态码 {response.status_code}（{label}）：{url}，"
+                          f"{delay:.1f} 秒后第 {attempt + 1} 次重试")
+                cancellable_sleep(delay)
+                attempt += 1
+                continue
+
+            return response
+
+    def _cached_get(self, url: str, **kwargs) -> FetchResponse:
+        cache = self.response_cache
+        key = _cache_key(url, kwargs)
+        entry = cache.get(key)
+        if entry is not None:
+            headers = dict(kwargs.pop('headers', None) or {})
+            for name, value in cache.conditional_headers(entry).items():
+                headers.setdefault(name, value)
+            kwargs['headers'] = headers
+
+        response = self._send('GET', url, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            cache.touch(key)
+            cache.record(hit=True, not_modified=True)
+            return FetchResponse(
+                url=response.url,
+                status_code=200,
+                headers=response.headers,
+                content=entry.body,
+                encoding=entry.encoding,
+                elapsed=response.elapsed,
+                not_modified=True,
+                unchanged=True,
+            )
+        if response.status_code != 200:
+            return response
+
+        body_hash = cache.hash_body(response.content)
+        if entry is not None and entry.body_hash == body_hash:
+            response.unchanged = True
+            cache.record(hit=True)
+        else:
+            cache.record(hit=False)
+        cache.put(key, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                  response.content, response.encoding, body_hash=body_hash)
+        return response
+
+    def get(self, url: str, **kwargs) -> FetchResponse:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> FetchResponse:
+        return self.request('POST', url, **kwargs)
+
+    def _replay(self, method: str, url: str, **kwargs) -> FetchResponse:
+        """从录像返回响应（不经过响应缓存，爬虫总是拿到完整的页面）"""
+        check_cancelled()
+        try:
+            recording = self.cassette.replay(method, url, **_request_body(kwargs))
+        except CassetteMiss:
+            raise FetchError(f"录像中没有该请求：{method.upper()} {url}") from None
+        if recording.error is not None:
+            raise FetchError(recording.error)
+        record_page(len(recording.body), 0.0)
+        return FetchResponse(
+            url=recording.final_url,
+            status_code=recording.status_code,
+            headers=CaseInsensitiveDict(recording.headers),
+            content=recording.body,
+            encoding=recording.encoding,
+            elapsed=0.0,
+        )
+
+    def caches_site(self, website_name: str) -> bool:
+        """该网站的 GET 请求是否默认走响应缓存"""
+        if self.response_cache is None:
+            return False
+        return '*' in self.cache_sites or (website_name or '').lower() in self.cache_sites
+
+    def bind(self, website_name: str) -> "SiteFetcher":
+        """返回绑定了网站名的视图，交给单个爬虫使用"""
+        return SiteFetcher(self, website_name, cache=self.caches_site(website_name))
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        if self.cassette is not None:
+            self.cassette.close()
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.warning(msg)
+
+
+def _request_body(kwargs: dict) -> dict:
+    """录像匹配键用到的请求参数"""
+    return {"params": kwargs.get('params'), "data": kwargs.get('data'), "json_body": kwargs.get('json')}
+
+
+def _cache_key(url: str, kwargs: dict) -> str:
+    """
+    响应缓存键：与录像相同的请求键（带查询参数的完整 URL + 请求体哈希），
+    调用方自带请求头（如 Cookie、Accept-Language）时再附加请求头的哈希，不同请求不会共用缓存条目。
+    """
+    key = request_key('GET', url, **_request_body(kwargs))
+    headers = kwargs.get('headers')
+    if headers:
+        normalized = sorted((str(name).lower(), str(value)) for name, value in headers.items())
+        key += ' headers=' + hashlib.sha1(repr(normalized).encode('utf-8')).hexdigest()
+    return key
+
+
+def _parse_retry_after(value):
+    """只处理秒数形式的 Retry-After，HTTP 日期形式按未提供处理"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class SiteFetcher:
+    """
+    绑定了 website_name 的 Fetcher 视图，所有请求都会带上网站名；
+    cache 为 True 时 GET 请求默认走响应缓存（调用方显式传 cache 时以调用方为准）
+    """
+
+    def __init__(self, fetcher: Fetcher, website_name: str, cache: bool = False):
+        self.fetcher = fetcher
+        self.website_name = website_name
+        self.cache = cache
+
+    def request(self, method: str, url: str, **kwargs) -> FetchResponse:
+        kwargs.setdefault('website_name', self.website_name)
+        if self.cache and method.upper() == 'GET':
+            kwargs.setdefault('cache', True)
+        return self.fetcher.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> FetchResponse:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> FetchResponse:
+        return self.request('POST', url, **kwargs)
+
+
+_fetcher = None
+_dns_cache = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher(logger=None) -> Fetcher:
+    """
+    获取进程内共享的 Fetcher（首次调用时按 config.ini 的 [FETCH] 段创建）。
+    """
+    global _fetcher, _dns_cache
+    with _fetcher_lock:
+        if _fetcher is None:
+            config = load_config()
+            rate_limiter = None
+            if config.getboolean('RATE_LIMIT', 'enabled', fallback=True):
+                rate_limiter = get_rate_limiter(logger)
+            dns_ttl = config.getint('FETCH', 'dns_cache_ttl', fallback=300)
+            if dns_ttl > 0:
+                _dns_cache = DnsCache(ttl=dns_ttl)
+                _dns_cache.install()
+            response_cache = None
+            cache_sites = ()
+            if config.getboolean('RESPONSE_CACHE', 'enabled', fallback=True):
+                cache_sites = [name.strip() for name in
+                               config.get('RESPONSE_CACHE', 'sites', fallback='').split(',') if name.strip()]
+                response_cache = ResponseCache(
+                    path=config.get('RESPONSE_CACHE', 'path', fallback='config/response_cache.sqlite3'),
+                    max_entries=config.getint('RESPONSE_CACHE', 'max_entries', fallback=20000),
+                    max_bytes=config.getint('RESPONSE_CACHE', 'max_mb', fallback=200) * 1024 * 1024,
+                    logger=logger,
+                )
+            cassette = None
+            cassette_mode = config.get('CASSETTE', 'mode', fallback='off').strip().lower()
+            if cassette_mode in (RECORD, REPLAY):
+                cassette = Cassette(config.get('CASSETTE', 'path', fallback='config/cassette.gz'),
+                                    cassette_mode, logger=logger)
+                if logger is not None:
+                    logger.warning(f"HTTP 录像：{cassette_mode} 模式，文件 {cassette.path}")
+            _fetcher = Fetcher(
+                timeout=config.getfloat('FETCH', 'timeout', fallback=15),
+                max_retries=config.getint('FETCH', 'max_retries', fallback=3),
+                backoff_factor=config.getfloat('FETCH', 'backoff_factor', fallback=0.5),
+                max_bytes=config.getint('FETCH', 'max_bytes', fallback=10 * 1024 * 1024),
+                pool_maxsize=config.getint('FETCH', 'pool_maxsize', fallback=10),
+                user_agent=config.get('FETCH', 'user_agent', fallback=DEFAULT_USER_AGENT),
+                rate_limiter=rate_limiter,
+                response_cache=response_cache,
+                cassette=cassette,
+                cache_sites=cache_sites,
+                logger=logger,
+            )
+        elif logger is not None and _fetcher.logger is None:
+            _fetcher.logger = logger
+        return _fetcher
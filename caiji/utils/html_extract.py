@@ -0,0 +1,173 @@
+import re
+from collections import namedtuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from caiji.utils.common import to_timestamp
+
+try:
+    # lxml + cssselect 最快（已列入 requirements.txt）；未安装时退回 BeautifulSoup
+    import lxml.etree
+    import lxml.html
+    from cssselect import GenericTranslator
+
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+
+# 字段名与 crawl_results 一致，条目可以直接交给 _store_items / build_result_rows
+ListingItem = namedtuple('ListingItem', ['title', 'detail_url', 'publish_time', 'publisher'])
+
+_SPACES = re.compile(r'\s+')
+# 能转换为 SoupStrainer 的简单容器选择器：tag、#id、.class、tag#id、tag.class
+_SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)?(?:#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+))?$')
+
+
+def _clean(text):
+    return _SPACES.sub(' ', text).strip() if text else ''
+
+
+def _split_field(selector):
+    """'a@href' -> ('a', 'href')；'@title' 表示条目元素自身的属性；不带 @ 时取文本"""
+    if selector is None:
+        return None
+    css, _, attr = selector.partition('@')
+    return css.strip() or None, attr.strip() or None
+
+
+class ListingSpec:
+    """
+    列表页提取规则。
+
+    container: 列表容器的 CSS 选择器（如 'ul.news-list'），只解析并遍历它的子树
+    item: 容器内每个条目的 CSS 选择器（如 'li'）
+    title / url / date / publisher: 条目内字段的选择器，'选择器@属性' 取属性，否则取文本；
+        url 默认 'a@href'，title 默认 'a'，date / publisher 不需要时为 None
+    """
+
+    def __init__(self, container: str, item: str, title: str = 'a', url: str = 'a@href',
+                 date: str = None, publisher: str = None):
+        self.container = container
+        self.item = item
+        self.fields = {
+            'title': _split_field(title),
+            'detail_url': _split_field(url),
+            'publish_time': _split_field(date),
+            'publisher': _split_field(publisher),
+        }
+        self._xpaths = None
+        self._strainer = self._build_strainer(container)
+
+    @staticmethod
+    def _build_strainer(container):
+        match = _SIMPLE_SELECTOR.match(container.strip())
+        if not match or not any(match.groupdict().values()):
+            return None
+        attrs = {}
+        if match['id']:
+            attrs['id'] = match['id']
+        if match['cls']:
+            attrs['class'] = match['cls']
+        return SoupStrainer(match['tag'] or True, attrs=attrs)
+
+    def _compiled(self):
+        # CSS 选择器只转换一次 XPath，之后各页面复用
+        if self._xpaths is None:
+            translator = GenericTranslator()
+            fields = {}
+            for name, spec in self.fields.items():
+                if spec is None:
+                    continue
+                css, attr = spec
+                xpath = translator.css_to_xpath(css, prefix='descendant::') if css else None
+                fields[name] = (lxml.etree.XPath(xpath) if xpath else None, attr)
+            self._xpaths = (
+                lxml.etree.XPath(translator.css_to_xpath(self.container)),
+                lxml.etree.XPath(translator.css_to_xpath(self.item, prefix='descendant::')),
+                fields,
+            )
+        return self._xpaths
+
+    def extract(self, html: str, source_url: str = '', website_name: str = None,
+                parse_dates: bool = True) -> list:
+        """
+        提取列表条目，返回 ListingItem 元组列表；detail_url 按 source_url 转为绝对地址，
+        parse_dates 为 True 时 publish_time 经 to_timestamp 解析（失败为 None），否则保留原始文本。
+        没有标题或链接的条目会被跳过。
+        """
+        if not html or not html.strip():
+            return []
+        rows = self._extract_lxml(html) if HAS_LXML else self._extract_bs4(html)
+
+        items = []
+        for title, url, date, publisher in rows:
+            if not title or not url:
+                continue
+            if parse_dates and date:
+                date = to_timestamp(date, website_name)
+            items.append(ListingItem(title, urljoin(source_url, url), date or None, publisher or None))
+        return items
+
+    def _extract_lxml(self, html):
+        if isinstance(html, str) and html.lstrip().startswith('<?xml'):
+            # 带编码声明的字符串 lxml 不接受，转为字节解析
+            html = html.encode('utf-8')
+        try:
+            document = lxml.html.fromstring(html)
+        except lxml.etree.ParserError:
+            # 只有注释、空白等没有元素的文档
+            return []
+        container_xpath, item_xpath, fields = self._compiled()
+        containers = container_xpath(document)
+        if not containers:
+            return []
+
+        def value(element, spec):
+            if spec is None:
+                return None
+            xpath, attr = spec
+            target = element
+            if xpath is not None:
+                found = xpath(element)
+                if not found:
+                    return None
+                target = found[0]
+            return _clean(target.get(attr)) if attr else _clean(target.text_content())
+
+        return [
+            tuple(value(element, fields.get(name)) for name in ListingItem._fields)
+            for element in item_xpath(containers[0])
+        ]
+
+    def _extract_bs4(self, html):
+        parser = 'html.parser'
+        if self._strainer is not None:
+            # 只构建容器子树，其余标签在解析时直接丢弃
+            soup = BeautifulSoup(html, parser, parse_only=self._strainer)
+            container = soup.select_one(self.container) or soup
+        else:
+            container = BeautifulSoup(html, parser).select_one(self.container)
+        if container is None:
+            return []
+
+        def value(element, spec):
+            if spec is None:
+                return None
+            css, attr = spec
+            target = element.select_one(css) if css else element
+            if target is None:
+                return None
+            return _clean(target.get(attr)) if attr else _clean(target.get_text())
+
+        return [
+            tuple(value(element, self.fields[name]) for name in ListingItem._fields)
+            for element in container.select(self.item)
+        ]
+
+
+def extract_listing(html: str, source_url: str, container: str, item: str, website_name: str = None,
+                    **fields) -> list:
+    """一次性提取的便捷函数，fields 同 ListingSpec 的 title/url/date/publisher；反复使用时请复用 ListingSpec"""
+    return ListingSpec(container, item, **fields).extract(html, source_url, website_name)
@@ -0,0 +1,108 @@
+from config.db import db
+from app.models.crawl_results import CrawlResult
+from caiji.utils.common import get_item_field
+
+
+def load_known_urls(website_name: str, keyword: str = None, limit: int = None) -> set:
+    """
+    读取 crawl_results 中某个 (网站, 关键词) 最近保存的 limit 条 detail_url（以及规范化前的原链接），
+    limit 为 None 或 <= 0 时读取全部。keyword 为 None 时读取该网站所有关键词的记录（按网站汇总抓取时使用）。
+    列表页按发布时间倒序，连续命中 stop_after 条即停止翻页，只需要最近的记录；
+    更早的条目即使没有被识别出来，也会在保存时由 URL 索引与 detail_url 唯一约束去重。
+    """
+    query = db.session.query(CrawlResult.detail_url, CrawlResult.original_url) \
+        .filter(CrawlResult.website_name == website_name)
+    if keyword is not None:
+        query = query.filter(CrawlResult.keyword == keyword)
+    if limit and limit > 0:
+        query = query.order_by(CrawlResult.id.desc()).limit(limit)
+    return {url for row in query.all() for url in row if url}
+
+
+class IncrementalTracker:
+    """
+    增量抓取判定。
+
+    大多数网站的列表按发布时间倒序排列，连续遇到 stop_after 条已保存过的条目，
+    说明后面的分页都已经抓过，爬虫可以停止翻页。
+
+    爬虫在翻页循环中使用：
+        for item in page_items:
+            if self.incremental.observe(item['detail_url']):
+                items.append(item)
+        if self.incremental.should_stop():
+            break
+    """
+
+    def __init__(self, website_name: str, keyword: str, known_urls: set,
+                 stop_after: int = 10, logger=None, canonicalize=None):
+        self.website_name = website_name
+        self.keyword = keyword
+        # canonicalize 为 URL 规范化函数：爬虫登记的原始 URL 规范化后再比较；
+        # 规范化之前保存的旧记录由调用方把规范化后的写法加入 known_urls（见 LegacyUrlIndex）
+        self.canonicalize = canonicalize
+        self.known_urls = known_urls
+        self.stop_after = stop_after
+        self.logger = logger
+        self.new_urls = set()
+        self.consecutive_seen = 0
+        self.seen_count = 0
+        self.stopped = False
+
+    @classmethod
+    def for_task(cls, website_name: str, keyword: str = None, stop_after: int = 10, logger=None,
+                 canonicalize=None, legacy_urls=None, known_limit: int = None):
+        """
+        known_limit 为读取的最近已保存记录条数（见 load_known_urls）；
+        legacy_urls 为旧记录规范化后的 URL，与已保存的 URL 一起作为已知条目
+        """
+        known_urls = load_known_urls(website_name, keyword, known_limit)
+        if legacy_urls:
+            known_urls |= legacy_urls
+        return cls(website_name, keyword, known_urls,
+                   stop_after=stop_after, logger=logger, canonicalize=canonicalize)
+
+    @property
+    def new_count(self):
+        return len(self.new_urls)
+
+    def is_known(self, url: str) -> bool:
+        return url in self.known_urls
+
+    def observe(self, url: str) -> bool:
+        """
+        登记列表页上的一个条目，返回它是否为新条目。
+        已保存过的条目累加连续计数，新条目将其清零；本次已登记过的重复条目不计数。
+        """
+        if self.canonicalize is not None and url:
+            url = self.canonicalize(url)
+        if url in self.known_urls:
+            self.seen_count += 1
+            self.consecutive_seen += 1
+            return False
+        if url in self.new_urls:
+            return False
+        self.new_urls.add(url)
+        self.consecutive_seen = 0
+        return True
+
+    def should_stop(self) -> bool:
+        """连续已知条目达到 stop_after 时返回 True（stop_after <= 0 表示不提前停止）"""
+        if self.stop_after > 0 and self.consecutive_seen >= self.stop_after:
+            if not self.stopped and self.logger:
+                self.logger.info(f"增量模式：{self.website_name}（{self.keyword}）连续 "
+                                 f"{self.consecutive_seen} 条已抓取，停止翻页")
+            self.stopped = True
+        return self.stopped
+
+    def filter_new(self, items: list) -> list:
+        """保存前兜底过滤：去掉已保存过的条目以及同一批里的重复条目"""
+        fresh = []
+        batch = set()
+        for item in items:
+            url = get_item_field(item, 'detail_url')
+            if url in self.known_urls or url in batch:
+                continue
+            batch.add(url)
+            fresh.append(item)
+        return fresh
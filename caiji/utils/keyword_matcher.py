@@ -0,0 +1,130 @@
+import threading
+from collections import deque, OrderedDict
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机：把全部关键词编译为一个自动机，
+    每段文本只扫描一遍即可找出其中出现的全部关键词，耗时与关键词数量无关。
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+            node = nxt
+        if pattern not in self.output[node]:
+            self.output[node] = self.output[node] + (pattern,)
+
+    def _build(self):
+        # 广度优先计算失败指针，并把失败节点的输出合并到当前节点
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                if self.output[self.fail[child]]:
+                    self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text: str) -> set:
+        """返回文本中出现的全部模式"""
+        found = set()
+        if not text:
+            return found
+        goto, fail, output = self.goto, self.fail, self.output
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+class KeywordMatcher:
+    """
+    关键词匹配器：keyword_owners 为 {关键词: 拥有该关键词的配置名集合}。
+    match(text) 返回 {命中的关键词: 排序后的配置名列表}。
+    """
+
+    def __init__(self, keyword_owners: dict):
+        self.keyword_owners = {kw: sorted(owners) for kw, owners in keyword_owners.items() if kw}
+        self.automaton = AhoCorasick(self.keyword_owners.keys())
+
+    @classmethod
+    def from_configs(cls, configs) -> "KeywordMatcher":
+        """由 CrawlerConfig 记录（或带 config_name/keywords 属性的对象）构建"""
+        return cls(collect_keyword_owners(configs))
+
+    def match(self, text: str) -> dict:
+        return {kw: self.keyword_owners[kw] for kw in self.automaton.find_all(text)}
+
+    def match_keywords(self, text: str) -> set:
+        return self.automaton.find_all(text)
+
+    def __len__(self):
+        return len(self.keyword_owners)
+
+
+def collect_keyword_owners(configs) -> dict:
+    """汇总 {关键词: 配置名集合}，忽略空关键词"""
+    owners = {}
+    for config in configs:
+        for keyword in config.keywords or []:
+            if keyword and keyword.strip():
+                owners.setdefault(keyword.strip(), set()).add(config.config_name)
+    return owners
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def get_matcher(keyword_owners: dict) -> KeywordMatcher:
+    """
+    按关键词集合缓存编译好的匹配器，关键词或归属未变化时直接复用。
+    """
+    signature = tuple(sorted((kw, tuple(sorted(owners))) for kw, owners in keyword_owners.items()))
+    with _cache_lock:
+        matcher = _cache.get(signature)
+        if matcher is not None:
+            _cache.move_to_end(signature)
+            return matcher
+    matcher = KeywordMatcher(keyword_owners)
+    with _cache_lock:
+        _cache[signature] = matcher
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return matcher
+
+
+def get_config_matcher() -> KeywordMatcher:
+    """
+    由 crawler_configs 全部关键词构建匹配器；配置集合未变化时复用缓存的自动机。
+    """
+    # 延迟导入，匹配器本身不依赖数据库，可以在基准测试等场景单独使用
+    from app.models.crawler_config import CrawlerConfig
+
+    return get_matcher(collect_keyword_owners(CrawlerConfig.query.all()))
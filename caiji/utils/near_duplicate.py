@@ -0,0 +1,233 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from config.db import db
+from app.models.crawl_results import CrawlResult
+from caiji.utils.config_loader import load_config
+
+_MASK64 = (1 << 64) - 1
+_NOISE = re.compile(r'[\W_]+')
+
+
+def normalize_text(title: str, publisher: str = None) -> str:
+    """全角转半角、小写，去掉空白与标点；转载时常被改动的只有这些，文字本身保持不变"""
+    text = f"{title or ''}{publisher or ''}"
+    return _NOISE.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text: str, ngram: int = 3) -> int:
+    """64 位 SimHash，特征为字符 ngram（中文标题没有分词时按字切分效果更好）"""
+    if len(text) <= ngram:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + ngram] for i in range(len(text) - ngram + 1)]
+    weights = [0] * 64
+    for shingle in set(shingles):
+        h = _shingle_hash(shingle)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def to_signed(value: int) -> int:
+    """无符号 64 位转为 BIGINT 可以保存的有符号数"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK64).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    近重复公告检测：同一公告被多个网站转载时 detail_url 不同，但标题与发布单位基本相同。
+
+    - fingerprint() 对规范化后的标题 + 发布单位计算 64 位 SimHash，写入 crawl_results.simhash
+    - 内存中保存最近 window_days 天的“原始”结果（canonical_id 为空）的指纹，按分段建立倒排：
+      64 位分为 max_distance + 1 段，海明距离不超过 max_distance 的两个指纹至少有一段完全相同，
+      查询时只比较同段相同的候选
+    - assign() 为新写入的结果找出近重复的原始结果（同一批中先出现的结果也参与匹配），
+      返回 ({id: 原始结果 id}, 新的原始结果)，只计算、不修改索引；调用方写入 canonical_id 并提交事务后
+      再调用 confirm() 把新的原始结果加入索引，事务回滚时直接丢弃，索引中不会留下不存在的结果
+    规范化后不足 min_length 个字符的文本（如“通知”）不计算指纹，避免把不同公告误判为重复。
+    """
+
+    def __init__(self, max_distance: int = 3, window_days: float = 30, min_length: int = 8, logger=None):
+        self.max_distance = max_distance
+        self.window = timedelta(days=window_days)
+        self.min_length = min_length
+        self.logger = logger
+        self.bands = max_distance + 1
+        self.band_bits = -(-64 // self.bands)
+        self.linked = 0
+        self.watermark = 0
+        self._entries = {}
+        self._buckets = [defaultdict(set) for _ in range(self.bands)]
+        self._lock = threading.Lock()
+
+    def fingerprint(self, title: str, publisher: str = None):
+        """返回可以写入数据库的有符号指纹，文本过短时返回 None"""
+        text = normalize_text(title, publisher)
+        if len(text) < self.min_length:
+            return None
+        return to_signed(simhash(text))
+
+    def _band_keys(self, value: int):
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def _add(self, result_id: int, value: int, crawled_at: datetime):
+        value &= _MASK64
+        self._entries[result_id] = (value, crawled_at)
+        for band, key in enumerate(self._band_keys(value)):
+            self._buckets[band][key].add(result_id)
+
+    def _remove(self, result_id: int):
+        value, _ = self._entries.pop(result_id)
+        for band, key in enumerate(self._band_keys(value)):
+            bucket = self._buckets[band][key]
+            bucket.discard(result_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def _find(self, value: int, pending=None):
+        """
+        最接近的原始结果 id，没有时返回 None。
+        pending 为尚未提交的原始结果 ({id: 指纹}, 分段倒排)，与索引中的结果一起比较。
+        """
+        value &= _MASK64
+        best, best_distance = None, None
+        candidates = {}
+        for band, key in enumerate(self._band_keys(value)):
+            for candidate in self._buckets[band].get(key, ()):
+                candidates[candidate] = self._entries[candidate][0]
+            if pending is not None:
+                for candidate in pending[1][band].get(key, ()):
+                    candidates[candidate] = pending[0][candidate]
+        for candidate, other in candidates.items():
+            distance = hamming(value, other)
+            if distance <= self.max_distance and (
+                    best_distance is None or (distance, candidate) < (best_distance, best)):
+                best, best_distance = candidate, distance
+        return best
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self):
+        """补读其他进程写入的原始结果，并淘汰超出时间窗口的条目"""
+        cutoff = datetime.utcnow() - self.window
+        rows = db.session.query(CrawlResult.id, CrawlResult.simhash, CrawlResult.crawled_at) \
+            .filter(CrawlResult.id > self.watermark,
+                    CrawlResult.crawled_at >= cutoff,
+                    CrawlResult.simhash.isnot(None),
+                    CrawlResult.canonical_id.is_(None)) \
+            .all()
+        with self._lock:
+            for result_id, value, crawled_at in rows:
+                self._add(result_id, value, crawled_at)
+                self.watermark = max(self.watermark, result_id)
+            expired = [rid for rid, (_, crawled_at) in self._entries.items() if crawled_at < cutoff]
+            for result_id in expired:
+                self._remove(result_id)
+        if self.logger:
+            self.logger.info(f"近重复索引：载入 {len(rows)} 条，淘汰 {len(expired)} 条，共 {len(self)} 条")
+
+    def assign(self, rows: list):
+        """
+        rows 为按写入顺序排列的 (id, simhash, crawled_at)，返回 (links, originals)：
+        links 为其中近重复结果的 {id: 原始结果 id}，originals 为成为新原始结果的行。
+        不修改索引，提交成功后调用 confirm(originals, links)。
+        """
+        links = {}
+        originals = []
+        pending = ({}, [defaultdict(set) for _ in range(self.bands)])
+        with self._lock:
+            for result_id, value, crawled_at in rows:
+                if value is None or result_id in self._entries or result_id in pending[0]:
+                    continue
+                canonical = self._find(value, pending)
+                if canonical is not None:
+                    links[result_id] = canonical
+                    continue
+                originals.append((result_id, value, crawled_at))
+                pending[0][result_id] = value & _MASK64
+                for band, key in enumerate(self._band_keys(value & _MASK64)):
+                    pending[1][band][key].add(result_id)
+        return links, originals
+
+    def confirm(self, originals: list, links: dict = None):
+        """事务提交后把 assign() 得到的新原始结果加入索引，并累计关联数"""
+        with self._lock:
+            for result_id, value, crawled_at in originals:
+                if result_id not in self._entries:
+                    self._add(result_id, value, crawled_at)
+            self.linked += len(links or {})
+
+    def link(self, rows: list):
+        """assign() 并把 canonical_id 写入数据库，返回 (links, originals)；由调用方提交后 confirm()"""
+        links, originals = self.assign(rows)
+        if links:
+            db.session.execute(update(CrawlResult), [
+                {"id": result_id, "canonical_id": canonical} for result_id, canonical in links.items()
+            ])
+        return links, originals
+
+    def link_saved(self, detail_urls: list) -> dict:
+        """为爬虫自己 save() 保存的结果补写指纹并关联原始结果"""
+        urls = [url for url in detail_urls if url]
+        if not urls:
+            return {}
+        rows = db.session.query(CrawlResult.id, CrawlResult.title, CrawlResult.publisher, CrawlResult.crawled_at) \
+            .filter(CrawlResult.detail_url.in_(urls), CrawlResult.simhash.is_(None)) \
+            .order_by(CrawlResult.id) \
+            .all()
+        fingerprints = [(rid, self.fingerprint(title, publisher), crawled_at)
+                        for rid, title, publisher, crawled_at in rows]
+        fingerprints = [row for row in fingerprints if row[1] is not None]
+        if not fingerprints:
+            return {}
+        try:
+            db.session.execute(update(CrawlResult), [
+                {"id": result_id, "simhash": value} for result_id, value, _ in fingerprints
+            ])
+            links, originals = self.link(fingerprints)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.confirm(originals, links)
+        return links
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index(logger=None) -> NearDuplicateIndex:
+    """获取进程内共享的近重复索引（首次调用时按 [NEAR_DUPLICATE] 配置创建）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            config = load_config()
+            _index = NearDuplicateIndex(
+                max_distance=config.getint('NEAR_DUPLICATE', 'max_distance', fallback=3),
+                window_days=config.getfloat('NEAR_DUPLICATE', 'window_days', fallback=30),
+                min_length=config.getint('NEAR_DUPLICATE', 'min_length', fallback=8),
+                logger=logger,
+            )
+        return _index
@@ -1,13 +1,14 @@
 from datetime import datetime, timedelta
 from config.db import db
 from app.models.base_crawler import BaseCrawler
+from app.models.crawl_pool import CrawlPool
 
 
-def mark_running(base_id: int, frequency_hours: int):
+def mark_running(base_id: int, frequency_hours: int, next_run_time: datetime = None):
     """
     爬虫开始前调用：
     - crawler_status = 2
-    - next_run_time = now + frequency_hours
+    - next_run_time = now + frequency_hours（调度模式下传入调度队列中最早的到期时间）
     """
     session = db.session
     try:
@@ -15,7 +16,7 @@ def mark_running(base_id: int, frequency_hours: int):
         if base is None:
             raise ValueError(f"找不到 id={base_id} 的 BaseCrawler 配置")
         base.crawler_status = 2
-        base.next_run_time = datetime.utcnow() + timedelta(hours=frequency_hours)
+        base.next_run_time = next_run_time or datetime.utcnow() + timedelta(hours=frequency_hours)
         session.commit()
     finally:
         session.close()
@@ -35,3 +36,68 @@ def mark_idle(base_id: int):
         session.commit()
     finally:
         session.close()
+
+
+def begin_sweep(base_id: int):
+    """
+    采集循环中调用，返回 (generation, is_new)：
+    - 当前一轮尚未完成（generation > finished_generation）时返回该轮：分布式模式下 worker 加入执行，
+      进程中断重启后继续执行剩余任务；不修改 next_run_time，crawler_status 被心跳监控重置时恢复为 2
+    - 已到运行时间时开启新一轮：generation + 1，crawler_status = 2，next_run_time = now + frequency
+    - 未到运行时间返回 (None, False)
+    记录用 SELECT ... FOR UPDATE 锁住，同一轮只会被一个 worker 开启。
+    """
+    session = db.session
+    try:
+        base = session.query(BaseCrawler).filter_by(id=base_id).with_for_update().one_or_none()
+        if base is None:
+            raise ValueError(f"找不到 id={base_id} 的 BaseCrawler 配置")
+        if (base.generation or 0) > (base.finished_generation or 0):
+            base.crawler_status = 2
+            generation = base.generation
+            session.commit()
+            return generation, False
+
+        now = datetime.utcnow()
+        if base.next_run_time and now < base.next_run_time.replace(tzinfo=None):
+            session.commit()
+            return None, False
+
+        base.generation = (base.generation or 0) + 1
+        base.crawler_status = 2
+        base.next_run_time = now + timedelta(hours=base.frequency)
+        generation = base.generation
+        session.commit()
+        return generation, True
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def finish_sweep(base_id: int, generation: int) -> bool:
+    """
+    第 generation 轮的全部 crawl_pool 任务都已完成时记录 finished_generation 并把 crawler_status 置为 1
+    （已由其它 worker 结束时不再修改），返回 True；仍有任务未完成（其它 worker 在执行、租约尚未过期，
+    或进度尚未保存）时返回 False。
+    """
+    session = db.session
+    try:
+        base = session.query(BaseCrawler).filter_by(id=base_id).with_for_update().one_or_none()
+        if base is None:
+            raise ValueError(f"找不到 id={base_id} 的 BaseCrawler 配置")
+        unfinished = session.query(CrawlPool.id).filter(CrawlPool.done_generation < generation).first()
+        if unfinished is not None:
+            session.commit()
+            return False
+        if base.generation == generation and (base.finished_generation or 0) < generation:
+            base.finished_generation = generation
+            base.crawler_status = 1
+        session.commit()
+        return True
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -1,6 +1,9 @@
+import time
+from datetime import datetime
 from app.models.crawler_config import CrawlerConfig
 from app.models.crawl_pool import CrawlPool
 from config.db import db
+from sqlalchemy import insert, update, delete
 from sqlalchemy.exc import SQLAlchemyError
 from collections import defaultdict
 
@@ -16,12 +19,16 @@ def sync_crawler_config_to_pool(logger):
     相同keyword+website_name组合的config_name会合并
     对于相同组合，category取第一个配置的值
 
+    增量同步：与crawl_pool现有记录做差异比较，只新增、更新、删除有变化的组合，
+    未变化的记录保留原有id，任务上的运行状态在同步后依然有效
+
     Returns:
-        dict: 同步结果统计
+        dict: 同步结果统计（added/updated/removed/unchanged/elapsed）
     """
+    start = time.monotonic()
     try:
         # 查询所有crawler_config记录
-        configs = CrawlerConfig.query.all()
+        configs = CrawlerConfig.query.order_by(CrawlerConfig.config_name).all()
         logger.info(f"获取到 {len(configs)} 条crawler_config记录")
 
         if not configs:
@@ -70,38 +77,70 @@ def sync_crawler_config_to_pool(logger):
 
         logger.info(f"生成了 {len(pool_data)} 个唯一的关键词+网站名组合")
 
-        # 清空现有的crawl_pool数据
-        CrawlPool.query.delete()
-        logger.info("清空了crawl_pool表的现有数据")
-
-        # 批量插入新数据
-        synced_count = 0
+        # 读取现有pool记录，按 (keyword, website_name) 建立索引
+        existing = {}
+        duplicate_ids = []
+        for row in db.session.query(CrawlPool.id, CrawlPool.keyword, CrawlPool.website_names,
+                                    CrawlPool.config_names, CrawlPool.category).order_by(CrawlPool.id):
+            key = (row.keyword, row.website_names)
+            if key in existing:
+                # 历史数据中重复的组合只保留id最小的一条
+                duplicate_ids.append(row.id)
+            else:
+                existing[key] = row
+
+        now = datetime.utcnow()
+        to_insert = []
+        to_update = []
         for (keyword, website_name), data in pool_data.items():
-            try:
-                # 创建新的CrawlPool记录
-                pool_record = CrawlPool(
-                    source_url="",
-                    keyword=keyword,
-                    website_names=website_name,
-                    config_names=list(data["config_names"]),  # 转换set为list
-                    category=data["category"]
-                )
-
-                db.session.add(pool_record)
-                synced_count += 1
-
-            except Exception as e:
-                logger.error(f"插入记录失败 - keyword: {keyword}, website: {website_name}, error: {str(e)}")
-                continue
+            config_names = sorted(data["config_names"])
+            category = data["category"]
+            row = existing.get((keyword, website_name))
+            if row is None:
+                to_insert.append({
+                    "source_url": "",
+                    "keyword": keyword,
+                    "website_names": website_name,
+                    "config_names": config_names,
+                    "category": category,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            elif sorted(row.config_names or []) != config_names or row.category != category:
+                to_update.append({
+                    "id": row.id,
+                    "config_names": config_names,
+                    "category": category,
+                    "updated_at": now,
+                })
+
+        to_delete = [row.id for key, row in existing.items() if key not in pool_data] + duplicate_ids
+
+        # 批量执行差异
+        if to_insert:
+            db.session.execute(insert(CrawlPool), to_insert)
+        if to_update:
+            db.session.execute(update(CrawlPool), to_update)
+        if to_delete:
+            db.session.execute(delete(CrawlPool).where(CrawlPool.id.in_(to_delete)))
 
         # 提交事务
         db.session.commit()
-        logger.info(f"成功同步 {synced_count} 条记录到crawl_pool")
+
+        unchanged = len(pool_data) - len(to_insert) - len(to_update)
+        elapsed = round(time.monotonic() - start, 3)
+        logger.info(f"crawl_pool同步完成：新增 {len(to_insert)}，更新 {len(to_update)}，"
+                    f"删除 {len(to_delete)}，未变化 {unchanged}，耗时 {elapsed} 秒")
 
         return {
             "status": "success",
-            "message": f"成功同步 {synced_count} 条记录",
-            "synced_count": synced_count,
+            "message": f"成功同步 {len(pool_data)} 条记录",
+            "synced_count": len(pool_data),
+            "added": len(to_insert),
+            "updated": len(to_update),
+            "removed": len(to_delete),
+            "unchanged": unchanged,
+            "elapsed": elapsed,
             "total_configs": len(configs),
             "total_combinations": len(pool_data)
         }
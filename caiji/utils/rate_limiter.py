@@ -0,0 +1,212 @@
+import threading
+import time
+
+from caiji.utils.config_loader import load_config
+from caiji.utils.task_watchdog import cancellable_sleep
+
+# 速率下限（次/秒），避免速率为 0 时等待时间无穷大
+MIN_RATE = 0.001
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多累积 burst 个。
+    acquire() 在没有令牌时阻塞等待（可被看门狗取消），线程安全。
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, MIN_RATE)
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """取走一个令牌，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            # 任务被看门狗取消时立即抛出 TaskCancelled，不必等满限速时间
+            cancellable_sleep(delay)
+            waited += delay
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(rate, MIN_RATE)
+
+    def block_for(self, seconds: float):
+        """暂停发放令牌（服务端返回 Retry-After 时使用）"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class AdaptiveRateLimiter:
+    """
+    单个网站的自适应限速器（AIMD）：
+    - 遇到 429/503、连接错误，或平均延迟明显高于基线时，速率乘以 decrease_factor
+    - 响应正常时每次加 increase_step，最高回到 max_rate
+    """
+
+    def __init__(self, website_name: str, rate: float, burst: float,
+                 min_rate: float = 0.1, max_rate: float = None,
+                 decrease_factor: float = 0.5, increase_step: float = 0.05,
+                 latency_factor: float = 2.0, logger=None):
+        self.website_name = website_name
+        self.min_rate = max(min_rate, MIN_RATE)
+        self.max_rate = max_rate or rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.latency_factor = latency_factor
+        self.logger = logger
+        self.bucket = TokenBucket(rate, burst)
+        self.latency_avg = None
+        self.latency_base = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self) -> float:
+        return self.bucket.acquire()
+
+    def record(self, status_code: int = None, latency: float = None, retry_after: float = None):
+        """
+        记录一次请求结果并调整速率。status_code 为 None 表示连接错误或超时。
+        """
+        with self._lock:
+            slow = False
+            if latency is not None and status_code is not None:
+                # 指数滑动平均；基线只缓慢上调，避免被持续变慢的响应带偏
+                self.latency_avg = latency if self.latency_avg is None else 0.8 * self.latency_avg + 0.2 * latency
+                if self.latency_base is None or self.latency_avg < self.latency_base:
+                    self.latency_base = self.latency_avg
+                else:
+                    self.latency_base = 0.99 * self.latency_base + 0.01 * self.latency_avg
+                slow = self.latency_avg > self.latency_base * self.latency_factor
+
+            throttled = status_code is None or status_code in (429, 503)
+            old_rate = self.bucket.rate
+            if throttled or slow:
+                new_rate = max(self.min_rate, old_rate * self.decrease_factor)
+            else:
+                new_rate = min(self.max_rate, old_rate + self.increase_step)
+
+            if new_rate != old_rate:
+                self.bucket.set_rate(new_rate)
+                if throttled or slow:
+                    reason = f"状态码 {status_code}" if status_code else "连接异常"
+                    if slow and not throttled:
+                        reason = f"延迟升高 {self.latency_avg:.2f}s（基线 {self.latency_base:.2f}s）"
+                    self._log(f"限速下调（{self.website_name}）：{old_rate:.2f} -> {new_rate:.2f} 次/秒，原因：{reason}")
+
+        if retry_after:
+            self.bucket.block_for(retry_after)
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+
+class RateLimiterRegistry:
+    """
+    按 website_name 管理限速器。
+
+    默认参数读取 config.ini 的 [RATE_LIMIT] 段，单个网站可以在 [rate_limit_sites] 段覆盖：
+        网站名 = 每秒请求数, 突发数
+    """
+
+    def __init__(self, default_rate: float = 2.0, default_burst: float = 4,
+                 min_rate: float = 0.1, site_limits: dict = None, logger=None, **limiter_kwargs):
+        if default_rate <= 0 or min_rate <= 0:
+            raise ValueError(f"[RATE_LIMIT] default_rate 与 min_rate 必须大于 0：{default_rate}, {min_rate}")
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.min_rate = min_rate
+        self.site_limits = {k.lower(): v for k, v in (site_limits or {}).items()}
+        self.logger = logger
+        self.limiter_kwargs = limiter_kwargs
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, website_name: str) -> AdaptiveRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(website_name)
+            if limiter is None:
+                rate, burst = self.site_limits.get(website_name.lower(), (self.default_rate, self.default_burst))
+                limiter = AdaptiveRateLimiter(
+                    website_name, rate, burst,
+                    min_rate=min(self.min_rate, rate),
+                    logger=self.logger,
+                    **self.limiter_kwargs,
+                )
+                self._limiters[website_name] = limiter
+            return limiter
+
+    def acquire(self, website_name: str) -> float:
+        return self.get(website_name).acquire()
+
+    def record(self, website_name: str, status_code: int = None, latency: float = None,
+               retry_after: float = None):
+        self.get(website_name).record(status_code, latency, retry_after)
+
+    def snapshot(self) -> dict:
+        """当前各网站的实际速率，便于写日志"""
+        with self._lock:
+            return {name: round(limiter.rate, 3) for name, limiter in self._limiters.items()}
+
+
+def load_site_limits(config) -> dict:
+    """解析 [rate_limit_sites] 段：网站名 = rate[, burst]，rate 必须大于 0"""
+    limits = {}
+    if not config.has_section('rate_limit_sites'):
+        return limits
+    for name, value in config.items('rate_limit_sites'):
+        parts = [p.strip() for p in value.split(',') if p.strip()]
+        if not parts:
+            continue
+        rate = float(parts[0])
+        if rate <= 0:
+            raise ValueError(f"[rate_limit_sites] {name} 的每秒请求数必须大于 0：{value}")
+        burst = float(parts[1]) if len(parts) > 1 else max(rate, 1)
+        limits[name] = (rate, burst)
+    return limits
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(logger=None) -> RateLimiterRegistry:
+    """获取进程内共享的限速器注册表（首次调用时读取配置）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            config = load_config()
+            _registry = RateLimiterRegistry(
+                default_rate=config.getfloat('RATE_LIMIT', 'default_rate', fallback=2.0),
+                default_burst=config.getfloat('RATE_LIMIT', 'default_burst', fallback=4),
+                min_rate=config.getfloat('RATE_LIMIT', 'min_rate', fallback=0.1),
+                site_limits=load_site_limits(config),
+                decrease_factor=config.getfloat('RATE_LIMIT', 'decrease_factor', fallback=0.5),
+                increase_step=config.getfloat('RATE_LIMIT', 'increase_step', fallback=0.05),
+                latency_factor=config.getfloat('RATE_LIMIT', 'latency_factor', fallback=2.0),
+                logger=logger,
+            )
+        return _registry
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class CacheEntry:
+    """缓存中的一条响应"""
+
+    def __init__(self, key, etag, last_modified, body_hash, body, encoding):
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.body = body
+        self.encoding = encoding
+
+
+class ResponseCache:
+    """
+    列表页响应的本地磁盘缓存（SQLite）。
+
+    按请求键（fetcher 生成：带查询参数的完整 URL + 请求体与自定义请求头的哈希，保存在 url 列）
+    保存 ETag / Last-Modified / 响应体哈希与压缩后的响应体，同一 URL 的不同查询互不影响：
+    - 再次抓取时带上 If-None-Match / If-Modified-Since，服务端返回 304 即直接使用缓存
+    - 返回 200 但响应体哈希未变化时同样视为未变化，爬虫可以跳过解析
+    - 每次写入后检查条目数与总大小，超出上限时立即按最近访问时间淘汰到上限的 90%
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body_hash TEXT NOT NULL,
+            body BLOB NOT NULL,
+            encoding TEXT,
+            size INTEGER NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, max_entries: int = 20000, max_bytes: int = 200 * 1024 * 1024, logger=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self._SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_idx ON responses (accessed_at)")
+        # 当前条目数与压缩后总大小，写入与淘汰时同步更新，不必每次写入都统计全表
+        self._count, self._total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    @staticmethod
+    def hash_body(body: bytes) -> str:
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, body, encoding FROM responses WHERE url = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body_hash, body, encoding = row
+        return CacheEntry(key, etag, last_modified, body_hash, zlib.decompress(body), encoding)
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> dict:
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def put(self, key: str, etag, last_modified, body: bytes, encoding, body_hash: str = None):
+        compressed = zlib.compress(body, 6)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, etag, last_modified, body_hash, body, encoding, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body_hash or self.hash_body(body), compressed,
+                 encoding, len(compressed), time.time())
+            )
+            if previous is None:
+                self._count += 1
+            else:
+                self._total -= previous[0]
+            self._total += len(compressed)
+            if self._count > self.max_entries or self._total > self.max_bytes:
+                self._evict()
+
+    def touch(self, key: str):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), key))
+
+    def record(self, hit: bool, not_modified: bool = False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                if not_modified:
+                    self.not_modified += 1
+            else:
+                self.misses += 1
+
+    def _evict(self):
+        # 以数据库为准重新统计（其它进程可能共用同一个缓存文件）
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._count, self._total = count, total
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发
+        target_entries = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+        removed = 0
+        rows = self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall()
+        to_delete = []
+        for url, size in rows:
+            if count <= target_entries and total <= target_bytes:
+                break
+            to_delete.append((url,))
+            count -= 1
+            total -= size
+            removed += 1
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", to_delete)
+        self._count, self._total = count, total
+        self.evicted += removed
+        if self.logger:
+            self.logger.info(f"响应缓存淘汰 {removed} 条，剩余 {count} 条，约 {total // 1024} KB")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "not_modified": self.not_modified,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evicted": self.evicted,
+            }
+
+    def reset_counters(self):
+        with self._lock:
+            self.hits = self.misses = self.not_modified = self.evicted = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,248 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from config.db import db
+from app.models.crawl_results import CrawlResult
+from caiji.utils.common import get_item_field
+
+
+RESULT_FIELDS = ('title', 'detail_url', 'original_url', 'publish_time', 'publisher')
+
+
+def build_result_rows(items: list, task: dict) -> list:
+    """
+    将爬虫返回的条目转换为 crawl_results 的行（dict）。
+    category/keyword/website_name/source_url 取自任务；条目自带 config_name 时优先使用，
+    否则取任务 config_names 中的第一个（detail_url 唯一，同一条结果只会保存一行）。
+    """
+    config_names = task.get("config_names") or []
+    if isinstance(config_names, str):
+        config_names = [config_names]
+    default_config = config_names[0] if config_names else ''
+
+    rows = []
+    for item in items:
+        detail_url = get_item_field(item, 'detail_url')
+        title = get_item_field(item, 'title')
+        if not detail_url or not title:
+            continue
+        row = {field: get_item_field(item, field) for field in RESULT_FIELDS}
+        row.update(
+            category=get_item_field(item, 'category') or task["category"],
+            config_name=get_item_field(item, 'config_name') or default_config,
+            keyword=get_item_field(item, 'keyword') or task["keyword"],
+            website_name=task["website_names"],
+            source_url=get_item_field(item, 'source_url') or task["source_url"] or '',
+            is_pushed=0,
+            crawled_at=datetime.utcnow(),
+        )
+        rows.append(row)
+    return rows
+
+
+class ResultWriter:
+    """
+    批量写入 crawl_results 的后台线程。
+
+    各爬虫任务把结果行放入队列，写入线程凑满 batch_size 行或等待 flush_interval 秒后，
+    用一条多行 INSERT ... ON CONFLICT (detail_url) DO NOTHING RETURNING 写入，
+    并按任务统计实际插入与重复的行数。
+    传入 near_duplicates（NearDuplicateIndex）时同时写入 simhash，并在同一事务中把其它网站转载的
+    近重复结果关联到原始结果（canonical_id）。
+    整批写入失败（如个别行超长）时把该批对半拆分重试，最终只丢弃并记录无法写入的行。
+    """
+
+    def __init__(self, app, batch_size: int = 500, flush_interval: float = 2.0, near_duplicates=None,
+                 flush_timeout: float = 300, logger=None):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_timeout = flush_timeout
+        self.near_duplicates = near_duplicates
+        self.logger = logger
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.linked = 0
+        self.task_stats = defaultdict(lambda: {"inserted": 0, "duplicates": 0, "failed": 0})
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="result_writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, rows: list, task_id=None):
+        """
+        放入待写入的行，task_id 用于按任务统计。
+        写入线程已停止（如本轮已结束、放弃等待的任务线程迟迟才提交）时记录错误并抛出 RuntimeError，
+        不会把行放进再也没有线程处理的队列里。
+        """
+        with self._submit_lock:
+            if self._stopped:
+                self._log_error(f"批量写入线程已停止，丢弃任务 {task_id} 的 {len(rows)} 条结果")
+                raise RuntimeError("批量写入线程已停止")
+            for row in rows:
+                self._queue.put((task_id, row))
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待当前队列中的行全部写入，返回是否写完。
+        超过 timeout 秒（默认 flush_timeout）或写入线程已经退出时返回 False，不会一直阻塞。
+        """
+        if not self.alive:
+            self._log_error("批量写入线程未运行，无法等待写入完成")
+            return False
+        timeout = self.flush_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(min(1.0, max(deadline - time.monotonic(), 0))):
+            if not self.alive:
+                self._log_error("批量写入线程已退出，队列中的结果未能写入")
+                return False
+            if time.monotonic() >= deadline:
+                self._log_error(f"等待批量写入超过 {timeout:.0f} 秒，队列中还有约 {self._queue.qsize()} 条")
+                return False
+        return True
+
+    def stop(self, timeout: float = None):
+        """写完剩余数据后结束写入线程"""
+        with self._submit_lock:
+            self._stopped = True
+            if self._thread is None:
+                return
+            self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def get_task_stats(self, task_id) -> dict:
+        with self._stats_lock:
+            return dict(self.task_stats.get(task_id, {"inserted": 0, "duplicates": 0, "failed": 0}))
+
+    def _run(self):
+        with self.app.app_context():
+            batch = []
+            deadline = None
+            while True:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    # 距第一行入队已超过 flush_interval
+                    self._write(batch)
+                    batch, deadline = [], None
+                    continue
+
+                # None 为停止信号，Event 为 flush 请求，两者都先写完当前批次
+                if entry is None or isinstance(entry, threading.Event):
+                    if batch:
+                        self._write(batch)
+                    batch, deadline = [], None
+                    if entry is None:
+                        return
+                    entry.set()
+                    continue
+
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+                    deadline = None
+
+    def _write(self, batch: list):
+        # 同一批内相同 detail_url 只保留第一条，其余直接计为重复
+        unique = {}
+        task_of = {}
+        local_dups = []
+        for task_id, row in batch:
+            url = row['detail_url']
+            if url in unique:
+                local_dups.append(task_id)
+                continue
+            unique[url] = row
+            task_of[url] = task_id
+
+        index = self.near_duplicates
+        if index is not None:
+            for row in unique.values():
+                row['simhash'] = index.fingerprint(row['title'], row['publisher'])
+
+        inserted, links, failed = self._insert(list(unique.values()))
+        inserted_urls = set(inserted)
+
+        duplicates = len(batch) - len(inserted_urls) - len(failed)
+        with self._stats_lock:
+            for url, task_id in task_of.items():
+                if url in inserted_urls:
+                    key = "inserted"
+                elif url in failed:
+                    key = "failed"
+                else:
+                    key = "duplicates"
+                self.task_stats[task_id][key] += 1
+            for task_id in local_dups:
+                self.task_stats[task_id]["duplicates"] += 1
+            self.inserted += len(inserted_urls)
+            self.duplicates += duplicates
+            self.failed += len(failed)
+            self.linked += len(links)
+
+        if self.logger:
+            self.logger.info(f"批量写入 {len(batch)} 条：新增 {len(inserted_urls)}（其中近重复 {len(links)}），"
+                             f"重复 {duplicates}" + (f"，失败 {len(failed)}" if failed else ""))
+
+    def _insert(self, rows: list):
+        """
+        写入一组行并提交，返回 ({detail_url: id}, 近重复关联, 写入失败的 detail_url 集合)。
+        失败时回滚并把这组行对半拆分分别重试，单独一行仍然失败时记录该行并丢弃。
+        """
+        index = self.near_duplicates
+        try:
+            stmt = pg_insert(CrawlResult).values(rows) \
+                .on_conflict_do_nothing(index_elements=['detail_url']) \
+                .returning(CrawlResult.id, CrawlResult.detail_url)
+            inserted = {url: result_id for result_id, url in db.session.execute(stmt)}
+            links, originals = {}, []
+            if index is not None:
+                # 按提交顺序处理，同一批里先出现的结果成为原始结果
+                links, originals = index.link([(inserted[row['detail_url']], row['simhash'], row['crawled_at'])
+                                               for row in rows if row['detail_url'] in inserted])
+            db.session.commit()
+            if index is not None:
+                # 提交成功后才把新的原始结果加入索引，回滚的批次不会在索引中留下不存在的结果
+                index.confirm(originals, links)
+            return inserted, links, set()
+        except Exception as e:
+            db.session.rollback()
+            if len(rows) == 1:
+                self._log_error(f"结果写入失败，已丢弃：{rows[0]['detail_url']}（{rows[0]['website_name']}）：{e}")
+                return {}, {}, {rows[0]['detail_url']}
+            if self.logger:
+                self.logger.warning(f"批量写入 {len(rows)} 条失败，拆分后重试：{type(e).__name__}: {e}")
+
+        middle = len(rows) // 2
+        inserted, links, failed = self._insert(rows[:middle])
+        more_inserted, more_links, more_failed = self._insert(rows[middle:])
+        inserted.update(more_inserted)
+        links.update(more_links)
+        return inserted, links, failed | more_failed
+
+    def _log_error(self, msg):
+        if self.logger:
+            self.logger.error(msg)
@@ -0,0 +1,252 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+
+from config.db import db
+from app.models.crawl_results import CrawlResult
+from caiji.utils.common import get_item_field
+from caiji.utils.config_loader import load_config
+
+
+class BloomFilter:
+    """
+    定长 Bloom 过滤器：判断“一定不存在”或“可能存在”。
+    capacity 条目时的误判率约为 error_rate。
+    """
+
+    _HEADER = struct.Struct('>4sQQQd')
+    _MAGIC = b'BLM1'
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> bool:
+        """加入一个条目，返回是否改变了过滤器（重复加入不计数）"""
+        changed = False
+        for pos in self._positions(key):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                changed = True
+        if changed:
+            self.count += 1
+        return changed
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        header = self._HEADER.pack(self._MAGIC, self.capacity, self.num_hashes, self.count, self.error_rate)
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, capacity, num_hashes, count, error_rate = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC:
+            raise ValueError("不是有效的 Bloom 过滤器文件")
+        bloom = cls(capacity, error_rate)
+        bits = data[cls._HEADER.size:]
+        if num_hashes != bloom.num_hashes or len(bits) != len(bloom.bits):
+            raise ValueError("Bloom 过滤器文件参数不匹配")
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        return bloom
+
+
+class SeenUrlIndex:
+    """
+    爬虫进程内的已保存 detail_url 索引。
+
+    - 启动时从本地文件恢复，再只补读 crawl_results 中 id 大于水位线的新行，重启不必全表扫描；
+      多个 worker 同时写入时 id 较小的行可能晚提交，补读时从水位线往回多扫 rescan_margin 行
+    - Bloom 判定“一定不存在”的条目直接保存；“可能存在”的条目再用一次 IN 查询精确确认
+    - 条目数超过容量时按两倍容量从数据库重建
+    """
+
+    _WATERMARK = struct.Struct('>Q')
+
+    def __init__(self, path: str, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 batch_size: int = 10000, rescan_margin: int = 5000, logger=None):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.batch_size = batch_size
+        self.rescan_margin = max(rescan_margin, 0)
+        self.logger = logger
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.watermark = 0
+        self.exact_checks = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """从本地文件恢复，并补读数据库中水位线之后的新记录"""
+        with self._lock:
+            if self.watermark == 0 and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'rb') as f:
+                        data = f.read()
+                    self.watermark = self._WATERMARK.unpack_from(data)[0]
+                    self.bloom = BloomFilter.from_bytes(data[self._WATERMARK.size:])
+                    self.capacity = self.bloom.capacity
+                    self._log(f"已从 {self.path} 恢复 URL 索引，{self.bloom.count} 条，水位线 id={self.watermark}")
+                except Exception as e:
+                    self._log(f"读取 URL 索引文件失败，将从数据库重建: {e}")
+                    self.bloom = BloomFilter(self.capacity, self.error_rate)
+                    self.watermark = 0
+            loaded = self._catch_up()
+            if self.bloom.count > self.capacity:
+                self._rebuild(self.bloom.count * 2)
+            elif loaded:
+                self._log(f"URL 索引补读 {loaded} 条，当前共 {self.bloom.count} 条")
+
+    def _catch_up(self) -> int:
+        """
+        补读水位线之后的新行。水位线之前 rescan_margin 行内晚提交的行（事务先取得 id、
+        其它 worker 的更大 id 先提交）上次补读时还看不到，这里重新扫一遍；已在过滤器中的 URL 重复加入不计数。
+        """
+        if self.watermark == 0:
+            return self._load_since(0)
+        return self._load_since(max(self.watermark - self.rescan_margin, 0))
+
+    def _load_since(self, after_id: int) -> int:
+        loaded = 0
+        while True:
+            rows = db.session.query(CrawlResult.id, CrawlResult.detail_url) \
+                .filter(CrawlResult.id > after_id) \
+                .order_by(CrawlResult.id) \
+                .limit(self.batch_size) \
+                .all()
+            if not rows:
+                break
+            for row_id, url in rows:
+                self.bloom.add(url)
+            after_id = rows[-1][0]
+            loaded += len(rows)
+        self.watermark = max(self.watermark, after_id)
+        return loaded
+
+    def _rebuild(self, capacity: int):
+        self._log(f"URL 索引条目数 {self.bloom.count} 超过容量，按容量 {capacity} 重建")
+        self.capacity = capacity
+        self.bloom = BloomFilter(capacity, self.error_rate)
+        self.watermark = 0
+        self._load_since(0)
+
+    def might_contain(self, url: str) -> bool:
+        with self._lock:
+            return url in self.bloom
+
+    def add(self, url: str):
+        with self._lock:
+            self.bloom.add(url)
+
+    def add_many(self, urls):
+        with self._lock:
+            for url in urls:
+                self.bloom.add(url)
+
+    def contains_exact(self, urls) -> set:
+        """在数据库中精确确认，返回其中已存在的 detail_url"""
+        urls = list(urls)
+        if not urls:
+            return set()
+        rows = db.session.query(CrawlResult.detail_url) \
+            .filter(CrawlResult.detail_url.in_(urls)) \
+            .all()
+        return {row[0] for row in rows}
+
+    def partition(self, items: list):
+        """
+        将条目分为 (新条目, 已存在条目)。
+        只有 Bloom 判定“可能存在”的条目才会查询数据库。
+        """
+        maybe = []
+        fresh = []
+        with self._lock:
+            for item in items:
+                url = get_item_field(item, 'detail_url')
+                (maybe if url in self.bloom else fresh).append(item)
+
+        existing = []
+        if maybe:
+            found = self.contains_exact(get_item_field(item, 'detail_url') for item in maybe)
+            for item in maybe:
+                if get_item_field(item, 'detail_url') in found:
+                    existing.append(item)
+                else:
+                    fresh.append(item)
+            # 计数在多个任务线程间共享，在锁内累加
+            with self._lock:
+                self.exact_checks += len(maybe)
+                self.false_positives += len(maybe) - len(existing)
+        return fresh, existing
+
+    def save(self):
+        """原子写入本地文件（先写临时文件再替换）"""
+        with self._lock:
+            data = self._WATERMARK.pack(self.watermark) + self.bloom.to_bytes()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """补读其他进程或本进程新写入的记录，并推进水位线"""
+        with self._lock:
+            self._catch_up()
+            if self.bloom.count > self.capacity:
+                self._rebuild(self.bloom.count * 2)
+
+    def reset_counters(self):
+        """清零精确校验与误判计数（每轮开始时调用）"""
+        with self._lock:
+            self.exact_checks = 0
+            self.false_positives = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"exact_checks": self.exact_checks, "false_positives": self.false_positives}
+
+    def _log(self, msg):
+        if self.logger:
+            self.logger.info(msg)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_seen_index(logger=None) -> SeenUrlIndex:
+    """获取进程内共享的 URL 索引（首次调用时按 [SEEN_INDEX] 配置创建并预热）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            config = load_config()
+            _index = SeenUrlIndex(
+                path=config.get('SEEN_INDEX', 'path', fallback='config/seen_urls.bloom'),
+                capacity=config.getint('SEEN_INDEX', 'capacity', fallback=1_000_000),
+                error_rate=config.getfloat('SEEN_INDEX', 'error_rate', fallback=0.001),
+                rescan_margin=config.getint('SEEN_INDEX', 'rescan_margin', fallback=5000),
+                logger=logger,
+            )
+            _index.warm()
+        return _index
@@ -3,11 +3,14 @@ from config.db import db
 from app.models.heartbeat_model import Heartbeat
 
 
-def send_caiji_heartbeat():
+def send_caiji_heartbeat(task=None):
     """
     更新 heartbeat 表中的 caiji_heartbeat 字段（id=1）。
+    task 为看门狗中执行时间最长的任务（RunningTask），一并记录任务名称与开始时间，空闲时清空。
     """
     record = db.session.get(Heartbeat, 1)
     if record:
         record.caiji_heartbeat = datetime.utcnow()
+        record.caiji_task = task.label[:255] if task is not None else None
+        record.caiji_task_started_at = task.started_at if task is not None else None
         db.session.commit()
@@ -0,0 +1,268 @@
+import ast
+import importlib
+import os
+import sys
+import threading
+
+from caiji.utils.task_watchdog import current_task, get_watchdog
+
+# 爬虫模块所在的包（caiji/modules，命名空间包，不需要 __init__.py）
+SPIDER_PACKAGE = 'caiji.modules'
+_DECORATOR = 'register_spider'
+
+# 已导入模块中通过装饰器登记的爬虫类：{网站名: 类}
+_registered = {}
+_registered_lock = threading.Lock()
+
+
+def register_spider(*website_names: str):
+    """
+    登记爬虫类，网站名与 crawl_pool.website_names 一致，一个类可以对应多个网站：
+
+        @register_spider("某某大学")
+        class XxxSpider:
+            ...
+
+    网站名必须写成字符串字面量：注册表启动时只做语法扫描找到网站名所在的模块，
+    任务第一次用到该网站时才导入模块。
+    """
+    def decorator(spider_class):
+        with _registered_lock:
+            for name in website_names:
+                _registered[name] = spider_class
+        return spider_class
+    return decorator
+
+
+def _unregister_module(module_name: str) -> dict:
+    """移除某个模块中登记的全部爬虫类，返回被移除的 {网站名: 类}"""
+    with _registered_lock:
+        removed = {name: cls for name, cls in _registered.items()
+                   if getattr(cls, '__module__', None) == module_name}
+        for name in removed:
+            del _registered[name]
+    return removed
+
+
+def _decorated_names(tree) -> list:
+    """找出模块中 @register_spider("网站名", ...) 装饰的类所登记的网站名"""
+    names = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for decorator in node.decorator_list:
+            if not isinstance(decorator, ast.Call):
+                continue
+            func = decorator.func
+            func_name = func.id if isinstance(func, ast.Name) else getattr(func, 'attr', None)
+            if func_name != _DECORATOR:
+                continue
+            names.extend(arg.value for arg in decorator.args
+                         if isinstance(arg, ast.Constant) and isinstance(arg.value, str))
+    return names
+
+
+class SpiderRegistry:
+    """
+    网站名 -> 爬虫类的注册表。
+
+    discover() 扫描 caiji/modules 下的 .py 文件（只解析语法树，不执行），建立 网站名 -> 模块 的索引；
+    按文件修改时间缓存扫描结果，重复调用只重新解析有改动的文件。
+    get() 在某个网站第一次被需要时才导入对应模块；discover() 发现已导入的模块文件有改动时，
+    下次 get() 用 importlib.reload 重新导入，新增与修改的爬虫都不需要重启进程。
+    导入失败的模块会被记住，文件没有改动之前不再重试（重新导入失败时继续使用修改前的爬虫类），
+    一个爬虫出错不影响其它网站。
+    导入与重新导入会执行模块代码，只在该模块自己的锁内进行，不阻塞其它网站的 get()；
+    该模块的网站仍有任务在执行（含看门狗放弃等待、线程尚未退出的任务）时暂不重新导入，继续使用原来的类。
+    """
+
+    def __init__(self, root: str = None, package: str = SPIDER_PACKAGE, watchdog=None, logger=None):
+        self.package = package
+        self.root = root or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modules')
+        self.watchdog = watchdog
+        self.logger = logger
+        self._lock = threading.RLock()
+        self._module_locks = {}  # 模块名 -> 导入该模块时持有的锁
+        self._discovered = False
+        self._files = {}     # 文件路径 -> (mtime, 模块名, [网站名])
+        self._index = {}     # 网站名 -> (模块名, 文件路径)
+        self._loaded = {}    # 模块名 -> 导入时的 mtime
+        self._failed = {}    # 模块名 -> (mtime, 错误信息)
+
+    def discover(self) -> int:
+        """扫描爬虫目录并更新索引，返回登记的网站数"""
+        files = {}
+        index = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(('.', '__')))
+            for filename in sorted(filenames):
+                if not filename.endswith('.py') or filename.startswith('_'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                entry = self._scan_file(path)
+                if entry is None:
+                    continue
+                files[path] = entry
+                for name in entry[2]:
+                    if name in index and index[name][1] != path:
+                        self._warn(f"网站 {name} 在多个爬虫模块中登记：{index[name][0]}、{entry[1]}，使用后者")
+                    index[name] = (entry[1], path)
+
+        with self._lock:
+            if set(files) != set(self._files):
+                # 有新增或删除的文件时清空导入系统的目录缓存，新模块才能被找到
+                importlib.invalidate_caches()
+            self._files = files
+            self._index = index
+            self._discovered = True
+        if self.logger:
+            self.logger.info(f"爬虫注册表：扫描到 {len(files)} 个模块，登记 {len(index)} 个网站")
+        return len(index)
+
+    def _scan_file(self, path: str):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached
+
+        relative = os.path.splitext(os.path.relpath(path, self.root))[0]
+        module_name = '.'.join([self.package] + relative.split(os.sep))
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+            # 不含装饰器名的文件（工具模块等）无需解析
+            names = _decorated_names(ast.parse(source, path)) if _DECORATOR.encode() in source else []
+        except (OSError, SyntaxError, ValueError) as e:
+            self._warn(f"爬虫模块解析失败，跳过：{path}（{e}）")
+            names = []
+        return mtime, module_name, names
+
+    def _ensure_discovered(self):
+        if not self._discovered:
+            self.discover()
+
+    def _is_current(self, module_name: str, mtime: float) -> bool:
+        """模块已按该 mtime 导入，或该版本已导入失败"""
+        if self._loaded.get(module_name) == mtime:
+            return True
+        failed = self._failed.get(module_name)
+        return failed is not None and failed[0] == mtime
+
+    def _in_use(self, module_name: str) -> bool:
+        """该模块登记的网站是否还有其它任务在执行（当前线程所在的任务除外）"""
+        watchdog = self.watchdog or get_watchdog()
+        busy = watchdog.busy_sites(exclude=current_task())
+        if not busy:
+            return False
+        with self._lock:
+            names = {name for name, (module, _) in self._index.items() if module == module_name}
+        with _registered_lock:
+            names.update(name for name, cls in _registered.items()
+                         if getattr(cls, '__module__', None) == module_name)
+        return bool(busy & names)
+
+    def get(self, website_name: str):
+        """返回网站对应的爬虫类，未登记或模块导入失败时返回 None"""
+        with self._lock:
+            self._ensure_discovered()
+            target = self._index.get(website_name)
+            if target is None:
+                # 不在扫描目录中、由其它代码直接登记的爬虫
+                return _registered.get(website_name)
+            module_name, path = target
+            mtime = self._files[path][0]
+            if self._is_current(module_name, mtime):
+                return _registered.get(website_name)
+            module_lock = self._module_locks.setdefault(module_name, threading.Lock())
+
+        with module_lock:
+            with self._lock:
+                # 等待期间其它线程可能已经导入
+                if self._is_current(module_name, mtime):
+                    return _registered.get(website_name)
+                loaded = self._loaded.get(module_name)
+            module = sys.modules.get(module_name)
+            reloading = loaded is not None and module is not None
+            if reloading and self._in_use(module_name):
+                if self.logger:
+                    self.logger.info(f"爬虫模块 {module_name} 已修改，仍有任务在执行，暂不重新导入")
+                return _registered.get(website_name)
+
+            # 重新导入前先移除该模块原来登记的网站，修改后不再登记的网站不会留下旧的类
+            previous = _unregister_module(module_name) if reloading else {}
+            try:
+                if reloading:
+                    importlib.reload(module)
+                else:
+                    importlib.import_module(module_name)
+            except Exception as e:
+                _unregister_module(module_name)
+                with _registered_lock:
+                    _registered.update(previous)
+                with self._lock:
+                    self._failed[module_name] = (mtime, f"{type(e).__name__}: {e}")
+                if self.logger:
+                    action = "重新导入" if reloading else "导入"
+                    self.logger.error(f"爬虫模块{action}失败：{module_name}（网站：{website_name}）：{e}",
+                                      exc_info=True)
+                return _registered.get(website_name)
+            with self._lock:
+                self._failed.pop(module_name, None)
+                self._loaded[module_name] = mtime
+            if self.logger:
+                self.logger.info(f"已{'重新' if reloading else ''}加载爬虫模块：{module_name}")
+
+        spider_class = _registered.get(website_name)
+        if spider_class is None:
+            self._warn(f"爬虫模块 {module_name} 已导入，但没有登记网站：{website_name}")
+        return spider_class
+
+    def __contains__(self, website_name: str) -> bool:
+        with self._lock:
+            self._ensure_discovered()
+            return website_name in _registered or website_name in self._index
+
+    def website_names(self) -> list:
+        with self._lock:
+            self._ensure_discovered()
+            return sorted(set(self._index) | set(_registered))
+
+    def failures(self) -> dict:
+        """导入失败的模块：{模块名: 错误信息}"""
+        with self._lock:
+            return {name: error for name, (_, error) in self._failed.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "modules": len(self._files),
+                "websites": len(self._index),
+                "loaded": len(self._loaded),
+                "failed": len(self._failed),
+            }
+
+    def _warn(self, message: str):
+        if self.logger:
+            self.logger.warning(message)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_spider_registry(logger=None) -> SpiderRegistry:
+    """
+    获取进程内共享的爬虫注册表。创建时不扫描目录：每轮开始时由调用方 discover()，
+    没有调用过时在第一次 get() 时扫描。
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SpiderRegistry(logger=logger)
+        elif logger is not None and _registry.logger is None:
+            _registry.logger = logger
+        return _registry
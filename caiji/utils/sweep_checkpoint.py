@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import update
+
+from config.db import db
+from app.models.crawl_pool import CrawlPool
+
+
+def unfinished_tasks(generation: int) -> list:
+    """第 generation 轮尚未完成的任务（CrawlPool.to_dict() 列表），按 id 顺序"""
+    rows = CrawlPool.query.filter(CrawlPool.done_generation < generation).order_by(CrawlPool.id).all()
+    return [row.to_dict() for row in rows]
+
+
+# 本进程内各轮未完成任务已执行的次数 {(generation, task_id): 次数}；进程重启后清零，恢复时重新计数
+_attempts = defaultdict(int)
+_attempts_lock = threading.Lock()
+
+
+def is_completed(result: dict) -> bool:
+    """
+    任务是否在本轮真正完成：成功，或没有对应爬虫而跳过（重试也不会有结果）。
+    失败、超时，以及因网站被未退出的线程占用而跳过（error 不为空）的任务都没有完成。
+    """
+    return result["status"] == "success" or (result["status"] == "skipped" and not result.get("error"))
+
+
+class SweepCheckpoint:
+    """
+    记录一轮（base_crawlers.generation）中已完成的任务，写入 crawl_pool.done_generation。
+
+    进程中途退出后重新启动时，只需继续执行 done_generation 小于本轮编号的任务。
+    完成的任务先在内存中累积，每隔 interval 秒统一落库一次（interval 为 0 时每个单元结束都落库）；
+    落库前先等批量写入线程把已提交的结果写完，保证标记为完成的任务其结果已经保存。
+    进程退出时尚未落库的任务会在恢复后重新执行一次，结果按 detail_url 去重，不会重复保存。
+    record() 只把真正完成的任务记为完成（见 is_completed），失败、超时、被跳过的任务在本轮恢复时重新执行；
+    同一进程中执行 max_attempts 次仍未完成的任务才记为完成，避免一个坏掉的爬虫让这一轮永远无法结束。
+    只应在调度任务的线程中调用。
+    """
+
+    def __init__(self, generation: int, writer=None, interval: float = 30, logger=None, max_attempts: int = 3):
+        self.generation = generation
+        self.writer = writer
+        self.interval = interval
+        self.logger = logger
+        self.max_attempts = max(max_attempts, 1)
+        self.saved = 0
+        self._pending = []
+        self._last_commit = time.monotonic()
+        with _attempts_lock:
+            for key in [key for key in _attempts if key[0] < generation]:
+                del _attempts[key]
+
+    def record(self, results: list):
+        """按一个单元的执行结果记录进度，返回记为完成的任务 id"""
+        task_ids = []
+        for result in results:
+            if is_completed(result):
+                task_ids.append(result["task_id"])
+                continue
+            key = (self.generation, result["task_id"])
+            with _attempts_lock:
+                _attempts[key] += 1
+                attempts = _attempts[key]
+            if attempts >= self.max_attempts:
+                task_ids.append(result["task_id"])
+                if self.logger:
+                    self.logger.warning(f"任务 {result['task_id']}（{result['website_name']}）第 {self.generation} 轮"
+                                        f"已执行 {attempts} 次仍未完成（{result['status']}），本轮不再重试")
+        self.done(task_ids)
+        return task_ids
+
+    def done(self, task_ids):
+        self._pending.extend(task_ids)
+        if time.monotonic() - self._last_commit < self.interval:
+            return
+        try:
+            self.commit()
+        except Exception as e:
+            # 保存进度失败不影响本轮继续执行，下次保存时重试
+            if self.logger:
+                self.logger.error(f"第 {self.generation} 轮进度保存失败: {e}", exc_info=True)
+
+    def commit(self):
+        self._last_commit = time.monotonic()
+        if not self._pending:
+            return
+        if self.writer is not None and not self.writer.flush():
+            # 结果没有确认写入时不能标记任务完成，保留待下次保存（或恢复后重新执行）
+            raise RuntimeError("批量写入未完成，暂不保存本轮进度")
+        task_ids, self._pending = self._pending, []
+        session = db.session
+        try:
+            # 完成记录不属于任务配置，保留 updated_at 不变
+            session.execute(
+                update(CrawlPool)
+                .where(CrawlPool.id.in_(task_ids), CrawlPool.done_generation < self.generation)
+                .values(done_generation=self.generation, updated_at=CrawlPool.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            # 保留未落库的任务，下次 commit 时重试
+            self._pending = task_ids + self._pending
+            raise
+        self.saved += len(task_ids)
+        if self.logger:
+            self.logger.debug(f"第 {self.generation} 轮进度已保存：{self.saved} 个任务完成")
@@ -0,0 +1,191 @@
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+
+from config.db import db
+from app.models.crawl_pool import CrawlPool
+
+
+def default_worker_id() -> str:
+    """worker 标识：主机名 + 进程号，同一台机器上的多个进程互不冲突"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def db_utcnow():
+    """数据库当前 UTC 时间（不带时区），各 worker 统一以数据库时钟判断租约是否过期"""
+    return func.timezone('UTC', func.now())
+
+
+def _available(generation: int):
+    """本轮尚未完成、且没有被领取或租约已过期的任务"""
+    return and_(
+        CrawlPool.done_generation < generation,
+        or_(CrawlPool.lease_owner.is_(None), CrawlPool.lease_expires_at < db_utcnow()),
+    )
+
+
+class TaskLease:
+    """
+    crawl_pool 任务租约。
+
+    - claim_site(): 用 SELECT ... FOR UPDATE SKIP LOCKED 领取一个网站全部可执行的任务，
+      并发领取的 worker 会跳过彼此锁住的行，不会重复领取
+    - 后台心跳线程定期延长本 worker 持有的租约；worker 异常退出后租约到期，任务会被其它 worker 重新领取
+    - complete(): 标记任务在本轮已完成并释放租约；release(): 只释放租约，任务留给其它 worker
+    - 租约相关的更新保留 updated_at 不变，它只反映任务配置本身的变化
+    """
+
+    def __init__(self, worker_id: str = None, lease_seconds: int = 300, logger=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.logger = logger
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    @property
+    def held(self) -> set:
+        with self._lock:
+            return set(self._held)
+
+    def claim_site(self, generation: int) -> list:
+        """
+        领取一个网站在第 generation 轮中全部可执行的任务，返回 CrawlPool.to_dict() 列表；
+        没有可领取的任务时返回空列表。
+        """
+        session = db.session
+        try:
+            first = session.execute(
+                select(CrawlPool.website_names)
+                .where(_available(generation))
+                .order_by(CrawlPool.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if first is None:
+                session.commit()
+                return []
+
+            website_name = first[0]
+            same_site = (CrawlPool.website_names.is_(None) if website_name is None
+                         else CrawlPool.website_names == website_name)
+            candidates = (
+                select(CrawlPool.id)
+                .where(_available(generation), same_site)
+                .with_for_update(skip_locked=True)
+            )
+            claimed_ids = session.execute(
+                update(CrawlPool)
+                .where(CrawlPool.id.in_(candidates))
+                .values(lease_owner=self.worker_id,
+                        lease_expires_at=db_utcnow() + timedelta(seconds=self.lease_seconds),
+                        updated_at=CrawlPool.updated_at)
+                .returning(CrawlPool.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        if not claimed_ids:
+            return []
+        with self._lock:
+            self._held.update(claimed_ids)
+        tasks = CrawlPool.query.filter(CrawlPool.id.in_(claimed_ids)).order_by(CrawlPool.id).all()
+        result = [task.to_dict() for task in tasks]
+        session.commit()
+        if self.logger:
+            self.logger.info(f"[{self.worker_id}] 领取 {website_name} 的 {len(result)} 个任务（第 {generation} 轮）")
+        return result
+
+    def renew(self) -> int:
+        """延长本 worker 持有的全部租约，返回实际延长的任务数"""
+        held = self.held
+        if not held:
+            return 0
+        session = db.session
+        try:
+            renewed = session.execute(
+                update(CrawlPool)
+                .where(CrawlPool.id.in_(held), CrawlPool.lease_owner == self.worker_id)
+                .values(lease_expires_at=db_utcnow() + timedelta(seconds=self.lease_seconds),
+                        updated_at=CrawlPool.updated_at)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if renewed < len(held) and self.logger:
+            self.logger.warning(f"[{self.worker_id}] {len(held) - renewed} 个任务的租约已被其它 worker 接管")
+        return renewed
+
+    def complete(self, task_ids, generation: int):
+        """标记任务在第 generation 轮已完成，并释放租约"""
+        self._finish(task_ids, done_generation=generation)
+
+    def release(self, task_ids=None):
+        """只释放租约（不标记完成），task_ids 为空时释放本 worker 持有的全部任务"""
+        self._finish(self.held if task_ids is None else task_ids)
+
+    def _finish(self, task_ids, **values):
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        session = db.session
+        try:
+            session.execute(
+                update(CrawlPool)
+                .where(CrawlPool.id.in_(task_ids), CrawlPool.lease_owner == self.worker_id)
+                .values(lease_owner=None, lease_expires_at=None, updated_at=CrawlPool.updated_at, **values)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            with self._lock:
+                self._held.difference_update(task_ids)
+
+    def start_heartbeat(self, app, interval: float = None):
+        """启动租约心跳线程，默认每 lease_seconds / 3 秒续约一次"""
+        if self._heartbeat is not None:
+            return
+        interval = interval or max(self.lease_seconds / 3, 1)
+        self._stop.clear()
+
+        def beat():
+            with app.app_context():
+                while not self._stop.wait(interval):
+                    try:
+                        self.renew()
+                    except Exception as e:
+                        if self.logger:
+                            self.logger.error(f"[{self.worker_id}] 租约续期失败: {e}", exc_info=True)
+
+        self._heartbeat = threading.Thread(target=beat, name="task_lease_heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        if self._heartbeat is None:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+
+
+def count_unfinished(generation: int) -> dict:
+    """统计第 generation 轮尚未完成的任务：pending 为无人领取或租约已过期，leased 为正在执行"""
+    session = db.session
+    unfinished = CrawlPool.done_generation < generation
+    leased = and_(CrawlPool.lease_owner.isnot(None), CrawlPool.lease_expires_at >= db_utcnow())
+    total = session.query(func.count(CrawlPool.id)).filter(unfinished).scalar()
+    running = session.query(func.count(CrawlPool.id)).filter(unfinished, leased).scalar()
+    session.commit()
+    return {"pending": total - running, "leased": running}
@@ -0,0 +1,175 @@
+import heapq
+import random
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, update
+
+from config.db import db
+from app.models.crawl_pool import CrawlPool
+from caiji.utils.config_loader import load_config
+
+
+def _load_minutes(config, section: str) -> dict:
+    """解析 名称 = 分钟 形式的配置段；configparser 会把键转为小写，这里统一按小写匹配"""
+    overrides = {}
+    if not config.has_section(section):
+        return overrides
+    for name, value in config.items(section):
+        try:
+            minutes = float(value)
+        except ValueError:
+            continue
+        if minutes > 0:
+            overrides[name.strip().lower()] = minutes
+    return overrides
+
+
+class SchedulePolicy:
+    """
+    计算每个 crawl_pool 任务的抓取间隔（分钟）。
+
+    配置间隔（base_minutes）的优先级：
+      1. [schedule_sites] 中该网站的间隔
+      2. [schedule_configs] 中该任务所属配置的间隔（属于多个配置时取最短的）
+      3. [SCHEDULE] default_minutes，未配置时沿用 base_crawlers.frequency（小时）
+    adaptive 为 True 且任务已有自适应间隔（crawl_pool.adaptive_minutes）时使用自适应间隔，
+    配置间隔只作为它的起点。
+    """
+
+    def __init__(self, default_minutes: float, site_minutes: dict = None,
+                 config_minutes: dict = None, jitter: float = 0.1, adaptive: bool = False):
+        self.default_minutes = default_minutes
+        self.site_minutes = site_minutes or {}
+        self.config_minutes = config_minutes or {}
+        self.jitter = jitter
+        self.adaptive = adaptive
+
+    @classmethod
+    def from_config(cls, frequency_hours: float, config=None) -> "SchedulePolicy":
+        config = config or load_config()
+        return cls(
+            default_minutes=config.getfloat('SCHEDULE', 'default_minutes', fallback=frequency_hours * 60),
+            site_minutes=_load_minutes(config, 'schedule_sites'),
+            config_minutes=_load_minutes(config, 'schedule_configs'),
+            jitter=config.getfloat('SCHEDULE', 'jitter', fallback=0.1),
+            adaptive=config.getboolean('ADAPTIVE', 'enabled', fallback=True),
+        )
+
+    def interval_minutes(self, task: dict) -> float:
+        if self.adaptive and task.get("adaptive_minutes"):
+            return task["adaptive_minutes"]
+        return self.base_minutes(task)
+
+    def base_minutes(self, task: dict) -> float:
+        site = (task.get("website_names") or '').lower()
+        if site in self.site_minutes:
+            return self.site_minutes[site]
+        configured = [self.config_minutes[name.lower()] for name in (task.get("config_names") or [])
+                      if name.lower() in self.config_minutes]
+        if configured:
+            return min(configured)
+        return self.default_minutes
+
+    def next_run_at(self, task: dict, ran_at: datetime, minutes: float = None) -> datetime:
+        minutes = minutes or self.interval_minutes(task)
+        # 加一点随机抖动，避免同一间隔的任务永远挤在同一时刻
+        minutes *= 1 + random.uniform(0, self.jitter)
+        return ran_at + timedelta(minutes=minutes)
+
+
+class TaskScheduler:
+    """
+    按到期时间排序的任务队列（小顶堆）。
+
+    每个 crawl_pool 任务的 next_run_at 持久化在数据库中，重启后继续按原计划执行；
+    next_run_at 为空的新任务立即到期。堆中的旧条目不删除，出堆时与当前记录的到期时间比对后丢弃。
+    """
+
+    def __init__(self, policy: SchedulePolicy, logger=None):
+        self.policy = policy
+        self.logger = logger
+        self._heap = []
+        self._tasks = {}
+        self._due_at = {}
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """从 crawl_pool 重新读取任务（配置同步之后调用），已删除的任务随之移出队列"""
+        rows = CrawlPool.query.order_by(CrawlPool.id).all()
+        now = datetime.utcnow()
+        with self._lock:
+            self._tasks = {row.id: row.to_dict() for row in rows}
+            self._due_at = {row.id: row.next_run_at or now for row in rows}
+            self._heap = [(due_at, task_id) for task_id, due_at in self._due_at.items()]
+            heapq.heapify(self._heap)
+        db.session.commit()
+        if self.logger:
+            self.logger.info(f"调度队列已加载 {len(self._tasks)} 个任务，最早到期：{self.next_due_at()}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def next_due_at(self):
+        """最早到期的时间，队列为空时返回 None"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime = None, limit: int = None) -> list:
+        """取出全部已到期的任务（按到期时间先后），取出的任务需要在执行后 reschedule"""
+        now = now or datetime.utcnow()
+        due = []
+        with self._lock:
+            while self._heap and (limit is None or len(due) < limit):
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, task_id = heapq.heappop(self._heap)
+                self._due_at.pop(task_id, None)
+                due.append(self._tasks[task_id])
+        return due
+
+    def reschedule(self, task_ids, ran_at: datetime = None, intervals: dict = None):
+        """
+        按各任务的间隔计算下一次到期时间，写回数据库并放回队列。
+        intervals 为本次执行后新算出的自适应间隔 {task_id: 分钟}，优先使用。
+        """
+        ran_at = ran_at or datetime.utcnow()
+        intervals = intervals or {}
+        updates = []
+        with self._lock:
+            for task_id in task_ids:
+                task = self._tasks.get(task_id)
+                if task is None:
+                    continue
+                if task_id in intervals:
+                    task["adaptive_minutes"] = intervals[task_id]
+                next_run_at = self.policy.next_run_at(task, ran_at, intervals.get(task_id))
+                self._due_at[task_id] = next_run_at
+                heapq.heappush(self._heap, (next_run_at, task_id))
+                updates.append({"task_id": task_id, "next_run_at": next_run_at, "last_run_at": ran_at})
+        if not updates:
+            return
+        table = CrawlPool.__table__
+        # 调度时间不属于任务配置，保留 updated_at 不变
+        stmt = update(table).where(table.c.id == bindparam('task_id')).values(
+            next_run_at=bindparam('next_run_at'),
+            last_run_at=bindparam('last_run_at'),
+            updated_at=table.c.updated_at,
+        )
+        try:
+            db.session.execute(stmt, updates)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _drop_stale(self):
+        # 丢弃已被重新调度或已删除任务的旧条目
+        while self._heap:
+            due_at, task_id = self._heap[0]
+            if self._due_at.get(task_id) == due_at:
+                return
+            heapq.heappop(self._heap)
@@ -0,0 +1,254 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from caiji.utils.config_loader import load_config
+
+
+class TaskCancelled(Exception):
+    """任务超过截止时间被看门狗取消"""
+
+
+class RunningTask:
+    """
+    一个正在执行的单元（单个任务或按网站汇总的一组任务）。
+
+    cancelled 被设置后，fetcher 等共享服务在下一次检查时抛出 TaskCancelled；
+    add_cancel_callback() 登记的回调（如结束任务占用的浏览器进程）在取消时执行，用于打断卡死的阻塞调用。
+    """
+
+    def __init__(self, key, label: str, website_name: str, seconds: float):
+        self.key = key
+        self.label = label
+        self.website_name = website_name
+        self.seconds = seconds
+        self.started_at = datetime.utcnow()
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds if seconds else None
+        self.cancelled = threading.Event()
+        self.reason = None
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """距截止时间的秒数，没有截止时间时返回 None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        """已取消或已超时时抛出 TaskCancelled"""
+        if self.cancelled.is_set():
+            raise TaskCancelled(self.reason)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise TaskCancelled(f"{self.label} 超过 {self.seconds:.0f} 秒未完成")
+
+    def sleep(self, seconds: float):
+        """可被取消打断的 sleep"""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, max(remaining, 0))
+        self.cancelled.wait(seconds)
+        self.check()
+
+    def add_cancel_callback(self, key, callback):
+        with self._lock:
+            self._callbacks[key] = callback
+
+    def remove_cancel_callback(self, key):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def cancel(self, reason: str):
+        with self._lock:
+            if self.cancelled.is_set():
+                return []
+            self.reason = reason
+            self.cancelled.set()
+            return list(self._callbacks.values())
+
+
+_local = threading.local()
+
+
+def current_task():
+    """当前线程正在执行的单元，不在看门狗跟踪下时返回 None"""
+    return getattr(_local, 'task', None)
+
+
+def check_cancelled():
+    task = current_task()
+    if task is not None:
+        task.check()
+
+
+def cap_timeout(timeout):
+    """把请求超时限制在当前任务剩余时间以内（不在任务中或没有截止时间时原样返回）"""
+    task = current_task()
+    remaining = task.remaining() if task is not None else None
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0.1)
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def cancellable_sleep(seconds: float):
+    task = current_task()
+    if task is None:
+        time.sleep(seconds)
+    else:
+        task.sleep(seconds)
+
+
+def _load_seconds(config, section: str) -> dict:
+    """解析 网站名 = 秒 形式的配置段，网站名按小写匹配（configparser 会把键转为小写）"""
+    overrides = {}
+    if not config.has_section(section):
+        return overrides
+    for name, value in config.items(section):
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        if seconds > 0:
+            overrides[name.strip().lower()] = seconds
+    return overrides
+
+
+class TaskWatchdog:
+    """
+    任务截止时间看门狗。
+
+    - track() 包住每个执行单元：记录当前任务与开始时间（写入采集心跳），并按网站设置截止时间
+    - 后台线程每隔 interval 秒检查一次，超时的单元被取消：设置取消标记（fetcher 在请求前、读取响应时、
+      重试等待时检查并抛出 TaskCancelled），并执行取消回调（结束任务占用的浏览器进程）
+    - 取消后超过 grace_seconds 仍未退出的单元视为卡死，abandoned() 返回它们，调度方不再等待其结果
+    enabled 为 False 时只记录当前任务，不设截止时间。
+    """
+
+    def __init__(self, default_seconds: float = 900, site_seconds: dict = None,
+                 grace_seconds: float = 60, interval: float = 5, enabled: bool = True, logger=None):
+        self.default_seconds = default_seconds
+        self.site_seconds = site_seconds or {}
+        self.grace_seconds = grace_seconds
+        self.interval = interval
+        self.enabled = enabled
+        self.logger = logger
+        self.timeouts = 0
+        self._running = {}
+        # 已放弃等待（forget）但线程仍未退出的单元，busy_sites() 仍计入
+        self._forgotten = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def deadline_for(self, website_name: str):
+        if not self.enabled:
+            return None
+        return self.site_seconds.get((website_name or '').lower(), self.default_seconds)
+
+    @contextmanager
+    def track(self, key, label: str, website_name: str):
+        """在当前线程中跟踪一个执行单元，key 用于 abandoned() 对照"""
+        task = RunningTask(key, label, website_name, self.deadline_for(website_name))
+        with self._lock:
+            self._running[key] = task
+        _local.task = task
+        if task.deadline is not None:
+            self._ensure_started()
+        try:
+            yield task
+        finally:
+            _local.task = None
+            with self._lock:
+                # 被放弃的单元迟迟退出时，不能移除之后登记的同 key 单元
+                if self._running.get(key) is task:
+                    del self._running[key]
+                self._forgotten.discard(task)
+
+    def running(self) -> list:
+        """正在执行的单元，按开始时间先后排列"""
+        with self._lock:
+            return sorted(self._running.values(), key=lambda t: t.started)
+
+    def oldest(self):
+        """执行时间最长的单元（心跳中上报），没有时返回 None"""
+        tasks = self.running()
+        return tasks[0] if tasks else None
+
+    def abandoned(self) -> set:
+        """已取消且超过宽限时间仍未退出的单元的 key"""
+        now = time.monotonic()
+        with self._lock:
+            return {key for key, task in self._running.items()
+                    if task.cancelled.is_set() and now >= task.deadline + self.grace_seconds}
+
+    def forget(self, key):
+        """放弃等待卡死的单元：不再上报它，线程之后自行退出时也不会影响新的任务"""
+        with self._lock:
+            task = self._running.pop(key, None)
+            if task is not None:
+                self._forgotten.add(task)
+
+    def busy_sites(self, exclude=None) -> set:
+        """仍有线程在执行的网站（含已放弃等待、线程尚未退出的单元），exclude 为不计入的单元"""
+        with self._lock:
+            tasks = list(self._running.values()) + list(self._forgotten)
+        return {task.website_name for task in tasks if task is not exclude}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._watch, name="task_watchdog", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                overdue = [task for task in self._running.values()
+                           if task.deadline is not None and now >= task.deadline and not task.cancelled.is_set()]
+            for task in overdue:
+                self._cancel(task)
+
+    def _cancel(self, task: RunningTask):
+        callbacks = task.cancel(f"{task.label} 超过 {task.seconds:.0f} 秒未完成，已取消")
+        with self._lock:
+            self.timeouts += 1
+        if self.logger:
+            self.logger.warning(f"任务超时：{task.label}（开始于 {task.started_at:%H:%M:%S} UTC，"
+                                f"已运行 {task.elapsed():.0f} 秒），取消并结束 {len(callbacks)} 个浏览器")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"取消任务 {task.label} 时出错: {e}", exc_info=True)
+
+
+_watchdog = None
+_watchdog_lock = threading.Lock()
+
+
+def get_watchdog(logger=None) -> TaskWatchdog:
+    """获取进程内共享的看门狗（首次调用时按 [WATCHDOG] 配置创建）"""
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            config = load_config()
+            _watchdog = TaskWatchdog(
+                default_seconds=config.getfloat('WATCHDOG', 'default_seconds', fallback=900),
+                site_seconds=_load_seconds(config, 'watchdog_sites'),
+                grace_seconds=config.getfloat('WATCHDOG', 'grace_seconds', fallback=60),
+                interval=config.getfloat('WATCHDOG', 'check_interval', fallback=5),
+                enabled=config.getboolean('WATCHDOG', 'enabled', fallback=True),
+                logger=logger,
+            )
+        return _watchdog
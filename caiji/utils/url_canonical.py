@@ -0,0 +1,393 @@
+import fnmatch
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+from sqlalchemy import func
+
+from config.db import db
+from app.models.crawl_results import CrawlResult
+from caiji.utils.common import get_item_field
+from caiji.utils.config_loader import load_config
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_PERCENT = re.compile(r'%[0-9a-fA-F]{2}')
+_UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+# 需要编码的字符：空格、引号、尖括号等 ASCII 字符与全部非 ASCII 字符；字母、数字、保留字符与 % 保持原样
+_UNSAFE = re.compile(r'[\x00-\x20"<>\\^`{|}\x7f-\U0010ffff]')
+# 规范化算法的版本，改变规范化结果时递增，旧记录索引据此重建
+_ALGORITHM_VERSION = 2
+
+
+class SiteRule:
+    """
+    单个网站的 URL 规范化规则：
+      - scheme: 统一使用的协议（http / https），为空时保留原协议
+      - strip_params: 去掉的查询参数，支持 fnmatch 通配（如 utm_*）
+      - keep_params: 不为空时只保留这些参数（分页、ID 等真正决定页面内容的参数）
+      - trailing_slash: 是否去掉路径末尾多余的斜杠（根路径除外）；/a/ 与 /a 在很多服务器上是不同的页面，默认不去掉
+      - sort_query: 是否按参数名排序查询参数
+      - lower_path: 是否把路径转为小写（只用于不区分大小写的服务器）
+    """
+
+    def __init__(self, scheme: str = None, strip_params=(), keep_params=(), trailing_slash: bool = False,
+                 sort_query: bool = True, lower_path: bool = False):
+        self.scheme = scheme.lower() if scheme else None
+        self.strip_params = tuple(p.lower() for p in strip_params)
+        self.keep_params = {p.lower() for p in keep_params}
+        self.trailing_slash = trailing_slash
+        self.sort_query = sort_query
+        self.lower_path = lower_path
+
+    def key(self) -> tuple:
+        """规则的全部设置，用于计算规则指纹"""
+        return (self.scheme, self.strip_params, tuple(sorted(self.keep_params)), self.trailing_slash,
+                self.sort_query, self.lower_path)
+
+    def drops(self, name: str) -> bool:
+        name = name.lower()
+        if self.keep_params:
+            return name not in self.keep_params
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.strip_params)
+
+    def override(self, spec: str) -> "SiteRule":
+        """
+        在当前规则上应用 [url_canonical_sites] 中的一行设置，以空格分隔：
+            scheme=https strip=sessionid,page_t keep=id,page strip_slash lower_path no_sort
+        """
+        rule = SiteRule(self.scheme, self.strip_params, self.keep_params, self.trailing_slash,
+                        self.sort_query, self.lower_path)
+        for token in spec.split():
+            name, _, value = token.partition('=')
+            values = [v.strip().lower() for v in value.split(',') if v.strip()]
+            if name == 'scheme':
+                rule.scheme = value.lower() or None
+            elif name == 'strip':
+                rule.strip_params += tuple(values)
+            elif name == 'keep':
+                rule.keep_params = set(values)
+            elif name == 'strip_slash':
+                rule.trailing_slash = True
+            elif name == 'keep_slash':
+                rule.trailing_slash = False
+            elif name == 'lower_path':
+                rule.lower_path = True
+            elif name == 'no_sort':
+                rule.sort_query = False
+            else:
+                raise ValueError(f"未知的 URL 规范化规则：{token}")
+        return rule
+
+
+def _normalize_escape(match) -> str:
+    """非保留字符（字母、数字、-._~）的转义解码，其它转义统一为大写十六进制"""
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+def _normalize_percent(text: str) -> str:
+    """
+    统一百分号编码：已有的转义不解码为中文，只统一为大写十六进制（GBK 等其它编码的链接保持原字节）；
+    中文等非 ASCII 字符与空格等不安全字符按 UTF-8 编码，编码与未编码的同一链接得到相同的结果。
+    """
+    text = _PERCENT.sub(_normalize_escape, text)
+    return _UNSAFE.sub(lambda m: ''.join(f"%{b:02X}" for b in m.group(0).encode('utf-8')), text)
+
+
+def canonicalize_url(url: str, rule: SiteRule = None) -> str:
+    """
+    按规则规范化 detail_url：协议与主机名小写、去掉默认端口与锚点、解析路径中的 ./ 与 ../、
+    统一百分号编码、去掉跟踪参数并排序查询参数，规则开启时去掉末尾多余的斜杠。
+    无法解析的 URL 原样返回。
+    """
+    rule = rule or SiteRule()
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+    if rule.scheme:
+        scheme = rule.scheme
+
+    netloc = parts.hostname.lower()
+    if parts.username or parts.password:
+        netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{netloc}"
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or '/'
+    if '.' in path or '//' in path:
+        normalized = posixpath.normpath(path)
+        # normpath 去掉了末尾斜杠，是否保留由 trailing_slash 决定；开头的 // 也合并为一个
+        path = '/' + normalized.lstrip('/') if normalized not in ('.', '/') else '/'
+        if parts.path.endswith('/') and path != '/':
+            path += '/'
+    path = _normalize_percent(path)
+    if rule.lower_path:
+        path = path.lower()
+    if rule.trailing_slash and len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = _normalize_percent(parts.query)
+    if query:
+        # 按原样拆分参数（不解码），只去掉与排序；参数没有变化时保持原来的写法
+        params = [tuple(pair.split('=', 1)) if '=' in pair else (pair,) for pair in query.split('&') if pair]
+        kept = [p for p in params if not rule.drops(p[0])]
+        if rule.sort_query:
+            kept.sort(key=lambda p: p[0])
+        if kept != params:
+            query = '&'.join('='.join(p) for p in kept)
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class UrlCanonicalizer:
+    """
+    保存前的 URL 规范化：同一页面因参数顺序、跟踪参数、http / https、百分号编码或 ./ 等写法不同
+    而得到不同的 detail_url 时，规范化后按同一条结果去重。
+
+    apply() 把条目的 detail_url 改为规范化后的 URL，原 URL 写入 original_url（邮件中仍链接原地址），
+    并去掉同一批中规范化后重复的条目；collisions 统计因规范化才识别出的重复
+    （同批重复，以及开启增量抓取时，规范化前不同、规范化后与已保存结果相同的条目）。
+    """
+
+    def __init__(self, default_rule: SiteRule = None, site_rules: dict = None, logger=None):
+        self.default_rule = default_rule or SiteRule()
+        self.site_rules = {k.lower(): v for k, v in (site_rules or {}).items()}
+        self.logger = logger
+        self.rewritten = 0
+        self.collisions = 0
+        self._lock = threading.Lock()
+
+    def rule_for(self, website_name: str) -> SiteRule:
+        return self.site_rules.get((website_name or '').lower(), self.default_rule)
+
+    def fingerprint(self) -> str:
+        """当前规范化规则（及算法版本）的指纹，规则变化后据此重建旧记录索引"""
+        rules = [('', self.default_rule.key())] + sorted((name, rule.key()) for name, rule in self.site_rules.items())
+        return hashlib.sha1(repr((_ALGORITHM_VERSION, rules)).encode('utf-8')).hexdigest()
+
+    def canonicalize(self, url: str, website_name: str = None) -> str:
+        if not url:
+            return url
+        return canonicalize_url(url, self.rule_for(website_name))
+
+    def apply(self, items: list, website_name: str, known_urls=None) -> list:
+        """
+        规范化一批条目，返回去掉同批重复后的条目（dict 条目复制后修改，对象条目直接设置属性）。
+        known_urls 为该网站已保存的 URL（含规范化前的原链接），用于统计与已保存结果的冲突：
+        原链接没有保存过、规范化后与已保存的 URL 相同才计数，同一原链接每轮重复抓到不计数。
+        """
+        rule = self.rule_for(website_name)
+        result = []
+        batch = set()
+        rewritten = collisions = 0
+        for item in items:
+            url = get_item_field(item, 'detail_url')
+            if not url:
+                result.append(item)
+                continue
+            canonical = canonicalize_url(url, rule)
+            changed = canonical != url
+            if canonical in batch:
+                collisions += 1
+                continue
+            batch.add(canonical)
+            if changed:
+                rewritten += 1
+                if known_urls is not None and canonical in known_urls and url not in known_urls:
+                    collisions += 1
+                if isinstance(item, dict):
+                    item = dict(item, detail_url=canonical)
+                    item.setdefault('original_url', url)
+                else:
+                    if getattr(item, 'original_url', None) is None:
+                        setattr(item, 'original_url', url)
+                    setattr(item, 'detail_url', canonical)
+            result.append(item)
+        with self._lock:
+            self.rewritten += rewritten
+            self.collisions += collisions
+        if collisions and self.logger:
+            self.logger.info(f"{website_name} URL 规范化：改写 {rewritten} 条，识别出 {collisions} 条重复")
+        return result
+
+    def reset_counters(self):
+        with self._lock:
+            self.rewritten = 0
+            self.collisions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rewritten": self.rewritten, "collisions": self.collisions}
+
+
+def load_site_rules(config, default_rule: SiteRule) -> dict:
+    """解析 [url_canonical_sites] 段：网站名 = 规则（以空格分隔，见 SiteRule.override）"""
+    rules = {}
+    if not config.has_section('url_canonical_sites'):
+        return rules
+    for name, value in config.items('url_canonical_sites'):
+        if value.strip():
+            rules[name] = default_rule.override(value)
+    return rules
+
+
+class LegacyUrlIndex:
+    """
+    规范化之前保存的旧记录：detail_url 按当前规则规范化后写法不同的行，按 (网站, 关键词) 保存规范化后的 URL。
+
+    增量判定、URL 索引与 detail_url 唯一约束都只比较数据库中保存的写法，旧记录要换成规范化后的写法才能匹配。
+    开启规范化后首次 load() 时以 crawl_results 当前最大 id 为分界（cutover），只扫描分界之前且没有 original_url
+    的行：分界之后保存的行已经过规范化，改写过的行都有 original_url。结果连同分界与规则指纹保存在 path，
+    之后启动直接读取；修改规范化规则后指纹不同，以新的最大 id 为分界重新扫描。
+    """
+
+    def __init__(self, canonicalizer: UrlCanonicalizer, path: str = 'config/legacy_urls.json',
+                 batch_size: int = 10000, logger=None):
+        self.canonicalizer = canonicalizer
+        self.path = path
+        self.batch_size = batch_size
+        self.logger = logger
+        self.cutover = None
+        self._sites = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+
+    def load(self) -> "LegacyUrlIndex":
+        """读取本地文件；文件不存在或规则已变化时扫描分界之前的旧记录并保存"""
+        with self._lock:
+            if self.cutover is not None:
+                return self
+            fingerprint = self.canonicalizer.fingerprint()
+            state = self._read()
+            if state is not None and state.get("fingerprint") == fingerprint:
+                self.cutover = state["cutover"]
+                for website_name, pairs in state["sites"].items():
+                    for keyword, url in pairs:
+                        self._sites[website_name][keyword].add(url)
+                self._log(f"已从 {self.path} 恢复旧记录索引，{len(self._urls())} 条，分界 id={self.cutover}")
+                return self
+            self.cutover = db.session.query(func.max(CrawlResult.id)).scalar() or 0
+            scanned, added = self._scan()
+            self._log(f"URL 规范化：扫描分界 id={self.cutover} 之前的 {scanned} 条记录，"
+                      f"其中 {added} 条为规范化之前保存的旧写法")
+            try:
+                self._save(fingerprint)
+            except OSError as e:
+                self._log(f"旧记录索引保存失败: {e}")
+        return self
+
+    def _scan(self) -> tuple:
+        scanned = added = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(CrawlResult.id, CrawlResult.website_name, CrawlResult.keyword,
+                                    CrawlResult.detail_url) \
+                .filter(CrawlResult.id > last_id, CrawlResult.id <= self.cutover,
+                        CrawlResult.original_url.is_(None)) \
+                .order_by(CrawlResult.id) \
+                .limit(self.batch_size) \
+                .all()
+            if not rows:
+                break
+            for _, website_name, keyword, url in rows:
+                if not website_name or not url:
+                    continue
+                canonical = self.canonicalizer.canonicalize(url, website_name)
+                if canonical != url:
+                    self._sites[website_name][keyword].add(canonical)
+                    added += 1
+            last_id = rows[-1][0]
+            scanned += len(rows)
+        return scanned, added
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+            if not isinstance(state.get("cutover"), int) or not isinstance(state.get("sites"), dict):
+                raise ValueError("文件格式不正确")
+            return state
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            self._log(f"读取旧记录索引失败，将重新扫描: {e}")
+            return None
+
+    def _save(self, fingerprint: str):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            "fingerprint": fingerprint,
+            "cutover": self.cutover,
+            "sites": {website_name: sorted([keyword, url] for keyword, urls in site.items() for url in urls)
+                      for website_name, site in self._sites.items()},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def known(self, website_name: str, keyword: str = None) -> set:
+        """该网站（某个关键词，为 None 时为全部关键词）旧记录规范化后的 URL"""
+        with self._lock:
+            site = self._sites.get(website_name)
+            if not site:
+                return set()
+            if keyword is not None:
+                return set(site.get(keyword, ()))
+            return set().union(*site.values())
+
+    def _urls(self) -> list:
+        return [url for site in self._sites.values() for urls in site.values() for url in urls]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._urls())
+
+    def _log(self, message: str):
+        if self.logger:
+            self.logger.info(message)
+
+
+_canonicalizer = None
+_canonicalizer_lock = threading.Lock()
+_legacy_index = None
+_legacy_index_lock = threading.Lock()
+
+
+def get_url_canonicalizer(logger=None) -> UrlCanonicalizer:
+    """获取进程内共享的 URL 规范化器（首次调用时读取 [URL_CANONICAL] 配置）"""
+    global _canonicalizer
+    with _canonicalizer_lock:
+        if _canonicalizer is None:
+            config = load_config()
+            strip_params = config.get('URL_CANONICAL', 'strip_params', fallback='utm_*, spm, fbclid, gclid')
+            default_rule = SiteRule(
+                scheme=config.get('URL_CANONICAL', 'scheme', fallback='') or None,
+                strip_params=[p.strip() for p in strip_params.split(',') if p.strip()],
+                trailing_slash=config.getboolean('URL_CANONICAL', 'strip_trailing_slash', fallback=False),
+                sort_query=config.getboolean('URL_CANONICAL', 'sort_query', fallback=True),
+            )
+            _canonicalizer = UrlCanonicalizer(default_rule, load_site_rules(config, default_rule), logger)
+        return _canonicalizer
+
+
+def get_legacy_url_index(logger=None) -> LegacyUrlIndex:
+    """获取进程内共享的旧记录索引（首次调用时读取本地文件，没有文件或规则已变化时扫描旧记录）"""
+    global _legacy_index
+    with _legacy_index_lock:
+        if _legacy_index is None:
+            config = load_config()
+            path = config.get('URL_CANONICAL', 'legacy_index_path', fallback='config/legacy_urls.json')
+            _legacy_index = LegacyUrlIndex(get_url_canonicalizer(logger), path, logger=logger).load()
+        return _legacy_index
@@ -7,11 +7,11 @@ import os
 config = configparser.ConfigParser()
 config.read(os.path.join(os.path.dirname(__file__), 'config.ini'))
 
-user = config.get('database', 'user')
-password = config.get('database', 'password')
-host = config.get('database', 'host')
-port = config.get('database', 'port')
-dbname = config.get('database', 'dbname')
+user = config.get('database', 'user', fallback='')
+password = config.get('database', 'password', fallback='')
+host = config.get('database', 'host', fallback='')
+port = config.get('database', 'port', fallback='')
+dbname = config.get('database', 'dbname', fallback='')
 
 # 组装数据库 URI
 DB_URI = f'postgresql://{user}:{password}@{host}:{port}/{dbname}?options=-c%20timezone=Asia/Shanghai'
@@ -61,4 +61,93 @@ CREATE TABLE public.users (
     push_switch integer DEFAULT 1 NOT NULL,
     created_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL
-);
\ No newline at end of file
+);
+
+CREATE INDEX crawl_results_site_keyword_idx ON public.crawl_results USING btree (website_name, keyword);
+-- 已有数据库：建唯一索引前先删除 detail_url 重复的行（保留 id 最小的一条），否则建索引失败
+DELETE FROM public.crawl_results a USING public.crawl_results b
+    WHERE a.detail_url = b.detail_url AND a.id > b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS crawl_results_detail_url_key ON public.crawl_results USING btree (detail_url);
+
+ALTER TABLE public.base_crawlers ADD COLUMN generation integer DEFAULT 0 NOT NULL;
+ALTER TABLE public.crawl_pool ADD COLUMN lease_owner character varying(100);
+ALTER TABLE public.crawl_pool ADD COLUMN lease_expires_at timestamp without time zone;
+ALTER TABLE public.crawl_pool ADD COLUMN done_generation integer DEFAULT 0 NOT NULL;
+CREATE INDEX crawl_pool_done_generation_idx ON public.crawl_pool USING btree (done_generation);
+ALTER TABLE public.crawl_pool ADD COLUMN next_run_at timestamp without time zone;
+ALTER TABLE public.crawl_pool ADD COLUMN last_run_at timestamp without time zone;
+CREATE INDEX crawl_pool_next_run_at_idx ON public.crawl_pool USING btree (next_run_at);
+ALTER TABLE public.crawl_pool ADD COLUMN adaptive_minutes double precision;
+ALTER TABLE public.crawl_pool ADD COLUMN empty_streak integer DEFAULT 0 NOT NULL;
+ALTER TABLE public.base_crawlers ADD COLUMN finished_generation integer DEFAULT 0 NOT NULL;
+UPDATE public.base_crawlers SET finished_generation = generation;
+ALTER TABLE public.heartbeat ADD COLUMN caiji_task character varying(255);
+ALTER TABLE public.heartbeat ADD COLUMN caiji_task_started_at timestamp without time zone;
+
+CREATE TABLE public.crawl_yield_history (
+    id serial PRIMARY KEY,
+    task_id integer NOT NULL,
+    website_name character varying(255) NOT NULL,
+    keyword character varying(100) NOT NULL,
+    status character varying(20) NOT NULL,
+    fetched_items integer DEFAULT 0 NOT NULL,
+    new_items integer DEFAULT 0 NOT NULL,
+    interval_minutes double precision,
+    ran_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE INDEX crawl_yield_site_keyword_idx ON public.crawl_yield_history USING btree (website_name, keyword, ran_at);
+
+CREATE TABLE public.crawl_runs (
+    id serial PRIMARY KEY,
+    mode character varying(20) NOT NULL,
+    generation integer,
+    worker character varying(100) NOT NULL,
+    status character varying(20) DEFAULT 'running'::character varying NOT NULL,
+    started_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    finished_at timestamp without time zone,
+    tasks_total integer DEFAULT 0 NOT NULL,
+    tasks_success integer DEFAULT 0 NOT NULL,
+    tasks_failed integer DEFAULT 0 NOT NULL,
+    tasks_timeout integer DEFAULT 0 NOT NULL,
+    tasks_skipped integer DEFAULT 0 NOT NULL,
+    pages integer DEFAULT 0 NOT NULL,
+    bytes bigint DEFAULT 0 NOT NULL,
+    items_found integer DEFAULT 0 NOT NULL,
+    items_inserted integer DEFAULT 0 NOT NULL,
+    items_duplicate integer DEFAULT 0 NOT NULL,
+    error text
+);
+
+CREATE INDEX crawl_runs_started_at_idx ON public.crawl_runs USING btree (started_at);
+
+CREATE TABLE public.crawl_task_runs (
+    id serial PRIMARY KEY,
+    run_id integer NOT NULL,
+    task_id integer NOT NULL,
+    website_name character varying(255) NOT NULL,
+    keyword character varying(100),
+    status character varying(20) NOT NULL,
+    started_at timestamp without time zone,
+    finished_at timestamp without time zone,
+    duration_seconds double precision,
+    pages integer DEFAULT 0 NOT NULL,
+    bytes bigint DEFAULT 0 NOT NULL,
+    fetch_seconds double precision DEFAULT 0 NOT NULL,
+    parse_seconds double precision DEFAULT 0 NOT NULL,
+    items_found integer DEFAULT 0 NOT NULL,
+    items_inserted integer DEFAULT 0 NOT NULL,
+    items_duplicate integer DEFAULT 0 NOT NULL,
+    error_class character varying(100),
+    error text
+);
+
+CREATE INDEX crawl_task_runs_run_id_idx ON public.crawl_task_runs USING btree (run_id);
+CREATE INDEX crawl_task_runs_site_started_idx ON public.crawl_task_runs USING btree (website_name, started_at);
+
+ALTER TABLE public.crawl_results ADD COLUMN simhash bigint;
+ALTER TABLE public.crawl_results ADD COLUMN canonical_id integer;
+CREATE INDEX crawl_results_simhash_idx ON public.crawl_results USING btree (simhash);
+CREATE INDEX crawl_results_canonical_id_idx ON public.crawl_results USING btree (canonical_id);
+
+ALTER TABLE public.crawl_results ADD COLUMN original_url character varying(500);
@@ -10,13 +10,29 @@ def build_email_subject(user: User) -> str:
     return f'"{user.username}"您好，信息集成系统来信息了'
 
 
+def group_near_duplicates(results: list[CrawlResult]) -> list[tuple[CrawlResult, list[CrawlResult]]]:
+    """
+    把同一公告在多个网站的转载（canonical_id 相同或指向彼此）合为一组，
+    返回 [(展示的结果, 其它转载), ...]，按每组第一次出现的位置排列；组内优先展示原始结果。
+    """
+    groups = {}
+    for r in results:
+        groups.setdefault(r.canonical_id or r.id, []).append(r)
+    grouped = []
+    for key, members in groups.items():
+        primary = next((r for r in members if r.id == key), members[0])
+        grouped.append((primary, [r for r in members if r is not primary]))
+    return grouped
+
+
 def build_email_body_html(user: User, results: list[CrawlResult]) -> str:
     """
     构造 HTML 格式的邮件正文，将每条 CrawlResult 单独作为一个段落输出，
     并且把 detail_url 渲染为可点击的 <a> 链接。
+    其它网站转载的同一公告（近重复）合并到同一段落，只列出各自的来源与链接。
     """
     parts = []
-    for r in results:
+    for r, copies in group_near_duplicates(results):
         # config_name 现在是字符串类型，不再是列表
         config_display = r.config_name or '未知配置'
         ts = r.publish_time.strftime('%Y-%m-%d %H:%M:%S') if r.publish_time else '未知时间'
@@ -25,7 +41,8 @@ def build_email_body_html(user: User, results: list[CrawlResult]) -> str:
           <p>信息集成系统刚刚获取到，关于"<strong>{r.category}</strong>"板块、"<strong>{config_display}</strong>"配置的信息：</p>
           <p>关键字：<em>{r.keyword}</em>，来源：<em>{r.website_name}</em>，时间：<em>{ts}</em>。</p>
           <p>标题：<strong>{r.title}</strong></p>
-          <p>跳转网址：<a href="{r.detail_url}" target="_blank">{r.detail_url}</a></p>
+          <p>跳转网址：<a href="{r.original_url or r.detail_url}" target="_blank">{r.original_url or r.detail_url}</a></p>
+          {build_copies_html(copies)}
           <p>—————————————————————————————————————————————————————————————————————————————————————————————————————————————————————</p>
         </div>
         """
@@ -33,3 +50,11 @@ def build_email_body_html(user: User, results: list[CrawlResult]) -> str:
 
     # 整合所有模块
     return "<html><body>" + "\n".join(parts) + "</body></html>"
+
+
+def build_copies_html(copies: list[CrawlResult]) -> str:
+    """同一公告的其它来源，没有时为空"""
+    if not copies:
+        return ''
+    links = '；'.join(f'<a href="{c.original_url or c.detail_url}" target="_blank">{c.website_name}</a>' for c in copies)
+    return f"<p>同一公告还发布于：{links}</p>"
@@ -0,0 +1,69 @@
+"""
+测试公共配置：使用基于 config/config.ini.backup 的临时配置（CAIJI_CONFIG）与内存 SQLite 数据库，
+缓存、索引等运行时文件写入临时目录，不影响项目目录下的 config.ini 与数据文件。
+"""
+import configparser
+import logging
+import os
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMPDIR = tempfile.mkdtemp(prefix='caiji-tests-')
+
+
+def _write_config() -> str:
+    config = configparser.ConfigParser()
+    config.read(os.path.join(ROOT, 'config', 'config.ini.backup'), encoding='utf-8')
+    overrides = {
+        'CRAWLER': {'distributed': 'false'},
+        'RATE_LIMIT': {'enabled': 'false'},
+        'BROWSER_POOL': {'enabled': 'false'},
+        'RESPONSE_CACHE': {'path': os.path.join(_TMPDIR, 'response_cache.sqlite3')},
+        'SEEN_INDEX': {'path': os.path.join(_TMPDIR, 'seen_urls.bloom')},
+        'FETCH_MODE': {'path': os.path.join(_TMPDIR, 'fetch_modes.json')},
+        'URL_CANONICAL': {'legacy_index_path': os.path.join(_TMPDIR, 'legacy_urls.json')},
+        'CASSETTE': {'mode': 'off'},
+    }
+    for section, values in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for key, value in values.items():
+            config.set(section, key, value)
+    path = os.path.join(_TMPDIR, 'config.ini')
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+    return path
+
+
+# 读取配置的模块在设置 CAIJI_CONFIG 之后再导入
+os.environ['CAIJI_CONFIG'] = _write_config()
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger('tests')
+
+
+@pytest.fixture
+def tmp_config_dir():
+    return _TMPDIR
+
+
+@pytest.fixture
+def app():
+    """内存 SQLite 数据库的 Flask 应用，测试期间处于应用上下文中"""
+    from flask import Flask
+    from config.db import db
+    from app import models  # noqa: F401  注册全部模型
+
+    flask_app = Flask('tests')
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
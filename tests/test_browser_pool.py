@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from caiji.utils.browser_pool import BrowserPool, BrowserPoolTimeout, PooledBrowser
+
+
+class FakeTab:
+    def clear_cache(self, **kwargs):
+        pass
+
+    def get(self, url):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, pool):
+        self.pool = pool
+        self.process_id = None
+
+    def new_tab(self, new_context=True):
+        time.sleep(0.005)
+        return FakeTab()
+
+    def quit(self, force=False, del_data=False):
+        self.pool.quit_browser()
+
+
+class FakePool(BrowserPool):
+    """_launch 不启动 Chromium，只统计同时存在的浏览器进程数"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counter_lock = threading.Lock()
+        self.live = 0
+        self.peak = 0
+
+    def _launch(self):
+        with self.counter_lock:
+            self.live += 1
+            self.peak = max(self.peak, self.live)
+        # 模拟启动耗时，让并发的出借同时落在“需要启动”的分支上
+        time.sleep(0.05)
+        return PooledBrowser(FakeBrowser(self))
+
+    def quit_browser(self):
+        with self.counter_lock:
+            self.live -= 1
+
+
+def _hammer(pool, threads=12, rounds=8):
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(rounds):
+                with pool.lease(timeout=10):
+                    time.sleep(0.002)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    assert errors == []
+
+
+def test_concurrent_leases_never_exceed_size():
+    pool = FakePool(size=2, tabs_per_browser=2, max_uses=1000)
+    _hammer(pool)
+    assert pool.started <= pool.size
+    assert pool.peak <= pool.size
+
+
+def test_recycled_browser_counts_until_its_tabs_return():
+    # max_uses 很小，浏览器不断被回收重建；仍有标签页出借的旧浏览器也占名额
+    pool = FakePool(size=2, tabs_per_browser=3, max_uses=2)
+    _hammer(pool)
+    assert pool.recycled > 0
+    assert pool.peak <= pool.size
+    pool.close()
+    assert pool.live == 0
+
+
+def test_wait_for_draining_browser_times_out():
+    pool = FakePool(size=1, tabs_per_browser=2, max_uses=1000)
+    tab = pool.acquire()
+    owner = pool._tab_owner[id(tab)]
+    pool._retire(owner, reason="测试")
+    # 唯一的浏览器已回收但标签页未归还，不能再启动第二个
+    with pytest.raises(BrowserPoolTimeout):
+        pool.acquire(timeout=0.3)
+    assert pool.peak == 1
+
+    # 归还后旧浏览器退出，名额释放
+    pool.release(tab)
+    with pool.lease(timeout=1):
+        pass
+    assert pool.started == 2
+    assert pool.peak == 1
+
+
+def test_active_reflects_running_browsers():
+    pool = FakePool(size=1, tabs_per_browser=1, max_uses=1000)
+    assert not pool.active
+    with pool.lease(timeout=1):
+        assert pool.active
+    pool.close()
+    # 关闭后 started 仍为累计值，active 为 False，下一轮结束时不必再关闭
+    assert pool.started == 1 and not pool.active
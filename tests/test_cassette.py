@@ -0,0 +1,107 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from caiji.utils.cassette import BROWSER, RECORD, REPLAY, Cassette, CassetteMiss, request_key
+from caiji.utils.fetcher import FetchError, Fetcher
+
+
+def test_request_key():
+    # 查询参数并入 URL，方法统一大写
+    assert request_key('get', 'http://example.com/list', params={'page': 2}) == \
+        request_key('GET', 'http://example.com/list?page=2')
+    assert request_key('GET', 'http://example.com/list?page=1') != request_key('GET', 'http://example.com/list?page=2')
+    # 请求体参与匹配
+    post = request_key('POST', 'http://example.com/search', data={'q': '招标'})
+    assert post.startswith('POST http://example.com/search ')
+    assert post == request_key('post', 'http://example.com/search', data={'q': '招标'})
+    assert post != request_key('POST', 'http://example.com/search', data={'q': '采购'})
+    assert request_key('POST', 'http://example.com/api', json_body={'page': 1}) != \
+        request_key('POST', 'http://example.com/api', json_body={'page': 2})
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'cassette.gz')
+    cassette = Cassette(path, RECORD)
+    cassette.record('GET', 'http://example.com/list', status_code=200, headers={'ETag': '"v1"'},
+                    encoding='utf-8', body='第一次'.encode('utf-8'))
+    cassette.record('GET', 'http://example.com/list', status_code=200, body='第二次'.encode('utf-8'))
+    cassette.record('POST', 'http://example.com/search', data={'q': '招标'}, status_code=200, body=b'result')
+    cassette.record('GET', 'http://example.com/down', error='ConnectionError: 连接被拒绝')
+    cassette.record(BROWSER, 'http://example.com/spa', final_url='http://example.com/spa#/list',
+                    status_code=200, body=b'<ul></ul>')
+    cassette.close()
+
+    replay = Cassette(path, REPLAY)
+    assert len(replay) == 5
+    first = replay.replay('GET', 'http://example.com/list')
+    assert (first.status_code, first.headers, first.body.decode('utf-8')) == (200, {'ETag': '"v1"'}, '第一次')
+    # 同一请求按录制顺序返回，用完后重复最后一次
+    assert replay.replay('GET', 'http://example.com/list').body.decode('utf-8') == '第二次'
+    assert replay.replay('GET', 'http://example.com/list').body.decode('utf-8') == '第二次'
+    assert replay.replay('POST', 'http://example.com/search', data={'q': '招标'}).body == b'result'
+    assert replay.replay('GET', 'http://example.com/down').error.startswith('ConnectionError')
+    assert replay.has(BROWSER, 'http://example.com/spa')
+    assert replay.replay(BROWSER, 'http://example.com/spa').final_url == 'http://example.com/spa#/list'
+    with pytest.raises(CassetteMiss):
+        replay.replay('POST', 'http://example.com/search', data={'q': '采购'})
+    assert replay.stats() == {"mode": REPLAY, "recordings": 5, "replayed": 6, "missed": 1}
+
+
+def test_truncated_file_keeps_complete_records(tmp_path, logger):
+    path = str(tmp_path / 'cassette.gz')
+    cassette = Cassette(path, RECORD)
+    bodies = [os.urandom(4096) for _ in range(3)]
+    for i, body in enumerate(bodies):
+        cassette.record('GET', f'http://example.com/{i}', status_code=200, body=body)
+    cassette.close()
+
+    # 录制进程中断：最后一条记录只写了一半
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:-2048])
+
+    replay = Cassette(path, REPLAY, logger=logger)
+    assert len(replay) == 2
+    assert [replay.replay('GET', f'http://example.com/{i}').body for i in range(2)] == bodies[:2]
+    assert not replay.has('GET', 'http://example.com/2')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = f'<p>{self.path}</p>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_fetcher_replays_without_network(tmp_path):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_port}/list"
+    path = str(tmp_path / 'cassette.gz')
+    try:
+        recorder = Fetcher(cassette=Cassette(path, RECORD), max_retries=0)
+        recorded = recorder.get(url, params={'page': 3})
+        recorder.close()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    # 服务器已关闭，回放仍返回同样的响应
+    player = Fetcher(cassette=Cassette(path, REPLAY), max_retries=0)
+    replayed = player.get(url, params={'page': 3})
+    assert (replayed.status_code, replayed.text, replayed.url) == (200, recorded.text, recorded.url)
+    with pytest.raises(FetchError):
+        player.get(url, params={'page': 4})
+    player.close()
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from caiji.utils import common
+from caiji.utils.common import to_timestamp
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+SAMPLES = {
+    '2025.04.27 15:08:45': datetime(2025, 4, 27, 15, 8, 45),
+    '2025-04-28': datetime(2025, 4, 28),
+    '2025/4/28 9:05': datetime(2025, 4, 28, 9, 5),
+    '２０２５年０５月２０日１４点３０分': datetime(2025, 5, 20, 14, 30),
+    '2025年05月15日09时': datetime(2025, 5, 15, 9),
+    '20250428': datetime(2025, 4, 28),
+    '05-20': datetime(2025, 5, 20),
+    '12月30日 14:20': datetime(2024, 12, 30, 14, 20),
+    '昨天 14:20': datetime(2025, 5, 31, 14, 20),
+    '前天': datetime(2025, 5, 30),
+    '3小时前': datetime(2025, 6, 1, 9),
+    '半小时前': datetime(2025, 6, 1, 11, 30),
+    '发布时间：2025-05-20 附件20240101.pdf': datetime(2025, 5, 20),
+    '[2025-05-20] 第20240101号公告': datetime(2025, 5, 20),
+    '发布时间：05-20': datetime(2025, 5, 20),
+    '[05-20] 关于第1-2期的通知': datetime(2025, 5, 20),
+    '发布于5月20日': datetime(2025, 5, 20),
+}
+
+
+@pytest.mark.parametrize('text, expected', SAMPLES.items())
+def test_formats(text, expected):
+    assert to_timestamp(text, now=NOW) == expected
+
+
+def test_unknown_and_empty():
+    assert to_timestamp('', now=NOW) is None
+    assert to_timestamp('暂无', now=NOW) is None
+    assert to_timestamp('2025-13-45', now=NOW) is None
+
+
+@pytest.mark.parametrize('preferred', range(len(common._DATE_PATTERNS)))
+def test_site_memo_does_not_change_results(monkeypatch, preferred):
+    # 不管网站此前记住的是哪种格式，结果都与不传 website_name 时相同
+    monkeypatch.setattr(common, '_site_formats', {'某某大学': preferred})
+    for text, expected in SAMPLES.items():
+        common._site_formats['某某大学'] = preferred
+        assert to_timestamp(text, '某某大学', now=NOW) == expected, text
+
+
+def test_attachment_number_after_compact_dates(monkeypatch):
+    monkeypatch.setattr(common, '_site_formats', {})
+    assert to_timestamp('20240101', '某某学院', now=NOW) == datetime(2024, 1, 1)
+    assert to_timestamp('发布时间：2025-05-20 附件20240101.pdf', '某某学院', now=NOW) == datetime(2025, 5, 20)
+
+
+@pytest.mark.parametrize('text', ['第1-2页', 'v3.5 更新说明', '预算 12.5 万元'])
+def test_stray_numbers_are_not_month_day(text):
+    assert to_timestamp(text, now=NOW) is None
+
+
+def test_relative_times_use_utc():
+    # 与 crawled_at 一致按 UTC，不受主机时区影响
+    assert abs(to_timestamp('刚刚') - datetime.utcnow()) < timedelta(seconds=5)
+    assert to_timestamp('1748779200') == datetime(2025, 6, 1, 12, 0, 0)
@@ -0,0 +1,124 @@
+import subprocess
+import sys
+import time
+
+from config.db import db
+from app.models import CrawlPool
+from app.models.crawl_run import CrawlRun, CrawlTaskRun
+import caiji.main.keyword_transmit as kt
+from caiji.utils.crawl_telemetry import TelemetryRecorder
+from caiji.utils.spider_registry import register_spider
+from caiji.utils.task_lease import default_worker_id
+
+
+def _result(task_id, **values):
+    return dict({"task_id": task_id, "website_name": 't021', "keyword": '招标', "status": 'success',
+                 "fetched": 2, "items": 1, "error": None, "pages": 1, "bytes": 100}, **values)
+
+
+def test_task_rows_are_written_in_batches(app, logger):
+    recorder = TelemetryRecorder('sweep', batch_size=2, logger=logger).start()
+    recorder.record([_result(1)])
+    assert CrawlTaskRun.query.count() == 0
+    recorder.record([_result(2), _result(3, status='failed', error='ValueError: 坏页面')])
+    # 凑满一批即写入，进程此时退出也保留了这些任务的记录
+    assert CrawlTaskRun.query.count() == 3
+
+    recorder.record([_result(4)])
+    recorder.finish({"total": 4, "success": 3, "failed": 1, "timeout": 0, "skipped": 0})
+    run = db.session.get(CrawlRun, recorder.run_id)
+    assert CrawlTaskRun.query.count() == 4
+    assert (run.status, run.pages, run.bytes, run.items_found, run.items_inserted) == ('finished', 4, 400, 8, 4)
+    failed = CrawlTaskRun.query.filter_by(task_id=3).one()
+    assert failed.error_class == 'ValueError'
+
+
+class _SlowWriter:
+    """批量写入替身：flush() 之前各任务都还没有落库"""
+
+    def __init__(self):
+        self.alive = True
+        self.flushes = 0
+        self.task_stats = {}
+
+    def flush(self, timeout=None):
+        self.flushes += 1
+        self.task_stats = {1: {"inserted": 1, "duplicates": 1, "failed": 0},
+                           2: {"inserted": 0, "duplicates": 2, "failed": 0}}
+        return True
+
+    def get_task_stats(self, task_id):
+        return dict(self.task_stats.get(task_id, {"inserted": 0, "duplicates": 0, "failed": 0}))
+
+
+def test_record_does_not_wait_for_writer(app, logger):
+    writer = _SlowWriter()
+    recorder = TelemetryRecorder('sweep', batch_size=1, logger=logger, writer=writer).start()
+    recorder.record([_result(1)])
+    recorder.record([_result(2)])
+    # 调度线程中写入任务行时不等待批量写入
+    assert writer.flushes == 0
+    assert [row.items_inserted for row in CrawlTaskRun.query.order_by(CrawlTaskRun.task_id)] == [0, 0]
+
+    recorder.finish({"total": 2, "success": 2, "failed": 0, "timeout": 0, "skipped": 0})
+    rows = CrawlTaskRun.query.order_by(CrawlTaskRun.task_id).all()
+    assert [(row.items_inserted, row.items_duplicate) for row in rows] == [(1, 1), (0, 2)]
+    run = db.session.get(CrawlRun, recorder.run_id)
+    assert (run.items_inserted, run.items_duplicate) == (1, 3)
+
+
+def test_stale_running_rows_are_aborted(app, logger):
+    host = default_worker_id().rsplit(':', 1)[0]
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    runs = [
+        CrawlRun(mode='sweep', worker=f'{host}:1', status='running'),
+        CrawlRun(mode='distributed', worker=f'{host}:{exited.pid}', status='running'),
+        CrawlRun(mode='distributed', worker='other-host:1', status='running'),
+        CrawlRun(mode='sweep', worker=f'{host}:2', status='finished'),
+    ]
+    db.session.add_all(runs)
+    db.session.commit()
+
+    recorder = TelemetryRecorder('sweep', logger=logger).start()
+    # 非分布式的旧记录、本机已退出进程的记录标记为中断；其它主机的 worker 无法判断，保持不变
+    assert [db.session.get(CrawlRun, run.id).status for run in runs] == ['aborted', 'aborted', 'running', 'finished']
+    assert db.session.get(CrawlRun, recorder.run_id).status == 'running'
+
+
+def test_fan_in_crawl_time_is_counted_once(app, logger, monkeypatch):
+    base = kt.load_crawler_settings()
+    values = dict(base, fan_in=True, incremental=False, seen_index=False, near_duplicate=False,
+                  url_canonical=False, telemetry=True, checkpoint_interval=0)
+    monkeypatch.setattr(kt, 'load_crawler_settings', lambda: dict(values))
+
+    @register_spider('t021-fan-in')
+    class ListingSpider:
+        supports_fan_in = True
+
+        def __init__(self, category, keyword, config_name, website_name, source_url, logger):
+            pass
+
+        def crawl_listing(self):
+            time.sleep(0.1)
+            return [{'title': '招标采购中标公告', 'detail_url': 'http://t021/1'}]
+
+    for keyword in ('招标', '采购', '中标'):
+        db.session.add(CrawlPool(category='c', source_url='', keyword=keyword, website_names='t021-fan-in',
+                                 config_names=['A']))
+    db.session.commit()
+
+    summary = kt.run_spiders_from_pool(logger, max_workers=1)
+    results = summary['results']
+    assert len(results) == 3
+    crawl_seconds = [r.get('crawl_seconds', 0.0) for r in results]
+    assert crawl_seconds[0] >= 0.1
+    assert crawl_seconds[1:] == [0.0, 0.0]
+    assert sum(r['parse_seconds'] for r in results) < 0.2
+    # 单元耗时只记一次，不会按任务数放大网站的耗时分位数
+    assert results[0]['duration_seconds'] >= 0.1
+    assert [r['duration_seconds'] for r in results[1:]] == [None, None]
+
+    run = CrawlRun.query.filter_by(status='finished').one()
+    assert (run.tasks_total, run.items_inserted) == (3, 1)
+    assert CrawlTaskRun.query.filter_by(run_id=run.id).count() == 3
@@ -0,0 +1,70 @@
+from caiji.utils.fetch_mode import BROWSER, STATIC, FetchModeSelector, Page
+
+LISTING = '<ul>' + ''.join(f'<li class="item">公告{i}</li>' for i in range(3)) + '</ul>'
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.url = 'http://example.com/list'
+        self.text = text
+        self.status_code = status_code
+        self.ok = 200 <= status_code < 400
+
+
+class FakeFetcher:
+    cassette = None
+
+    def __init__(self):
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+class FakeSelector(FetchModeSelector):
+    """_browser 不使用浏览器池，只统计调用次数"""
+
+    browser_calls = 0
+
+    def _browser(self, url, selector):
+        self.browser_calls += 1
+        return Page(url, LISTING, BROWSER)
+
+
+def _selector(tmp_path):
+    return FakeSelector(FakeFetcher(), browser_pool=object(), path=str(tmp_path / 'modes.json'))
+
+
+def test_error_response_does_not_switch_to_browser(tmp_path):
+    selector = _selector(tmp_path)
+    selector.fetcher.responses = [FakeResponse(LISTING)]
+    assert selector.get_page('某某大学', 'http://example.com/list', 'li.item').mode == STATIC
+    assert selector.mode_for('某某大学') == STATIC
+
+    # 一次 503 和一次空响应：本次改用浏览器，但记录仍为 static
+    selector.fetcher.responses = [FakeResponse('维护中', 503), FakeResponse('  ')]
+    for _ in range(2):
+        assert selector.get_page('某某大学', 'http://example.com/list', 'li.item').mode == BROWSER
+        assert selector.mode_for('某某大学') == STATIC
+    assert selector.browser_calls == 2
+
+    selector.fetcher.responses = [FakeResponse(LISTING)]
+    assert selector.get_page('某某大学', 'http://example.com/list', 'li.item').mode == STATIC
+
+
+def test_probe_on_error_records_nothing(tmp_path):
+    selector = _selector(tmp_path)
+    selector.fetcher.responses = [FakeResponse('', 500)]
+    assert selector.get_page('某某学院', 'http://example.com/list', 'li.item').mode == BROWSER
+    assert selector.mode_for('某某学院') is None
+
+
+def test_ok_page_without_items_records_browser(tmp_path):
+    selector = _selector(tmp_path)
+    selector.fetcher.responses = [FakeResponse('<div id="app"></div>')]
+    assert selector.get_page('某某研究院', 'http://example.com/list', 'li.item').mode == BROWSER
+    assert selector.mode_for('某某研究院') == BROWSER
+
+    # 决定写入文件，新的实例沿用
+    reloaded = _selector(tmp_path)
+    assert reloaded.mode_for('某某研究院') == BROWSER
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from caiji.utils import html_extract
+from caiji.utils.html_extract import ListingItem, ListingSpec
+
+PAGE = """
+<html><body>
+<ul class="nav"><li><a href="/">首页</a></li></ul>
+<ul class="news-list">
+  <li><a href="detail/1.html" title="关于开展  2025 年招标工作的通知">关于开展 2025 年招标…</a>
+      <span class="date">2025-05-20</span><span class="unit">资产处</span></li>
+  <li><a href="https://other.example.com/2.html">采购公告</a><span class="date">05-18</span></li>
+  <li><span class="date">2025-05-17</span></li>
+</ul>
+</body></html>
+"""
+
+
+@pytest.fixture(params=['lxml', 'bs4'])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(html_extract, 'HAS_LXML', request.param == 'lxml')
+    return request.param
+
+
+def test_extract_listing(backend):
+    spec = ListingSpec('ul.news-list', 'li', title='a@title', date='span.date', publisher='span.unit')
+    items = spec.extract(PAGE, 'http://example.com/news/', parse_dates=False)
+    # 没有 title 属性（标题为空）或没有链接的条目被跳过
+    assert items == [
+        ListingItem('关于开展 2025 年招标工作的通知', 'http://example.com/news/detail/1.html', '2025-05-20', '资产处'),
+    ]
+
+    spec = ListingSpec('ul.news-list', 'li', date='span.date')
+    items = spec.extract(PAGE, 'http://example.com/news/')
+    assert [item.detail_url for item in items] == ['http://example.com/news/detail/1.html',
+                                                   'https://other.example.com/2.html']
+    assert items[0].publish_time == datetime(2025, 5, 20)
+
+
+@pytest.mark.parametrize('html', ['', '   \n\t', '<!-- 空页面 -->', '<html><body></body></html>'])
+def test_empty_documents(backend, html):
+    assert ListingSpec('ul.news-list', 'li').extract(html, 'http://example.com/') == []
@@ -0,0 +1,31 @@
+from config.db import db
+from app.models import CrawlResult
+from caiji.utils.incremental import IncrementalTracker, load_known_urls
+
+
+def _save(n, keyword='招标'):
+    db.session.add(CrawlResult(category='c', config_name='A', keyword=keyword, website_name='site',
+                               source_url='', title='公告', detail_url=f'http://e.com/{n}'))
+
+
+def test_known_urls_limited_to_newest_rows(app):
+    for n in range(10):
+        _save(n, keyword='招标' if n % 2 else '采购')
+    db.session.commit()
+    assert load_known_urls('site', '招标', limit=2) == {'http://e.com/9', 'http://e.com/7'}
+    assert load_known_urls('site', limit=3) == {'http://e.com/9', 'http://e.com/8', 'http://e.com/7'}
+    assert len(load_known_urls('site', limit=0)) == 10
+
+
+def test_stop_after_consecutive_known(app):
+    for n in range(20):
+        _save(n)
+    db.session.commit()
+    tracker = IncrementalTracker.for_task('site', '招标', stop_after=3, known_limit=5)
+    # 列表倒序：新条目在前，之后连续命中最近保存的记录
+    assert tracker.observe('http://e.com/new')
+    for n in (19, 18, 17):
+        assert not tracker.observe(f'http://e.com/{n}')
+    assert tracker.should_stop()
+    assert tracker.filter_new([{'detail_url': 'http://e.com/new'}, {'detail_url': 'http://e.com/19'}]) == \
+        [{'detail_url': 'http://e.com/new'}]
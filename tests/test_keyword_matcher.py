@@ -0,0 +1,37 @@
+import random
+from types import SimpleNamespace
+
+from caiji.utils.keyword_matcher import AhoCorasick, KeywordMatcher, get_matcher
+
+
+def test_finds_overlapping_and_nested_patterns():
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers', '', '采购', '政府采购'])
+    assert automaton.find_all('ushers') == {'he', 'she', 'hers'}
+    assert automaton.find_all('某政府采购项目') == {'采购', '政府采购'}
+    assert automaton.find_all('') == set()
+    assert automaton.find_all('无关') == set()
+
+
+def test_matches_naive_substring_search():
+    rng = random.Random(7)
+    alphabet = 'ab招标采购'
+    patterns = {''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(40)}
+    automaton = AhoCorasick(patterns)
+    for _ in range(200):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert automaton.find_all(text) == {p for p in patterns if p in text}
+
+
+def test_keyword_matcher_reports_owning_configs():
+    configs = [SimpleNamespace(config_name='B', keywords=['招标', ' 采购 ']),
+               SimpleNamespace(config_name='A', keywords=['招标', '']),
+               SimpleNamespace(config_name='C', keywords=None)]
+    matcher = KeywordMatcher.from_configs(configs)
+    assert len(matcher) == 2
+    assert matcher.match('设备采购招标公告') == {'招标': ['A', 'B'], '采购': ['B']}
+
+
+def test_get_matcher_reuses_compiled_automaton():
+    first = get_matcher({'招标': {'A'}, '采购': {'B'}})
+    assert get_matcher({'采购': {'B'}, '招标': {'A'}}) is first
+    assert get_matcher({'招标': {'A', 'C'}, '采购': {'B'}}) is not first
@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+from config.db import db
+from app.models import CrawlPool, CrawlResult
+import caiji.main.keyword_transmit as kt
+from caiji.utils.result_writer import ResultWriter
+from caiji.utils import sweep_checkpoint
+from caiji.utils.spider_registry import register_spider
+from caiji.utils.task_watchdog import TaskWatchdog
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """只保留并发调度与批量写入，关闭进程级索引与运行记录"""
+    base = kt.load_crawler_settings()
+    values = dict(base, fan_in=False, incremental=False, seen_index=False, near_duplicate=False,
+                  url_canonical=False, telemetry=False, checkpoint_interval=0)
+    monkeypatch.setattr(kt, 'load_crawler_settings', lambda: dict(values))
+    # 各测试的任务 id 都从 1 开始，不共用进程内的重试计数
+    monkeypatch.setattr(sweep_checkpoint, '_attempts', defaultdict(int))
+    return values
+
+
+def add_tasks(sites, keywords):
+    for keyword in keywords:
+        for site in sites:
+            db.session.add(CrawlPool(category='c', source_url='', keyword=keyword, website_names=site,
+                                     config_names=['A']))
+    db.session.commit()
+
+
+def test_per_site_limit_is_respected(app, logger, settings):
+    sites = ['t001-a', 't001-b']
+    running = defaultdict(int)
+    peak = defaultdict(int)
+    lock = threading.Lock()
+
+    @register_spider(*sites)
+    class SlowSpider:
+        def __init__(self, category, keyword, config_name, website_name, source_url, logger):
+            self.keyword = keyword
+            self.site = website_name
+
+        def crawl(self):
+            with lock:
+                running[self.site] += 1
+                peak[self.site] = max(peak[self.site], running[self.site])
+            time.sleep(0.05)
+            with lock:
+                running[self.site] -= 1
+            return [{'title': f'{self.keyword} 公告', 'detail_url': f'http://{self.site}/{self.keyword}'}]
+
+    add_tasks(sites, ['招标', '采购', '中标'])
+    summary = kt.run_spiders_from_pool(logger, max_workers=4, per_site_limit=1)
+
+    assert summary['success'] == 6
+    assert dict(peak) == {'t001-a': 1, 't001-b': 1}
+    assert CrawlResult.query.count() == 6
+
+
+def test_failed_task_is_retried_on_resume(app, logger, settings, monkeypatch):
+    calls = defaultdict(int)
+    failing = {'t019-b'}
+
+    @register_spider('t019-a', 't019-b')
+    class FlakySpider:
+        def __init__(self, category, keyword, config_name, website_name, source_url, logger):
+            self.keyword = keyword
+            self.site = website_name
+
+        def crawl(self):
+            calls[self.site] += 1
+            if self.site in failing:
+                raise RuntimeError('站点维护中')
+            return [{'title': f'{self.keyword} 公告', 'detail_url': f'http://{self.site}/{self.keyword}'}]
+
+    add_tasks(['t019-a', 't019-b'], ['招标'])
+    summary = kt.run_spiders_from_pool(logger, max_workers=1, generation=1)
+    assert (summary['success'], summary['failed']) == (1, 1)
+    assert [task['website_names'] for task in kt.unfinished_tasks(1)] == ['t019-b']
+
+    failing.clear()
+    summary = kt.run_spiders_from_pool(logger, max_workers=1, generation=1)
+    assert summary['success'] == 1
+    assert dict(calls) == {'t019-a': 1, 't019-b': 2}
+    assert kt.unfinished_tasks(1) == []
+    assert CrawlResult.query.count() == 2
+
+
+def test_failed_task_is_given_up_after_max_attempts(app, logger, settings):
+    settings['checkpoint_max_attempts'] = 2
+
+    @register_spider('t019-c')
+    class BrokenSpider:
+        def __init__(self, category, keyword, config_name, website_name, source_url, logger):
+            pass
+
+        def crawl(self):
+            raise RuntimeError('解析失败')
+
+    add_tasks(['t019-c'], ['招标'])
+    kt.run_spiders_from_pool(logger, max_workers=1, generation=1)
+    assert len(kt.unfinished_tasks(1)) == 1
+    kt.run_spiders_from_pool(logger, max_workers=1, generation=1)
+    assert kt.unfinished_tasks(1) == []
+
+
+def _hanging_spider(sites, release, running, peak, lock):
+    @register_spider(*sites)
+    class HangingSpider:
+        """第一个网站的“招标”任务不响应取消，直到 release 被设置"""
+
+        def __init__(self, category, keyword, config_name, website_name, source_url, logger):
+            self.keyword = keyword
+            self.site = website_name
+
+        def crawl(self):
+            with lock:
+                running[self.site] += 1
+                peak[self.site] = max(peak[self.site], running[self.site])
+            try:
+                if self.site == sites[0] and self.keyword == '招标':
+                    release.wait(10)
+                return [{'title': f'{self.keyword} 公告', 'detail_url': f'http://{self.site}/{self.keyword}'}]
+            finally:
+                with lock:
+                    running[self.site] -= 1
+
+
+def test_abandoned_job_keeps_site_slot_until_exit(app, logger, settings, monkeypatch):
+    sites = ['t020-a', 't020-b']
+    release = threading.Event()
+    running, peak, lock = defaultdict(int), defaultdict(int), threading.Lock()
+    _hanging_spider(sites, release, running, peak, lock)
+    monkeypatch.setattr(kt, 'get_watchdog', lambda logger=None: watchdog)
+    watchdog = TaskWatchdog(default_seconds=0.2, grace_seconds=1.0, interval=0.05)
+
+    add_tasks(sites, ['招标', '采购'])
+    # 卡住的线程在被放弃后、同站下一个任务等待期间退出
+    threading.Timer(1.6, release.set).start()
+    summary = kt.run_spiders_from_pool(logger, max_workers=4, per_site_limit=1)
+
+    assert peak['t020-a'] == 1
+    assert summary['timeout'] == 1
+    assert summary['success'] == 3
+    assert summary['abandoned'] == 0
+
+
+def test_still_running_abandoned_job_skips_site(app, logger, settings, monkeypatch):
+    sites = ['t020-c', 't020-d']
+    release = threading.Event()
+    running, peak, lock = defaultdict(int), defaultdict(int), threading.Lock()
+    _hanging_spider(sites, release, running, peak, lock)
+    monkeypatch.setattr(kt, 'get_watchdog', lambda logger=None: watchdog)
+    watchdog = TaskWatchdog(default_seconds=0.2, grace_seconds=0.2, interval=0.05)
+
+    add_tasks(sites, ['招标', '采购'])
+    try:
+        summary = kt.run_spiders_from_pool(logger, max_workers=4, per_site_limit=1)
+    finally:
+        release.set()
+
+    assert peak['t020-c'] == 1
+    assert (summary['timeout'], summary['skipped'], summary['success']) == (1, 1, 2)
+    # 关闭时线程仍未退出：写入线程停止后拒绝它提交的结果
+    assert summary['abandoned'] == 1
+    time.sleep(0.2)
+    assert CrawlResult.query.count() == 2
+
+
+def test_abandoned_and_blocked_tasks_run_on_resume(app, logger, settings, monkeypatch):
+    sites = ['t020-e', 't020-f']
+    release = threading.Event()
+    running, peak, lock = defaultdict(int), defaultdict(int), threading.Lock()
+    _hanging_spider(sites, release, running, peak, lock)
+    monkeypatch.setattr(kt, 'get_watchdog', lambda logger=None: watchdog)
+    watchdog = TaskWatchdog(default_seconds=0.2, grace_seconds=0.2, interval=0.05)
+
+    add_tasks(sites, ['招标', '采购'])
+    try:
+        summary = kt.run_spiders_from_pool(logger, max_workers=4, per_site_limit=1, generation=1)
+    finally:
+        release.set()
+    assert (summary['timeout'], summary['skipped'], summary['success']) == (1, 1, 2)
+    # 被放弃的任务和因网站被占用而未执行的任务都留待恢复时执行
+    assert sorted(task['keyword'] for task in kt.unfinished_tasks(1)) == ['招标', '采购']
+    time.sleep(0.2)
+
+    summary = kt.run_spiders_from_pool(logger, max_workers=4, per_site_limit=1, generation=1)
+    assert (summary['total'], summary['success']) == (2, 2)
+    assert kt.unfinished_tasks(1) == []
+    assert CrawlResult.query.count() == 4
+
+
+def test_stopped_writer_rejects_rows(app, logger):
+    writer = ResultWriter(app, logger=logger).start()
+    writer.stop()
+    with pytest.raises(RuntimeError):
+        writer.submit([{'detail_url': 'http://t020/x'}], task_id=1)
@@ -0,0 +1,76 @@
+import logging
+import random
+from datetime import datetime
+
+from config.db import db
+from app.models import CrawlResult
+from caiji.utils.near_duplicate import NearDuplicateIndex, hamming, normalize_text, simhash, to_signed
+from caiji.utils.result_writer import ResultWriter, build_result_rows
+
+TITLE = '关于2025年度实验室设备采购项目公开招标的公告'
+
+
+def test_normalize_text():
+    assert normalize_text('【转载】关于 2025 年“招标”的通知！', '资产处') == '转载关于2025年招标的通知资产处'
+    assert normalize_text('ＡＢＣ１２３', None) == 'abc123'
+
+
+def test_reposted_titles_are_close():
+    base = simhash(normalize_text(TITLE, '资产管理处'))
+    reposted = simhash(normalize_text(f'【转载】{TITLE}', '资产管理处'))
+    other = simhash(normalize_text('关于2025年研究生招生考试报名工作的通知', '研究生院'))
+    assert hamming(base, base) == 0
+    assert hamming(base, reposted) < hamming(base, other)
+
+
+def test_band_keys_share_a_band_within_max_distance():
+    index = NearDuplicateIndex(max_distance=3)
+    rng = random.Random(0)
+    for _ in range(200):
+        value = rng.getrandbits(64)
+        other = value
+        for bit in rng.sample(range(64), 3):
+            other ^= 1 << bit
+        assert any(a == b for a, b in zip(index._band_keys(value), index._band_keys(other)))
+
+
+def test_assign_links_within_batch_and_confirm_updates_index():
+    index = NearDuplicateIndex(max_distance=3)
+    value = index.fingerprint(TITLE)
+    now = datetime.utcnow()
+    links, originals = index.assign([(1, value, now), (2, value ^ 0b101, now), (3, None, now)])
+    # 同一批中先出现的结果成为原始结果；确认前索引不变
+    assert links == {2: 1}
+    assert [row[0] for row in originals] == [1]
+    assert len(index) == 0 and index.linked == 0
+
+    index.confirm(originals, links)
+    assert len(index) == 1 and index.linked == 1
+    assert index.assign([(4, value, now)]) == ({4: 1}, [])
+
+
+def test_short_text_has_no_fingerprint():
+    assert NearDuplicateIndex(min_length=8).fingerprint('通知') is None
+    assert to_signed((1 << 64) - 1) == -1
+
+
+def test_rolled_back_batch_leaves_no_phantom_originals(app):
+    index = NearDuplicateIndex(max_distance=3)
+    writer = ResultWriter(app, near_duplicates=index, logger=logging.getLogger('tests'))
+    task = {"id": 1, "category": "c", "keyword": "招标", "website_names": "site", "source_url": "",
+            "config_names": ["A"]}
+    titles = [f'{TITLE}（第{n}包）' if n % 2 else f'第{n}期学术讲座：人工智能与教育变革专题报告会'
+              for n in range(8)]
+    batch = [(1, row) for row in build_result_rows(
+        [{'title': title, 'detail_url': f'http://a/{n}'} for n, title in enumerate(titles)], task)]
+    batch[5][1]['title'] = None
+    writer._write(batch)
+
+    # 整批失败后拆分重试：索引中只有实际提交的原始结果，且指纹与数据库一致
+    assert CrawlResult.query.count() == 7
+    for result_id, (value, _) in index._entries.items():
+        row = db.session.get(CrawlResult, result_id)
+        assert row is not None and row.canonical_id is None and row.simhash == to_signed(value)
+    canonical_ids = {row.canonical_id for row in CrawlResult.query if row.canonical_id is not None}
+    assert canonical_ids <= set(index._entries)
+    assert index.linked == writer.linked == len([r for r in CrawlResult.query if r.canonical_id is not None])
@@ -0,0 +1,51 @@
+from config.db import db
+from app.models import CrawlPool
+from app.models.crawler_config import CrawlerConfig
+from caiji.utils.pool_synchronization import sync_crawler_config_to_pool
+
+
+def add_config(name, keywords, sites, category='c'):
+    db.session.merge(CrawlerConfig(config_name=name, keywords=keywords, website_names=sites, source_urls=[],
+                                   category=category, created_user='u'))
+    db.session.commit()
+
+
+def pool():
+    return {(row.keyword, row.website_names): (row.id, sorted(row.config_names))
+            for row in CrawlPool.query.all()}
+
+
+def test_initial_sync_merges_config_names(app, logger):
+    add_config('A', ['招标', ' '], ['s1', 's2'])
+    add_config('B', ['招标'], ['s1'])
+    result = sync_crawler_config_to_pool(logger)
+    assert result['added'] == 2
+    assert {k: v[1] for k, v in pool().items()} == {('招标', 's1'): ['A', 'B'], ('招标', 's2'): ['A']}
+
+
+def test_resync_only_applies_differences(app, logger):
+    add_config('A', ['招标', '采购'], ['s1'])
+    sync_crawler_config_to_pool(logger)
+    before = pool()
+
+    add_config('A', ['招标', '中标'], ['s1'])
+    add_config('B', ['招标'], ['s1'])
+    result = sync_crawler_config_to_pool(logger)
+    after = pool()
+
+    assert (result['added'], result['updated'], result['removed'], result['unchanged']) == (1, 1, 1, 0)
+    # 保留的组合沿用原来的 id，任务上的运行状态不丢失
+    assert after[('招标', 's1')] == (before[('招标', 's1')][0], ['A', 'B'])
+    assert ('采购', 's1') not in after and ('中标', 's1') in after
+
+    assert sync_crawler_config_to_pool(logger)['unchanged'] == 2
+
+
+def test_duplicate_rows_are_removed(app, logger):
+    add_config('A', ['招标'], ['s1'])
+    for _ in range(2):
+        db.session.add(CrawlPool(category='c', source_url='', keyword='招标', website_names='s1', config_names=['A']))
+    db.session.commit()
+    result = sync_crawler_config_to_pool(logger)
+    assert result['removed'] == 1
+    assert CrawlPool.query.count() == 1
@@ -0,0 +1,60 @@
+import configparser
+import threading
+import time
+
+import pytest
+
+from caiji.utils.rate_limiter import AdaptiveRateLimiter, RateLimiterRegistry, TokenBucket, load_site_limits
+from caiji.utils.task_watchdog import TaskCancelled, TaskWatchdog
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=20, burst=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    started = time.monotonic()
+    assert bucket.acquire() > 0
+    assert time.monotonic() - started >= 0.04
+
+
+def test_zero_rate_is_clamped():
+    bucket = TokenBucket(rate=0, burst=1)
+    assert bucket.rate > 0
+    bucket.set_rate(0)
+    assert bucket.rate > 0
+
+    limiter = AdaptiveRateLimiter('site', rate=1, burst=1, min_rate=0, decrease_factor=0)
+    limiter.record(status_code=429)
+    assert limiter.rate > 0
+
+
+def test_cancelled_task_stops_waiting():
+    watchdog = TaskWatchdog(default_seconds=60)
+    bucket = TokenBucket(rate=0.01, burst=1)
+    bucket.acquire()
+    with watchdog.track('job', 'site（关键词）', 'site') as task:
+        threading.Timer(0.1, task.cancel, args=('测试取消',)).start()
+        started = time.monotonic()
+        with pytest.raises(TaskCancelled):
+            bucket.acquire()
+    assert time.monotonic() - started < 2
+
+
+def test_non_positive_rates_are_rejected():
+    config = configparser.ConfigParser()
+    config.read_string("[rate_limit_sites]\n某某大学 = 0, 2\n")
+    with pytest.raises(ValueError):
+        load_site_limits(config)
+    with pytest.raises(ValueError):
+        RateLimiterRegistry(default_rate=0)
+
+
+def test_throttling_halves_rate_and_recovery_adds_step():
+    limiter = AdaptiveRateLimiter('site', rate=2, burst=2, min_rate=0.5, increase_step=0.25)
+    limiter.record(status_code=503)
+    assert limiter.rate == 1
+    limiter.record(status_code=200, latency=0.1)
+    assert limiter.rate == 1.25
+    for _ in range(3):
+        limiter.record(status_code=None)
+    assert limiter.rate == 0.5
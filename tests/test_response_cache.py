@@ -0,0 +1,121 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from caiji.utils.fetch_mode import FetchModeSelector
+from caiji.utils.fetcher import Fetcher
+from caiji.utils.response_cache import ResponseCache
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    """/list?page=N 返回第 N 页，ETag 按页不同；If-None-Match 匹配时返回 304"""
+    protocol_version = 'HTTP/1.1'
+    version = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        page = parse_qs(urlsplit(self.path).query).get('page', ['1'])[0]
+        etag = f'"p{page}-v{self.version.get(page, 1)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = f"page {page} v{self.version.get(page, 1)} lang={self.headers.get('Accept-Language')}".encode()
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    ListingHandler.version = {}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    yield Fetcher(response_cache=cache, max_retries=0)
+    cache.close()
+
+
+def test_not_modified_returns_cached_body(server, fetcher):
+    first = fetcher.get(f"{server}/list", params={'page': 1}, cache=True)
+    second = fetcher.get(f"{server}/list", params={'page': 1}, cache=True)
+    assert not first.unchanged
+    assert second.not_modified and second.unchanged
+    assert second.text == first.text
+
+
+def test_different_params_do_not_share_an_entry(server, fetcher):
+    page1 = fetcher.get(f"{server}/list", params={'page': 1}, cache=True)
+    page2 = fetcher.get(f"{server}/list", params={'page': 2}, cache=True)
+    assert page2.text.startswith('page 2') and not page2.unchanged
+    ListingHandler.version['2'] = 2
+    page2 = fetcher.get(f"{server}/list", params={'page': 2}, cache=True)
+    assert page2.text.startswith('page 2 v2') and not page2.unchanged
+    assert fetcher.get(f"{server}/list", params={'page': 1}, cache=True).text == page1.text
+
+
+def test_custom_headers_are_part_of_the_key(server, fetcher):
+    zh = fetcher.get(f"{server}/list", headers={'Accept-Language': 'zh'}, cache=True)
+    en = fetcher.get(f"{server}/list", headers={'Accept-Language': 'en'}, cache=True)
+    assert zh.text.endswith('lang=zh') and en.text.endswith('lang=en')
+    assert not en.unchanged
+
+
+def test_listing_pages_use_the_cache_without_opt_in(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    selector = FetchModeSelector(Fetcher(response_cache=cache, max_retries=0), path=str(tmp_path / 'modes.json'))
+    loader = selector.bind('某某大学')
+    # 爬虫不传 cache，page_loader 取列表页时默认走条件请求
+    assert not loader.get(f"{server}/list", 'li').unchanged
+    assert loader.get(f"{server}/list", 'li').unchanged
+    assert cache.stats()["not_modified"] == 1
+    cache.close()
+
+
+def test_cache_enabled_per_site(server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    fetcher = Fetcher(response_cache=cache, max_retries=0, cache_sites=['某某大学'])
+    cached, other = fetcher.bind('某某大学'), fetcher.bind('其它网站')
+    cached.get(f"{server}/list", params={'page': 1})
+    assert cached.get(f"{server}/list", params={'page': 1}).unchanged
+    other.get(f"{server}/list", params={'page': 2})
+    assert not other.get(f"{server}/list", params={'page': 2}).unchanged
+    # 显式传 cache=False 时不走缓存
+    assert not cached.get(f"{server}/list", params={'page': 1}, cache=False).unchanged
+    cache.close()
+
+
+def test_eviction_keeps_entry_limit(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'), max_entries=3)
+    for i in range(6):
+        cache.put(f"GET http://a/{i}", None, None, b'x' * 10, 'utf-8')
+    assert cache.get("GET http://a/5") is not None
+    assert cache.get("GET http://a/0") is None
+    cache.close()
+
+
+def test_size_limit_is_checked_on_every_put(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'), max_bytes=64 * 1024)
+    for i in range(20):
+        # 随机内容压缩不了，每条约 16 KB
+        cache.put(f"GET http://a/{i}", None, None, os.urandom(16 * 1024), None)
+        assert cache._conn.execute("SELECT SUM(size) FROM responses").fetchone()[0] <= 64 * 1024
+    assert cache.get("GET http://a/19") is not None
+    assert cache.stats()["evicted"] > 0
+    cache.close()
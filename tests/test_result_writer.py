@@ -0,0 +1,61 @@
+import logging
+import threading
+
+from config.db import db
+from app.models import CrawlResult
+from caiji.utils.result_writer import ResultWriter, build_result_rows
+
+TASK = {"id": 1, "category": "c", "keyword": "招标", "website_names": "site", "source_url": "",
+        "config_names": ["A"]}
+
+
+def rows(*urls, title='公告'):
+    return build_result_rows([{'title': title, 'detail_url': url} for url in urls], TASK)
+
+
+def test_build_result_rows_skips_items_without_url_or_title():
+    built = build_result_rows([{'title': '公告', 'detail_url': 'http://a/1'}, {'title': '', 'detail_url': 'x'},
+                               {'title': '公告'}], TASK)
+    assert [r['detail_url'] for r in built] == ['http://a/1']
+    assert built[0]['config_name'] == 'A' and built[0]['keyword'] == '招标'
+
+
+def test_write_counts_inserted_and_duplicates(app):
+    writer = ResultWriter(app)
+    writer._write([(1, r) for r in rows('http://a/1', 'http://a/2', 'http://a/1')])
+    writer._write([(2, r) for r in rows('http://a/2', 'http://a/3')])
+    assert CrawlResult.query.count() == 3
+    assert (writer.inserted, writer.duplicates, writer.failed) == (3, 2, 0)
+    assert writer.get_task_stats(1) == {"inserted": 2, "duplicates": 1, "failed": 0}
+    assert writer.get_task_stats(2) == {"inserted": 1, "duplicates": 1, "failed": 0}
+
+
+def test_bad_row_only_loses_itself(app, monkeypatch):
+    writer = ResultWriter(app, logger=logging.getLogger('tests'))
+    batch = [(1, r) for r in rows(*[f'http://a/{i}' for i in range(8)])]
+    # SQLite 不检查 VARCHAR 长度，用 NOT NULL 约束模拟数据库拒绝的行
+    batch[5][1]['title'] = None
+    writer._write(batch)
+    assert CrawlResult.query.count() == 7
+    assert (writer.inserted, writer.failed) == (7, 1)
+    assert writer.get_task_stats(1)["failed"] == 1
+    assert db.session.query(CrawlResult.detail_url).filter_by(detail_url='http://a/5').first() is None
+
+
+def test_flush_writes_queued_rows_and_stop_drains(app):
+    writer = ResultWriter(app, flush_interval=60).start()
+    writer.submit(rows('http://a/1'), task_id=1)
+    assert writer.flush(timeout=5)
+    assert CrawlResult.query.count() == 1
+    writer.submit(rows('http://a/2'), task_id=1)
+    writer.stop()
+    db.session.expire_all()
+    assert CrawlResult.query.count() == 2
+
+
+def test_flush_does_not_block_when_writer_thread_died(app):
+    writer = ResultWriter(app)
+    writer._thread = threading.Thread(target=lambda: None)
+    writer._thread.start()
+    writer._thread.join()
+    assert writer.flush(timeout=1) is False
@@ -0,0 +1,112 @@
+import pytest
+
+from config.db import db
+from app.models import CrawlResult
+from caiji.utils.seen_index import BloomFilter, SeenUrlIndex
+
+
+def add_result(url):
+    db.session.add(CrawlResult(category='c', config_name='A', keyword='招标', website_name='site',
+                               source_url='', title='公告', detail_url=url))
+
+
+def test_bloom_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"http://a/{i}")
+    assert all(f"http://a/{i}" in bloom for i in range(5000))
+    false_positives = sum(f"http://b/{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+    # 加入时已被判为存在的条目不计数，count 是近似值
+    assert 4900 < bloom.count <= 5000
+    assert not bloom.add("http://a/1")
+
+
+def test_bloom_round_trip():
+    bloom = BloomFilter(capacity=100, error_rate=0.001)
+    bloom.add("http://a/1")
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    assert "http://a/1" in restored
+    assert restored.count == 1
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(b'XXXX' + bloom.to_bytes()[4:])
+
+
+def test_partition_confirms_maybe_items_in_database(app, tmp_path):
+    add_result("http://a/1")
+    db.session.commit()
+    index = SeenUrlIndex(str(tmp_path / 'seen.bloom'), capacity=100)
+    index.warm()
+
+    fresh, existing = index.partition([{'detail_url': "http://a/1"}, {'detail_url': "http://a/2"}])
+    assert [i['detail_url'] for i in fresh] == ["http://a/2"]
+    assert [i['detail_url'] for i in existing] == ["http://a/1"]
+    # 只在内存中加入、数据库里没有的 URL 精确校验后仍判为新条目
+    index.add("http://a/3")
+    fresh, existing = index.partition([{'detail_url': "http://a/3"}])
+    assert fresh and not existing
+    assert index.false_positives == 1
+
+
+def test_save_and_restore_only_loads_new_rows(app, tmp_path):
+    path = str(tmp_path / 'seen.bloom')
+    add_result("http://a/1")
+    db.session.commit()
+    index = SeenUrlIndex(path, capacity=100)
+    index.warm()
+    index.save()
+
+    add_result("http://a/2")
+    db.session.commit()
+    restored = SeenUrlIndex(path, capacity=100)
+    restored.warm()
+    assert restored.might_contain("http://a/1") and restored.might_contain("http://a/2")
+    assert restored.watermark == 2
+
+
+def test_rebuilds_with_larger_capacity(app, tmp_path):
+    for i in range(30):
+        add_result(f"http://a/{i}")
+    db.session.commit()
+    index = SeenUrlIndex(str(tmp_path / 'seen.bloom'), capacity=10)
+    index.warm()
+    assert index.capacity >= 30
+    assert all(index.might_contain(f"http://a/{i}") for i in range(30))
+
+
+def test_refresh_picks_up_rows_committed_out_of_id_order(app, tmp_path):
+    index = SeenUrlIndex(str(tmp_path / 'seen.bloom'), capacity=100, rescan_margin=10)
+    for i in range(3):
+        add_result(f"http://a/{i}")
+    db.session.commit()
+    index.warm()
+    # 模拟 id=2 的行在补读之后才提交：补读时还看不到它
+    late = db.session.get(CrawlResult, 2)
+    late.detail_url = "http://a/late"
+    db.session.commit()
+    add_result("http://a/3")
+    db.session.commit()
+
+    index.refresh()
+    assert index.watermark == 4
+    assert index.might_contain("http://a/late") and index.might_contain("http://a/3")
+
+
+def test_counters_are_consistent_across_threads(app, tmp_path):
+    import threading
+
+    index = SeenUrlIndex(str(tmp_path / 'seen.bloom'), capacity=100)
+    index.contains_exact = lambda urls: set()
+    for i in range(20):
+        index.add(f"http://a/{i}")
+
+    def work():
+        for _ in range(50):
+            index.partition([{'detail_url': f"http://a/{i}"} for i in range(20)])
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert index.stats() == {"exact_checks": 4000, "false_positives": 4000}
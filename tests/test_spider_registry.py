@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+import types
+
+from caiji.utils import spider_registry
+from caiji.utils.spider_registry import SpiderRegistry
+from caiji.utils.task_watchdog import TaskWatchdog
+
+SPIDER = '''
+from caiji.utils.spider_registry import register_spider
+
+
+@register_spider({sites})
+class Spider:
+    VERSION = {version}
+'''
+
+
+def _write(path, version, sites=('注册表测试大学',), body=SPIDER):
+    path.write_text(body.format(sites=', '.join(repr(s) for s in sites), version=version), encoding='utf-8')
+    # 修改时间明显变化，避免与上一次写入落在同一秒
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + version * 10))
+
+
+def _registry(tmp_path, monkeypatch, package, watchdog=None):
+    root = tmp_path / package
+    root.mkdir()
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return root, SpiderRegistry(root=str(root), package=package, watchdog=watchdog or TaskWatchdog(enabled=False))
+
+
+def test_edited_module_is_reloaded(tmp_path, monkeypatch):
+    root, registry = _registry(tmp_path, monkeypatch, 'spiders_reload')
+    module = root / 'school.py'
+    _write(module, 1, sites=('注册表测试大学', '注册表测试学院'))
+
+    assert registry.get('注册表测试大学').VERSION == 1
+    assert registry.get('注册表测试学院').VERSION == 1
+
+    # 修改爬虫并去掉一个网站，下一轮 discover 后重新导入
+    _write(module, 2)
+    assert registry.get('注册表测试大学').VERSION == 1
+    registry.discover()
+    assert registry.get('注册表测试大学').VERSION == 2
+    assert registry.get('注册表测试学院') is None
+    assert registry.stats()["loaded"] == 1
+    sys.modules.pop('spiders_reload.school', None)
+
+
+def test_broken_edit_keeps_previous_class(tmp_path, monkeypatch):
+    root, registry = _registry(tmp_path, monkeypatch, 'spiders_broken')
+    module = root / 'school.py'
+    _write(module, 1, sites=('注册表测试研究院',))
+    assert registry.get('注册表测试研究院').VERSION == 1
+
+    _write(module, 2, sites=('注册表测试研究院',), body=SPIDER + '\nraise RuntimeError("改坏了")\n')
+    registry.discover()
+    assert registry.get('注册表测试研究院').VERSION == 1
+    assert 'spiders_broken.school' in registry.failures()
+
+    _write(module, 3, sites=('注册表测试研究院',))
+    registry.discover()
+    assert registry.get('注册表测试研究院').VERSION == 3
+    assert registry.failures() == {}
+    sys.modules.pop('spiders_broken.school', None)
+
+
+def test_shared_registry_scans_once(monkeypatch):
+    scans = []
+
+    def discover(self):
+        scans.append(self)
+        self._discovered = True
+        return 0
+
+    monkeypatch.setattr(spider_registry, '_registry', None)
+    monkeypatch.setattr(SpiderRegistry, 'discover', discover)
+
+    registry = spider_registry.get_spider_registry()
+    assert scans == []
+    # 一轮开始时调用方扫描一次，之后的 get() 不再扫描
+    registry.discover()
+    registry.get('不存在的网站')
+    assert len(scans) == 1
+
+
+
+def test_reload_waits_for_running_tasks(tmp_path, monkeypatch):
+    watchdog = TaskWatchdog(enabled=False)
+    root, registry = _registry(tmp_path, monkeypatch, 'spiders_busy', watchdog)
+    module = root / 'school.py'
+    _write(module, 1, sites=('注册表测试中心',))
+    assert registry.get('注册表测试中心').VERSION == 1
+
+    entered, leave = threading.Event(), threading.Event()
+
+    def running_task():
+        with watchdog.track('busy', '注册表测试中心（招标）', '注册表测试中心'):
+            entered.set()
+            leave.wait(5)
+
+    worker = threading.Thread(target=running_task)
+    worker.start()
+    entered.wait(5)
+    _write(module, 2, sites=('注册表测试中心',))
+    registry.discover()
+    # 旧模块仍有任务在执行；放弃等待后线程未退出同样不重新导入
+    assert registry.get('注册表测试中心').VERSION == 1
+    watchdog.forget('busy')
+    assert registry.get('注册表测试中心').VERSION == 1
+
+    leave.set()
+    worker.join()
+    assert registry.get('注册表测试中心').VERSION == 2
+    sys.modules.pop('spiders_busy.school', None)
+
+
+def test_slow_import_does_not_block_other_modules(tmp_path, monkeypatch):
+    gate = types.ModuleType('registry_test_gate')
+    gate.started, gate.release = threading.Event(), threading.Event()
+    monkeypatch.setitem(sys.modules, 'registry_test_gate', gate)
+    root, registry = _registry(tmp_path, monkeypatch, 'spiders_slow')
+    slow = SPIDER + '\nimport registry_test_gate\nregistry_test_gate.started.set()\nregistry_test_gate.release.wait(5)\n'
+    _write(root / 'slow.py', 1, sites=('注册表慢速大学',), body=slow)
+    _write(root / 'fast.py', 1, sites=('注册表快速大学',))
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault('slow', registry.get('注册表慢速大学')))
+    worker.start()
+    assert gate.started.wait(5)
+    # 慢模块导入期间其它模块照常导入
+    assert registry.get('注册表快速大学').VERSION == 1
+    assert worker.is_alive()
+    gate.release.set()
+    worker.join()
+    assert result['slow'].VERSION == 1
+    sys.modules.pop('spiders_slow.slow', None)
+    sys.modules.pop('spiders_slow.fast', None)
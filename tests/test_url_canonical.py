@@ -0,0 +1,126 @@
+import logging
+
+import pytest
+
+from config.db import db
+from app.models import CrawlResult
+from caiji.main import keyword_transmit as kt
+from caiji.utils.incremental import IncrementalTracker
+from caiji.utils.url_canonical import LegacyUrlIndex, SiteRule, UrlCanonicalizer, canonicalize_url
+
+RULE = SiteRule(strip_params=['utm_*', 'spm'])
+
+
+@pytest.mark.parametrize('url, expected', [
+    # 协议与主机名小写、去掉默认端口与锚点、解析 ./ 与 ../
+    ('HTTP://Example.COM:80/a/./b/../c?x=1#frag', 'http://example.com/a/c?x=1'),
+    ('https://e.com:443', 'https://e.com/'),
+    # 末尾斜杠默认保留
+    ('http://e.com:8080/x/', 'http://e.com:8080/x/'),
+    ('http://e.com//a//b/', 'http://e.com/a/b/'),
+    # 转义统一为大写、不解码为中文，中文按 UTF-8 编码；非保留字符的转义解码，保留字符保持转义
+    ('http://e.com/%e6%8b%9b%e6%a0%87?q=%41%2f', 'http://e.com/%E6%8B%9B%E6%A0%87?q=A%2F'),
+    ('http://e.com/招标?q=采购', 'http://e.com/%E6%8B%9B%E6%A0%87?q=%E9%87%87%E8%B4%AD'),
+    ('http://e.com/%d5%d0%b1%ea', 'http://e.com/%D5%D0%B1%EA'),
+    ('http://e.com/100%', 'http://e.com/100%'),
+    ('http://e.com/a b', 'http://e.com/a%20b'),
+    # 去掉跟踪参数（支持通配）并排序
+    ('http://e.com/a?utm_source=x&b=2&spm=1&a=1&UTM_medium=y', 'http://e.com/a?a=1&b=2'),
+    ('http://e.com/a?b=2&a=1', 'http://e.com/a?a=1&b=2'),
+    # 无法规范化的链接原样返回
+    ('mailto:someone@e.com', 'mailto:someone@e.com'),
+    ('/relative/path', '/relative/path'),
+    ('http://e.com:bad/', 'http://e.com:bad/'),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url, RULE) == expected
+
+
+def test_site_rule_override():
+    rule = RULE.override('scheme=https keep=id,page keep_slash no_sort')
+    assert canonicalize_url('http://e.com/a/?spm=1&page=2&id=3&x=1', rule) == 'https://e.com/a/?page=2&id=3'
+    assert canonicalize_url('http://e.com/A/B', RULE.override('lower_path')) == 'http://e.com/a/b'
+    assert canonicalize_url('http://e.com/a/', RULE.override('strip_slash')) == 'http://e.com/a'
+    assert canonicalize_url('http://e.com/', RULE.override('strip_slash')) == 'http://e.com/'
+    with pytest.raises(ValueError):
+        RULE.override('unknown_rule')
+
+
+def test_apply_merges_batch_duplicates_and_counts_collisions():
+    canonicalizer = UrlCanonicalizer(RULE.override('strip_slash'), {'某某大学': RULE.override('scheme=https')})
+    items = [{'title': '1', 'detail_url': 'http://e.com/a?b=2&a=1'},
+             {'title': '2', 'detail_url': 'http://e.com/a?a=1&b=2&utm_source=x'},
+             {'title': '3', 'detail_url': 'http://e.com/c/'},
+             {'title': '4', 'detail_url': 'http://e.com/d'}]
+    # c 的原链接保存过，不算规范化识别出的重复
+    known = {'http://e.com/c', 'http://e.com/c/', 'http://e.com/d'}
+    result = canonicalizer.apply(items, '其它网站', known)
+    assert [item['detail_url'] for item in result] == ['http://e.com/a?a=1&b=2', 'http://e.com/c', 'http://e.com/d']
+    assert result[0]['original_url'] == 'http://e.com/a?b=2&a=1'
+    assert 'original_url' not in result[2]
+    assert canonicalizer.stats() == {"rewritten": 2, "collisions": 1}
+
+    assert canonicalizer.canonicalize('http://e.com/d', '某某大学') == 'https://e.com/d'
+
+
+def _save(url, keyword='招标', website_name='site', original_url=None):
+    db.session.add(CrawlResult(category='c', config_name='A', keyword=keyword, website_name=website_name,
+                               source_url='', title='公告', detail_url=url, original_url=original_url))
+    db.session.commit()
+
+
+def test_legacy_index_scans_rows_before_cutover_once(app, tmp_path, monkeypatch):
+    canonicalizer = UrlCanonicalizer(RULE)
+    path = str(tmp_path / 'legacy_urls.json')
+    _save('http://e.com/a?b=2&a=1')
+    _save('http://e.com/b', keyword='采购')
+    _save('http://e.com/c?spm=1', keyword='采购')
+    # 规范化之后保存的行已有 original_url，不必再规范化
+    _save('http://e.com/d?x=1&y=2', original_url='http://e.com/d?y=2&x=1')
+    index = LegacyUrlIndex(canonicalizer, path, batch_size=2).load()
+    assert index.cutover == 4
+    assert index.known('site', '招标') == {'http://e.com/a?a=1&b=2'}
+    assert index.known('site') == {'http://e.com/a?a=1&b=2', 'http://e.com/c'}
+    assert index.known('other') == set()
+
+    # 分界之后保存的行不扫描；重启后直接读取文件
+    _save('http://e.com/e?b=1&a=1')
+    calls = []
+    monkeypatch.setattr(canonicalizer, 'canonicalize', lambda url, site=None: calls.append(url) or url)
+    restored = LegacyUrlIndex(canonicalizer, path).load()
+    assert calls == []
+    assert (restored.cutover, restored.known('site')) == (4, index.known('site'))
+
+
+def test_legacy_index_rebuilds_when_rules_change(app, tmp_path):
+    path = str(tmp_path / 'legacy_urls.json')
+    _save('http://e.com/a/')
+    assert len(LegacyUrlIndex(UrlCanonicalizer(RULE), path).load()) == 0
+    _save('http://e.com/b/')
+    index = LegacyUrlIndex(UrlCanonicalizer(RULE, {'site': RULE.override('strip_slash')}), path).load()
+    assert index.cutover == 2
+    assert index.known('site') == {'http://e.com/a', 'http://e.com/b'}
+
+
+def test_legacy_rows_are_not_saved_again(app, tmp_path, monkeypatch):
+    canonicalizer = UrlCanonicalizer(RULE)
+    _save('http://e.com/a?b=2&a=1')
+    index = LegacyUrlIndex(canonicalizer, str(tmp_path / 'legacy_urls.json')).load()
+    monkeypatch.setattr(kt, 'get_url_canonicalizer', lambda logger=None: canonicalizer)
+    monkeypatch.setattr(kt, 'get_legacy_url_index', lambda logger=None: index)
+    settings = {"url_canonical": True}
+    items = [{'title': '1', 'detail_url': 'http://e.com/a?a=1&b=2&spm=9'},
+             {'title': '2', 'detail_url': 'http://e.com/new'}]
+    logger = logging.getLogger('tests')
+
+    # 不开启增量抓取时也按规范化后的写法去掉旧记录
+    kept = kt._canonicalize_items(items, 'site', None, logger, settings)
+    assert [item['detail_url'] for item in kept] == ['http://e.com/new']
+
+    # 开启增量抓取时旧记录算作已知条目
+    tracker = IncrementalTracker.for_task('site', '招标', stop_after=1,
+                                          canonicalize=canonicalizer.canonicalize,
+                                          legacy_urls=index.known('site', '招标'))
+    assert not tracker.observe('http://e.com/a?b=2&a=1#top')
+    assert tracker.should_stop()
+    assert tracker.observe('http://e.com/new')